@@ -8,18 +8,28 @@ import requests
 import json
 import subprocess
 import shutil
-import zipfile
 import re
 import os
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 import logging
 from packaging import version as packaging_version
+from src.jar_cache import get_jar_cache
+from src.jar_index import IndicatorMatcher, scan_jar, any_hit
+
+# Forge indicators in JAR entry names, matched case-insensitively
+FORGE_JAR_MATCHER = IndicatorMatcher(ignorecase=[
+    'net/minecraftforge/',
+    'META-INF/mods.toml',
+    'META-INF/mcmod.info',
+    'forge-'
+])
 
 class ModernForgeInstaller:
     def __init__(self, server_dir: Path):
         self.server_dir = server_dir
         self.server_dir.mkdir(exist_ok=True)
+        self.jar_cache = get_jar_cache(server_dir)
         
     def get_available_minecraft_versions(self) -> List[str]:
         """Get available Minecraft versions from Forge"""
@@ -172,28 +182,18 @@ class ModernForgeInstaller:
     
     def _is_forge_jar(self, jar_path: Path) -> bool:
         """Check if a JAR file is a Forge server JAR"""
+        return self.jar_cache.lookup(jar_path, 'installer_forge', lambda: self._inspect_forge_jar(jar_path))
+    
+    def _inspect_forge_jar(self, jar_path: Path) -> bool:
+        """Open a JAR and check its name and contents for Forge indicators (uncached)"""
         try:
             # Check filename patterns
             filename = jar_path.name.lower()
             if any(pattern in filename for pattern in ['forge', 'server']):
                 return True
             
-            # Check JAR contents for Forge indicators
-            with zipfile.ZipFile(jar_path, 'r') as jar:
-                # Look for Forge-specific files
-                forge_indicators = [
-                    'net/minecraftforge/',
-                    'META-INF/mods.toml',
-                    'META-INF/mcmod.info',
-                    'forge-'
-                ]
-                
-                for file_info in jar.filelist:
-                    file_name = file_info.filename.lower()
-                    if any(indicator in file_name for indicator in forge_indicators):
-                        return True
-            
-            return False
+            # Check JAR contents for Forge indicators in one pass, stopping at the first hit
+            return bool(scan_jar(jar_path, FORGE_JAR_MATCHER, any_hit))
             
         except Exception as e:
             logging.error(f"Error checking if JAR is Forge: {e}")
@@ -0,0 +1,261 @@
+import os
+import bz2
+import time
+import zlib
+import shutil
+import struct
+import logging
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    from .backup_store import SKIPPED_FILES
+    from .jar_index import (CENTRAL_HEADER_SIGNATURE, CENTRAL_HEADER_STRUCT, EOCD_SIGNATURE, EOCD_STRUCT,
+                            ZIP64_EOCD_SIGNATURE, ZIP64_EOCD_STRUCT, ZIP64_LOCATOR_SIGNATURE,
+                            ZIP64_LOCATOR_STRUCT, UTF8_FLAG)
+except ImportError:
+    from backup_store import SKIPPED_FILES
+    from jar_index import (CENTRAL_HEADER_SIGNATURE, CENTRAL_HEADER_STRUCT, EOCD_SIGNATURE, EOCD_STRUCT,
+                           ZIP64_EOCD_SIGNATURE, ZIP64_EOCD_STRUCT, ZIP64_LOCATOR_SIGNATURE,
+                           ZIP64_LOCATOR_STRUCT, UTF8_FLAG)
+
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+LOCAL_HEADER_STRUCT = struct.Struct('<4s5H3L2H')
+ZIP64_EXTRA_ID = 0x0001
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_FILECOUNT_LIMIT = 0xFFFF
+
+# Zip compression method IDs and the "version needed to extract" for each
+METHOD_STORED = 0
+METHOD_DEFLATED = 8
+METHOD_BZIP2 = 12
+CODECS = {
+    'store': (METHOD_STORED, 20),
+    'deflate': (METHOD_DEFLATED, 20),
+    'bzip2': (METHOD_BZIP2, 46),
+}
+DEFAULT_LEVELS = {'deflate': 6, 'bzip2': 9}
+
+# Payloads that are already compressed: region files hold zlib-compressed
+# chunks and .dat files are gzipped NBT, so deflating them again costs CPU
+# for next to no gain
+PRECOMPRESSED_SUFFIXES = {'.mca', '.mcc', '.mcr', '.dat', '.dat_old', '.gz', '.zip', '.jar', '.png'}
+
+READ_SIZE = 1024 * 1024
+# Compressed entries are buffered in memory up to this size before spilling to disk
+SPOOL_SIZE = 16 * 1024 * 1024
+
+
+class _Entry:
+    def __init__(self, path: Path, name: str, stat, method: int):
+        self.path = path
+        self.name = name
+        self.stat = stat
+        self.method = method
+        self.crc = 0
+        self.size = 0
+        self.compressed_size = 0
+        self.data = None  # spooled compressed payload; None means copy the file as-is
+        self.offset = 0
+
+
+def _make_compressor(method: int, level: int):
+    if method == METHOD_DEFLATED:
+        return zlib.compressobj(level, zlib.DEFLATED, -15)
+    if method == METHOD_BZIP2:
+        return bz2.BZ2Compressor(level)
+    return None
+
+
+def _dos_datetime(mtime: float):
+    t = time.localtime(max(mtime, 315532800))  # the zip epoch is 1980
+    return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+
+class ArchiveWriter:
+    """Writes world backups as zip archives, compressing entries in parallel.
+
+    Each file is compressed on a worker thread (zlib and bz2 release the GIL,
+    so this scales across cores) while the calling thread appends finished
+    entries to the archive in order. Already-compressed payloads such as
+    region files are stored as-is, and any entry that doesn't shrink is
+    stored instead. The output is a standard zip (zip64 where needed) that
+    zipfile and any unzip tool can read.
+    """
+
+    def __init__(self, codec: str = 'deflate', level: Optional[int] = None, workers: Optional[int] = None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown backup codec {codec!r}; choose from {', '.join(CODECS)}")
+        self.codec = codec
+        self.method, self.version_needed = CODECS[codec]
+        self.level = level if level is not None else DEFAULT_LEVELS.get(codec, 0)
+        self.workers = max(1, workers or os.cpu_count() or 1)
+
+    def write(self, source_dir: Path, archive_path: Path) -> Dict:
+        """Archive source_dir to archive_path, returning size and timing stats"""
+        source_dir = Path(source_dir)
+        archive_path = Path(archive_path)
+        started = time.time()
+        entries = self._collect(source_dir)
+        stats = {'files': len(entries), 'total_bytes': 0, 'archive_bytes': 0,
+                 'stored_files': 0, 'compressed_files': 0, 'codec': self.codec,
+                 'level': self.level, 'workers': self.workers}
+
+        temp_path = archive_path.with_name(archive_path.name + '.tmp')
+        try:
+            with open(temp_path, 'wb') as out, ThreadPoolExecutor(max_workers=self.workers) as executor:
+                # Keep a bounded window of entries in flight so memory stays flat on huge worlds
+                window = deque()
+                pending = iter(entries)
+                for entry in pending:
+                    window.append(executor.submit(self._prepare, entry))
+                    if len(window) >= self.workers * 2:
+                        break
+                while window:
+                    entry = window.popleft().result()
+                    next_entry = next(pending, None)
+                    if next_entry:
+                        window.append(executor.submit(self._prepare, next_entry))
+                    self._write_entry(out, entry)
+                    stats['total_bytes'] += entry.size
+                    stats['stored_files' if entry.method == METHOD_STORED else 'compressed_files'] += 1
+
+                self._write_central_directory(out, entries)
+                stats['archive_bytes'] = out.tell()
+            os.replace(temp_path, archive_path)
+        except BaseException:
+            for entry in entries:
+                if entry.data:
+                    entry.data.close()
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        stats['duration'] = round(time.time() - started, 3)
+        logging.info(
+            f"Archived {stats['files']} files to {archive_path.name}: "
+            f"{stats['total_bytes'] / (1024 * 1024):.1f} MB -> {stats['archive_bytes'] / (1024 * 1024):.1f} MB "
+            f"({self.codec}, {self.workers} workers) in {stats['duration']}s"
+        )
+        return stats
+
+    def _collect(self, source_dir: Path):
+        entries = []
+        for path in sorted(source_dir.rglob('*')):
+            if not path.is_file() or path.name in SKIPPED_FILES:
+                continue
+            name = path.relative_to(source_dir).as_posix()
+            method = METHOD_STORED if path.suffix in PRECOMPRESSED_SUFFIXES else self.method
+            entries.append(_Entry(path, name, path.stat(), method))
+        return entries
+
+    def _prepare(self, entry: _Entry) -> _Entry:
+        """Compute the CRC and, for compressed entries, the compressed payload"""
+        compressor = _make_compressor(entry.method, self.level)
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) if compressor else None
+        crc = 0
+        size = 0
+        with open(entry.path, 'rb') as f:
+            while True:
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    break
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                if compressor:
+                    spool.write(compressor.compress(chunk))
+        entry.crc = crc
+        entry.size = size
+
+        if compressor:
+            spool.write(compressor.flush())
+            if spool.tell() < size:
+                entry.compressed_size = spool.tell()
+                spool.seek(0)
+                entry.data = spool
+                return entry
+            # Didn't shrink; storing is smaller and faster to restore
+            spool.close()
+            entry.method = METHOD_STORED
+
+        entry.compressed_size = size
+        return entry
+
+    def _write_entry(self, out, entry: _Entry):
+        entry.offset = out.tell()
+        name = entry.name.encode('utf-8')
+        flags = UTF8_FLAG if not entry.name.isascii() else 0
+        dos_time, dos_date = _dos_datetime(entry.stat.st_mtime)
+
+        extra = b''
+        size, compressed_size = entry.size, entry.compressed_size
+        if size >= ZIP64_LIMIT or compressed_size >= ZIP64_LIMIT:
+            extra = struct.pack('<HHQQ', ZIP64_EXTRA_ID, 16, size, compressed_size)
+            size = compressed_size = ZIP64_LIMIT
+
+        out.write(LOCAL_HEADER_STRUCT.pack(
+            LOCAL_HEADER_SIGNATURE, self._version_needed(entry), flags, entry.method,
+            dos_time, dos_date, entry.crc, compressed_size, size, len(name), len(extra)
+        ))
+        out.write(name)
+        out.write(extra)
+
+        if entry.data:
+            shutil.copyfileobj(entry.data, out, READ_SIZE)
+            entry.data.close()
+            entry.data = None
+        else:
+            with open(entry.path, 'rb') as f:
+                remaining = entry.size
+                while remaining:
+                    chunk = f.read(min(READ_SIZE, remaining))
+                    if not chunk:
+                        raise IOError(f"{entry.path} shrank while it was being archived")
+                    out.write(chunk)
+                    remaining -= len(chunk)
+
+    def _version_needed(self, entry: _Entry) -> int:
+        version = self.version_needed if entry.method == self.method else 20
+        if entry.size >= ZIP64_LIMIT or entry.compressed_size >= ZIP64_LIMIT or entry.offset >= ZIP64_LIMIT:
+            version = max(version, 45)
+        return version
+
+    def _write_central_directory(self, out, entries):
+        cd_offset = out.tell()
+        for entry in entries:
+            name = entry.name.encode('utf-8')
+            flags = UTF8_FLAG if not entry.name.isascii() else 0
+            dos_time, dos_date = _dos_datetime(entry.stat.st_mtime)
+            version = self._version_needed(entry)
+
+            size, compressed_size, offset = entry.size, entry.compressed_size, entry.offset
+            extra = b''
+            if max(size, compressed_size, offset) >= ZIP64_LIMIT:
+                extra = struct.pack('<HHQQQ', ZIP64_EXTRA_ID, 24, size, compressed_size, offset)
+                size = compressed_size = offset = ZIP64_LIMIT
+
+            out.write(CENTRAL_HEADER_STRUCT.pack(
+                CENTRAL_HEADER_SIGNATURE, (3 << 8) | version, version, flags, entry.method,
+                dos_time, dos_date, entry.crc, compressed_size, size, len(name), len(extra), 0,
+                0, 0, (entry.stat.st_mode & 0xFFFF) << 16, offset
+            ))
+            out.write(name)
+            out.write(extra)
+
+        cd_size = out.tell() - cd_offset
+        count = len(entries)
+        if count >= ZIP_FILECOUNT_LIMIT or cd_offset >= ZIP64_LIMIT or cd_size >= ZIP64_LIMIT:
+            zip64_eocd_offset = out.tell()
+            out.write(ZIP64_EOCD_STRUCT.pack(
+                ZIP64_EOCD_SIGNATURE, ZIP64_EOCD_STRUCT.size - 12, 45, 45, 0, 0,
+                count, count, cd_size, cd_offset
+            ))
+            out.write(ZIP64_LOCATOR_STRUCT.pack(ZIP64_LOCATOR_SIGNATURE, 0, zip64_eocd_offset, 1))
+            count = min(count, ZIP_FILECOUNT_LIMIT)
+            cd_size = min(cd_size, ZIP64_LIMIT)
+            cd_offset = min(cd_offset, ZIP64_LIMIT)
+
+        out.write(EOCD_STRUCT.pack(EOCD_SIGNATURE, 0, 0, count, count, cd_size, cd_offset, 0))
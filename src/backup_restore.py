@@ -0,0 +1,154 @@
+import os
+import time
+import shutil
+import zipfile
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Dict, Optional
+
+READ_SIZE = 1024 * 1024
+
+
+class RestoreError(Exception):
+    """Raised when a backup can't be restored or fails verification"""
+
+
+class WorldRestorer:
+    """Restores a world backup into a staging directory, then swaps it in.
+
+    Files are streamed straight from the backup into the staging world, and
+    verified as they are written: zip entries against their CRC-32 (which
+    zipfile checks when an entry has been read to the end), snapshot blocks
+    against their SHA-256. Nothing is extracted twice and no temporary copy
+    of the backup is made, so a restore needs free space for one uncompressed
+    world. The live world is only touched once every file has verified, and
+    never for a backup that turns out to hold no world (no level.dat and no
+    region files).
+    """
+
+    def __init__(self, world_dir: Path):
+        self.world_dir = Path(world_dir)
+        self.staging_dir = self.world_dir.with_name(f".{self.world_dir.name}.restore")
+
+    def restore_zip(self, archive_path: Path) -> Dict:
+        started = time.time()
+        stats = {'files': 0, 'bytes': 0}
+        try:
+            with zipfile.ZipFile(archive_path) as archive:
+                infos = [info for info in archive.infolist() if not info.is_dir()]
+                self._prepare_staging(sum(info.file_size for info in infos))
+                for info in infos:
+                    target = self._target_path(info.filename)
+                    with archive.open(info) as source, open(target, 'wb') as out:
+                        # Reading to EOF makes zipfile check the CRC and raise BadZipFile on mismatch
+                        shutil.copyfileobj(source, out, READ_SIZE)
+                    mtime = time.mktime(info.date_time + (0, 0, -1))
+                    os.utime(target, (mtime, mtime))
+                    stats['files'] += 1
+                    stats['bytes'] += info.file_size
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, EOFError) as e:
+            self.discard_staging()
+            raise RestoreError(f"Backup {Path(archive_path).name} failed verification: {e}")
+        except BaseException:
+            self.discard_staging()
+            raise
+
+        self._check_staged_world(f"Backup {Path(archive_path).name}")
+        stats['duration'] = round(time.time() - started, 3)
+        return stats
+
+    def restore_snapshot(self, store, snapshot_id: str) -> Dict:
+        started = time.time()
+        stats = {'files': 0, 'bytes': 0}
+        try:
+            manifest = store.load_manifest(snapshot_id)
+        except FileNotFoundError:
+            raise RestoreError(f"Snapshot {snapshot_id} not found")
+
+        files = manifest['files']
+        self._prepare_staging(sum(entry['size'] for entry in files.values()))
+        try:
+            for relative, entry in files.items():
+                target = self._target_path(relative)
+                written = 0
+                with open(target, 'wb') as out:
+                    for digest in entry['blocks']:
+                        written += out.write(store.read_blob(digest, verify=True))
+                if written != entry['size']:
+                    raise ValueError(f"{relative} restored {written} bytes, expected {entry['size']}")
+                # Restore the recorded mtime so the next snapshot sees these files as unchanged
+                os.utime(target, ns=(entry['mtime_ns'], entry['mtime_ns']))
+                stats['files'] += 1
+                stats['bytes'] += written
+        except (ValueError, FileNotFoundError) as e:
+            self.discard_staging()
+            raise RestoreError(f"Snapshot {snapshot_id} failed verification: {e}")
+        except BaseException:
+            self.discard_staging()
+            raise
+
+        self._check_staged_world(f"Snapshot {snapshot_id}")
+        stats['duration'] = round(time.time() - started, 3)
+        return stats
+
+    def swap_in(self, keep_previous: bool = True) -> Optional[Path]:
+        """Replace the world with the verified staging copy.
+
+        Both renames happen within the server directory, so each is atomic;
+        if the second fails the original world is put back. Returns where
+        the previous world was moved, or None if it was deleted.
+        """
+        previous = None
+        if self.world_dir.exists():
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            previous = self.world_dir.with_name(f"{self.world_dir.name}.pre-restore-{stamp}")
+            suffix = 1
+            while previous.exists():
+                suffix += 1
+                previous = self.world_dir.with_name(f"{self.world_dir.name}.pre-restore-{stamp}_{suffix}")
+            os.rename(self.world_dir, previous)
+        try:
+            os.rename(self.staging_dir, self.world_dir)
+        except OSError:
+            if previous:
+                os.rename(previous, self.world_dir)
+            raise
+
+        if previous and not keep_previous:
+            shutil.rmtree(previous, ignore_errors=True)
+            return None
+        return previous
+
+    def _check_staged_world(self, source: str):
+        """Refuse a staging world with nothing to play, so an empty backup can't replace the live one"""
+        problem = None
+        if not any(path.is_file() for path in self.staging_dir.rglob('*')):
+            problem = "contains no files"
+        elif not (self.staging_dir / "level.dat").is_file() and not any(self.staging_dir.rglob('*.mca')):
+            problem = "contains no world data (no level.dat or region files)"
+        if problem:
+            self.discard_staging()
+            raise RestoreError(f"{source} {problem}; the current world was left untouched")
+
+    def discard_staging(self):
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+    def _prepare_staging(self, required_bytes: int):
+        self.discard_staging()
+        self.staging_dir.mkdir(parents=True)
+        free = shutil.disk_usage(self.staging_dir).free
+        if free < required_bytes:
+            self.discard_staging()
+            raise RestoreError(
+                f"Not enough free disk space to restore: need {required_bytes / (1024 ** 3):.1f} GB, "
+                f"have {free / (1024 ** 3):.1f} GB"
+            )
+
+    def _target_path(self, name: str) -> Path:
+        """Map an archive name to a path in the staging world, refusing anything outside it"""
+        relative = PurePosixPath(name)
+        if relative.is_absolute() or '..' in relative.parts:
+            raise RestoreError(f"Backup entry {name!r} points outside the world directory")
+        target = self.staging_dir.joinpath(*relative.parts)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        return target
@@ -0,0 +1,183 @@
+import json
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+# Grandfather-father-son retention: keep the newest backup in each of the
+# most recent N hours, days, ISO weeks and months, plus the newest keep_last
+DEFAULT_RETENTION = {'keep_last': 3, 'hourly': 24, 'daily': 7, 'weekly': 4, 'monthly': 6}
+
+RETENTION_BUCKETS = {
+    'hourly': lambda t: t.strftime('%Y-%m-%d %H'),
+    'daily': lambda t: t.strftime('%Y-%m-%d'),
+    'weekly': lambda t: '%d-W%02d' % t.isocalendar()[:2],
+    'monthly': lambda t: t.strftime('%Y-%m'),
+}
+
+MIN_INTERVAL = 300
+
+# Jobs kept in memory for the API; the full history stays in the JSONL file
+HISTORY_LIMIT = 200
+
+
+def select_retained(backups: Iterable[Dict], policy: Optional[Dict] = None) -> Set[str]:
+    """Return the IDs of the backups a GFS policy keeps.
+
+    backups need 'id' and 'created' (ISO timestamp). Each backup can satisfy
+    several tiers at once, e.g. the newest backup of a month is usually also
+    the newest of its week and day.
+    """
+    policy = dict(DEFAULT_RETENTION, **(policy or {}))
+    ordered = sorted(backups, key=lambda b: b['created'], reverse=True)
+    retained = {b['id'] for b in ordered[:policy.get('keep_last', 0)]}
+
+    for tier, bucket_of in RETENTION_BUCKETS.items():
+        limit = policy.get(tier, 0)
+        seen = set()
+        for backup in ordered:
+            if len(seen) >= limit:
+                break
+            bucket = bucket_of(datetime.fromisoformat(backup['created']))
+            if bucket not in seen:
+                seen.add(bucket)
+                retained.add(backup['id'])
+    return retained
+
+
+class BackupJobHistory:
+    """Append-only log of backup jobs (one JSON object per line)"""
+
+    def __init__(self, history_file: Path):
+        self.history_file = Path(history_file)
+        self.history_file.parent.mkdir(parents=True, exist_ok=True)
+        self._recent = deque(maxlen=HISTORY_LIMIT)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.history_file.exists():
+            return
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._recent.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except Exception as e:
+            logging.warning(f"Failed to read backup job history: {e}")
+
+    def record(self, job: Dict):
+        with self._lock:
+            self._recent.append(job)
+            try:
+                with open(self.history_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(job, separators=(',', ':')) + '\n')
+            except Exception as e:
+                logging.error(f"Failed to record backup job {job.get('id')}: {e}")
+
+    def list(self, limit: Optional[int] = None) -> List[Dict]:
+        """Get recent jobs, newest first"""
+        with self._lock:
+            jobs = list(reversed(self._recent))
+        return jobs[:limit] if limit else jobs
+
+    def last(self, status: Optional[str] = None) -> Optional[Dict]:
+        for job in self.list():
+            if status is None or job.get('status') == status:
+                return job
+        return None
+
+
+class BackupScheduler:
+    """Runs world backups every backup_interval seconds while auto_backup is on.
+
+    Runs never overlap: a tick that arrives while a backup is still going is
+    recorded as skipped. After each successful run, backups outside the
+    retention policy are pruned. The world can't change while the server is
+    stopped, so scheduled runs are skipped then unless backup_when_stopped
+    is set.
+    """
+
+    def __init__(self, server_manager):
+        self.server_manager = server_manager
+        self.next_run: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._stopping = False
+
+    @property
+    def config(self) -> Dict:
+        return self.server_manager.config
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config.get('auto_backup', False))
+
+    @property
+    def interval(self) -> int:
+        return max(MIN_INTERVAL, int(self.config.get('backup_interval', 3600)))
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+
+    def reschedule(self):
+        """Pick up changed backup settings"""
+        self._wake.set()
+
+    def _last_run_time(self) -> float:
+        job = self.server_manager.backup_jobs.last()
+        if job:
+            return job['started']
+        backups = self.server_manager.list_backups()
+        if backups:
+            return datetime.fromisoformat(backups[0]['created']).timestamp()
+        return time.time()
+
+    def _run(self):
+        last_run = self._last_run_time()
+        while not self._stopping:
+            self.next_run = last_run + self.interval if self.enabled else None
+            timeout = max(0.0, self.next_run - time.time()) if self.next_run else None
+            if self._wake.wait(timeout):
+                self._wake.clear()
+                continue
+
+            last_run = time.time()
+            if not self.server_manager.is_running and not self.config.get('backup_when_stopped', False):
+                logging.info("Skipping scheduled backup: server is not running")
+                continue
+            try:
+                self.run_backup()
+            except Exception as e:
+                logging.error(f"Scheduled backup failed: {e}")
+        self.next_run = None
+
+    def run_backup(self, trigger: str = 'scheduled') -> bool:
+        """Run one backup to completion, then apply retention"""
+        if not self.server_manager.backup_world(wait=True, trigger=trigger):
+            return False
+        self.server_manager.prune_backups()
+        return True
+
+    def get_status(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'interval': self.interval,
+            'next_run': self.next_run,
+            'backup_in_progress': self.server_manager.backup_in_progress,
+            'operation': self.server_manager.backup_operation,
+            'retention': dict(DEFAULT_RETENTION, **self.config.get('backup_retention', {}))
+        }
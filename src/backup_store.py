@@ -0,0 +1,305 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Region files are sequences of 4 KiB-aligned chunk records, so splitting them
+# into small blocks means a change to one chunk only dirties one block
+REGION_SUFFIXES = {'.mca', '.mcc', '.mcr'}
+REGION_BLOCK_SIZE = 128 * 1024
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Files the server holds open and rewrites constantly; not worth backing up
+SKIPPED_FILES = {'session.lock'}
+
+
+def _id_order(snapshot_id: str):
+    """Sort key for snapshot IDs: the timestamp, then the numeric suffix two snapshots in one second get"""
+    parts = snapshot_id.split('_')
+    suffix = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 1
+    return parts[:2], suffix
+
+
+class BackupStore:
+    """Content-addressed store of world snapshots.
+
+    Files are split into blocks and each block is stored once under its
+    SHA-256 hash in objects/. A snapshot is a JSON manifest in snapshots/
+    mapping every world file to its list of block hashes. Unchanged files
+    (same size and mtime as in the previous snapshot) are not even re-read,
+    so a snapshot of a mostly idle world costs little time and almost no
+    extra space. Snapshot summaries are kept in a small index beside the
+    manifests, so listing snapshots doesn't parse every manifest.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.snapshots_dir = self.root / "snapshots"
+        self.index_file = self.root / "snapshots_index.json"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Taken after _lock when both are needed
+        self._index_lock = threading.Lock()
+        self._index: Optional[Dict[str, Dict]] = None
+
+    # Blobs
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def has_blob(self, digest: str) -> bool:
+        return self._blob_path(digest).exists()
+
+    def put_blob(self, data: bytes):
+        """Store a block, returning (digest, newly_stored)"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if path.exists():
+            return digest, False
+
+        path.parent.mkdir(exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return digest, True
+
+    def read_blob(self, digest: str, verify: bool = False) -> bytes:
+        """Read a block; with verify=True, raise ValueError if it doesn't match its hash"""
+        with open(self._blob_path(digest), 'rb') as f:
+            data = f.read()
+        if verify and hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Block {digest} is corrupt")
+        return data
+
+    # Snapshots
+
+    def _manifest_path(self, snapshot_id: str) -> Path:
+        return self.snapshots_dir / f"{snapshot_id}.json"
+
+    def list_snapshots(self) -> List[Dict]:
+        """Get snapshot summaries, oldest first"""
+        snapshot_ids = {manifest_file.stem for manifest_file in self.snapshots_dir.glob("*.json")}
+        with self._index_lock:
+            index = self._load_index()
+            # Manifests written before the index existed, or by another copy of MCUS
+            missing = snapshot_ids - index.keys()
+            stale = index.keys() - snapshot_ids
+            for snapshot_id in sorted(missing):
+                try:
+                    index[snapshot_id] = self._summary(self.load_manifest(snapshot_id))
+                except Exception as e:
+                    logging.warning(f"Skipping unreadable snapshot {snapshot_id}.json: {e}")
+            for snapshot_id in stale:
+                del index[snapshot_id]
+            if missing or stale:
+                self._save_index()
+            snapshots = [index[snapshot_id] for snapshot_id in snapshot_ids if snapshot_id in index]
+        snapshots.sort(key=lambda s: s['created'])
+        return snapshots
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if self._index is None:
+            self._index = {}
+            try:
+                if self.index_file.exists():
+                    with open(self.index_file, 'r') as f:
+                        self._index = {summary['id']: summary for summary in json.load(f)['snapshots']}
+            except Exception as e:
+                logging.warning(f"Rebuilding unreadable snapshot index: {e}")
+        return self._index
+
+    def _save_index(self):
+        temp_path = self.index_file.with_suffix('.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump({'snapshots': list(self._index.values())}, f, separators=(',', ':'))
+        os.replace(temp_path, self.index_file)
+
+    def _update_index(self, snapshot_id: str, summary: Optional[Dict]):
+        with self._index_lock:
+            index = self._load_index()
+            if summary:
+                index[snapshot_id] = summary
+            else:
+                index.pop(snapshot_id, None)
+            try:
+                self._save_index()
+            except OSError as e:
+                # The next list_snapshots() rebuilds whatever is missing
+                logging.warning(f"Failed to update snapshot index: {e}")
+
+    def load_manifest(self, snapshot_id: str) -> Dict:
+        with open(self._manifest_path(snapshot_id), 'r') as f:
+            return json.load(f)
+
+    def latest_manifest(self) -> Optional[Dict]:
+        # Snapshot IDs are timestamps, so the newest manifest is the last by ID
+        for manifest_file in sorted(self.snapshots_dir.glob("*.json"), key=lambda p: _id_order(p.stem), reverse=True):
+            try:
+                return self.load_manifest(manifest_file.stem)
+            except Exception as e:
+                logging.warning(f"Skipping unreadable snapshot {manifest_file.name}: {e}")
+        return None
+
+    def _summary(self, manifest: Dict) -> Dict:
+        return {
+            'id': manifest['id'],
+            'created': manifest['created'],
+            'label': manifest.get('label'),
+            'file_count': len(manifest['files']),
+            **manifest.get('stats', {})
+        }
+
+    def create_snapshot(self, source_dir: Path, label: Optional[str] = None,
+                        carried_files: Optional[Dict] = None, source: Optional[Path] = None) -> Dict:
+        """Snapshot source_dir, storing only blocks the store doesn't already have.
+
+        carried_files are manifest entries from an earlier snapshot for files
+        not present in source_dir (e.g. a partial staging copy of a live
+        world); they are included as-is. source overrides the directory
+        recorded in the manifest.
+        """
+        source_dir = Path(source_dir)
+        started = time.time()
+
+        with self._lock:
+            previous = self.latest_manifest()
+            previous_files = previous['files'] if previous else {}
+
+            files = {}
+            stats = {'total_bytes': 0, 'new_bytes': 0, 'new_blobs': 0,
+                     'changed_files': 0, 'unchanged_files': 0}
+
+            for relative, entry in (carried_files or {}).items():
+                if not all(self.has_blob(d) for d in entry['blocks'][:1]):
+                    raise ValueError(f"Carried file {relative} references blocks missing from the store")
+                files[relative] = entry
+                stats['total_bytes'] += entry['size']
+                stats['unchanged_files'] += 1
+
+            for path in sorted(source_dir.rglob('*')):
+                if not path.is_file() or path.name in SKIPPED_FILES:
+                    continue
+                relative = path.relative_to(source_dir).as_posix()
+                stat = path.stat()
+                stats['total_bytes'] += stat.st_size
+
+                old_entry = previous_files.get(relative)
+                if (old_entry and old_entry['size'] == stat.st_size
+                        and old_entry['mtime_ns'] == stat.st_mtime_ns
+                        and all(self.has_blob(d) for d in old_entry['blocks'][:1])):
+                    files[relative] = old_entry
+                    stats['unchanged_files'] += 1
+                    continue
+
+                files[relative] = self._store_file(path, stat, stats)
+                stats['changed_files'] += 1
+
+            files = dict(sorted(files.items()))
+            snapshot_id = self._new_snapshot_id()
+            stats['duration'] = round(time.time() - started, 3)
+            manifest = {
+                'id': snapshot_id,
+                'created': datetime.now().isoformat(),
+                'label': label,
+                'source': str(source or source_dir),
+                'files': files,
+                'stats': stats
+            }
+            self._write_manifest(manifest)
+
+        logging.info(
+            f"Snapshot {snapshot_id}: {stats['changed_files']} changed, {stats['unchanged_files']} unchanged, "
+            f"{stats['new_bytes'] / (1024 * 1024):.1f} MB new in {stats['duration']}s"
+        )
+        return self._summary(manifest)
+
+    def _store_file(self, path: Path, stat, stats: Dict) -> Dict:
+        block_size = REGION_BLOCK_SIZE if path.suffix in REGION_SUFFIXES else DEFAULT_BLOCK_SIZE
+        blocks = []
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(block_size)
+                if not data:
+                    break
+                digest, is_new = self.put_blob(data)
+                blocks.append(digest)
+                if is_new:
+                    stats['new_blobs'] += 1
+                    stats['new_bytes'] += len(data)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'blocks': blocks}
+
+    def _new_snapshot_id(self) -> str:
+        snapshot_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = 1
+        candidate = snapshot_id
+        while self._manifest_path(candidate).exists():
+            suffix += 1
+            candidate = f"{snapshot_id}_{suffix}"
+        return candidate
+
+    def _write_manifest(self, manifest: Dict):
+        # Manifest goes last and atomically, so a crash mid-snapshot only leaves unreferenced blobs
+        path = self._manifest_path(manifest['id'])
+        temp_path = path.with_suffix('.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(manifest, f, separators=(',', ':'))
+        os.replace(temp_path, path)
+        self._update_index(manifest['id'], self._summary(manifest))
+
+    def delete_snapshot(self, snapshot_id: str) -> bool:
+        """Delete a snapshot manifest; run collect_garbage() to reclaim its blocks"""
+        path = self._manifest_path(snapshot_id)
+        if not path.exists():
+            return False
+        with self._lock:
+            path.unlink()
+            self._update_index(snapshot_id, None)
+        return True
+
+    def collect_garbage(self) -> Dict:
+        """Delete blocks no snapshot references any more"""
+        with self._lock:
+            referenced = set()
+            for manifest_file in self.snapshots_dir.glob("*.json"):
+                manifest = self.load_manifest(manifest_file.stem)
+                for entry in manifest['files'].values():
+                    referenced.update(entry['blocks'])
+
+            removed = 0
+            freed = 0
+            for blob in self.objects_dir.glob("*/*"):
+                digest = blob.parent.name + blob.name
+                if digest not in referenced:
+                    freed += blob.stat().st_size
+                    blob.unlink()
+                    removed += 1
+
+        if removed:
+            logging.info(f"Backup store GC removed {removed} blocks ({freed / (1024 * 1024):.1f} MB)")
+        return {'removed_blobs': removed, 'freed_bytes': freed}
+
+    def get_stats(self) -> Dict:
+        """Get store-wide size and deduplication figures"""
+        blob_count = 0
+        stored_bytes = 0
+        for blob in self.objects_dir.glob("*/*"):
+            blob_count += 1
+            stored_bytes += blob.stat().st_size
+
+        snapshots = self.list_snapshots()
+        logical_bytes = sum(s.get('total_bytes', 0) for s in snapshots)
+        return {
+            'snapshots': len(snapshots),
+            'blobs': blob_count,
+            'stored_bytes': stored_bytes,
+            'logical_bytes': logical_bytes,
+            'dedup_ratio': round(logical_bytes / stored_bytes, 2) if stored_bytes else None
+        }
@@ -0,0 +1,201 @@
+import re
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Callable
+from dataclasses import dataclass, field
+
+# Event types emitted by ConsoleEventParser
+READY = 'ready'
+JOIN = 'join'
+LEAVE = 'leave'
+CHAT = 'chat'
+OVERLOAD = 'overload'
+CRASH = 'crash'
+COMMAND_RESULT = 'command_result'
+SAVE_COMPLETE = 'save_complete'
+OUT_OF_MEMORY = 'out_of_memory'
+TICK_STATS = 'tick_stats'
+STARTUP_STAGE = 'startup_stage'
+
+# Subscribe with this to receive every classified event
+ALL_EVENTS = '*'
+
+# Log4j prefix written by vanilla and Forge servers, e.g.
+#   [12:34:56] [Server thread/INFO]: message
+#   [14Jul2025 22:39:18.123] [Server thread/INFO] [net.minecraft.server.MinecraftServer/]: message
+LINE_PREFIX = (
+    r'(?:\[(?P<timestamp>[^\]]*)\] '
+    r'\[(?P<thread>[^\]]+)/(?P<level>[A-Z]+)\]'
+    r'(?: \[(?P<logger>[^\]]*)\])?: )?'
+)
+
+PLAYER_NAME = r'[A-Za-z0-9_.]{1,16}'
+
+# Pattern table, tried as one alternation in this order. Named groups must be
+# prefixed with "<event type>_"; the prefix is stripped when building event data.
+EVENT_PATTERNS = [
+    (READY, r'Done \((?P<ready_seconds>\d+(?:\.\d+)?)s\)! For help.*'),
+    # Milestones on the way to READY, used to time server startup
+    (STARTUP_STAGE, r'(?P<startup_stage_text>Loading \d+ mods:?.*'
+                    r'|Forge Mod Loader has identified \d+ mods? to load'
+                    r'|Starting minecraft server version .+'
+                    r'|Preparing level ".+"'
+                    r'|Preparing (?:start region for (?:dimension|level) .+|spawn area: .+))'),
+    (JOIN, rf'(?P<join_player>{PLAYER_NAME}) joined the game'),
+    (LEAVE, rf'(?P<leave_player>{PLAYER_NAME}) left the game'),
+    (CHAT, rf'(?:\[Not Secure\] )?<(?P<chat_player>{PLAYER_NAME})> (?P<chat_message>.*)'),
+    (OVERLOAD, r"Can't keep up! Is the server overloaded\? "
+               r"Running (?P<overload_ms>\d+)ms or (?P<overload_ticks>\d+) ticks behind"),
+    (CRASH, r'(?:This crash report has been saved to: (?P<crash_report>.+)'
+            r'|Preparing crash report.*'
+            r'|Encountered an unexpected exception.*'
+            r'|Exception in server tick loop.*)'),
+    (OUT_OF_MEMORY, r'(?:Exception in thread "[^"]*" |Caused by: )?java\.lang\.OutOfMemoryError(?:: (?P<out_of_memory_kind>.+))?'),
+    # Replies to the Forge/NeoForge "tps" and vanilla "tick query" commands
+    (TICK_STATS, r'(?P<tick_stats_text>(?:Dim .+|Overall): Mean tick time: .+'
+                 r'|(?:[a-z0-9_.-]+:[a-z0-9_./-]+|Overall): \d+(?:\.\d+)? TPS \(.+ ms/tick\)'
+                 r'|Average time per tick: .+)'),
+    # Commands run over RCON are echoed to the console as "[Rcon: Saved the game]"
+    (SAVE_COMPLETE, r'(?:\[(?P<save_complete_source>[^:\]]+): )?Saved the game\]?'),
+    (COMMAND_RESULT, r'(?P<command_result_text>'
+                     r'There are \d+ of a max(?: of)? \d+ players online:.*'
+                     r'|Unknown or incomplete command.*'
+                     r'|Unknown command.*'
+                     r'|Incorrect argument for command.*'
+                     r'|Saving the game.*'
+                     r'|Automatic saving is now (?:disabled|enabled)'
+                     r'|Saving is already turned (?:on|off)'
+                     r'|Made .+ (?:a server operator|no longer a server operator)'
+                     r'|(?:Kicked|Banned|Unbanned|Teleported|Gave|Set the time to) .+)'),
+]
+
+# Numeric fields converted when building event data
+NUMERIC_FIELDS = {
+    (READY, 'seconds'): float,
+    (OVERLOAD, 'ms'): int,
+    (OVERLOAD, 'ticks'): int,
+}
+
+
+@dataclass
+class ConsoleEvent:
+    type: str
+    line: str
+    data: Dict = field(default_factory=dict)
+    level: Optional[str] = None
+    time: float = field(default_factory=time.time)
+    offset: Optional[int] = None
+
+
+def _compile_pattern_table(patterns) -> re.Pattern:
+    """Compile the pattern table into one anchored alternation"""
+    alternatives = '|'.join(f'(?P<{event_type}>{pattern})' for event_type, pattern in patterns)
+    return re.compile(f'{LINE_PREFIX}(?:{alternatives})')
+
+
+class EventWaiter:
+    """Waits for the next event of a type, optionally matching a predicate"""
+
+    def __init__(self, parser, event_type: str, predicate: Optional[Callable[[ConsoleEvent], bool]] = None):
+        self.parser = parser
+        self.event_type = event_type
+        self.predicate = predicate
+        self.event: Optional[ConsoleEvent] = None
+        self._done = threading.Event()
+
+    def _on_event(self, event: ConsoleEvent):
+        if self._done.is_set() or (self.predicate and not self.predicate(event)):
+            return
+        self.event = event
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[ConsoleEvent]:
+        """Block until the event arrives; returns None on timeout"""
+        try:
+            self._done.wait(timeout)
+            return self.event
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        self.parser.unsubscribe(self.event_type, self._on_event)
+
+
+class ConsoleEventParser:
+    """Classifies server console lines into typed events and dispatches them.
+
+    Each line is matched exactly once against a single precompiled pattern
+    table. Components interested in console activity subscribe to event
+    types instead of scanning raw text themselves.
+    """
+
+    def __init__(self, patterns=None):
+        self.patterns = list(patterns or EVENT_PATTERNS)
+        self._regex = _compile_pattern_table(self.patterns)
+        self._event_types = [event_type for event_type, _ in self.patterns]
+        self._subscribers: Dict[str, List[Callable]] = {}
+        self._lock = threading.Lock()
+
+    def parse(self, line: str, offset: Optional[int] = None) -> Optional[ConsoleEvent]:
+        """Classify a console line, returning None for uninteresting lines"""
+        text = line.rstrip('\r\n')
+        match = self._regex.fullmatch(text)
+        if not match:
+            return None
+
+        groups = match.groupdict()
+        event_type = next(t for t in self._event_types if groups.get(t) is not None)
+
+        prefix = event_type + '_'
+        data = {}
+        for name, value in groups.items():
+            if value is None or not name.startswith(prefix):
+                continue
+            key = name[len(prefix):]
+            converter = NUMERIC_FIELDS.get((event_type, key))
+            data[key] = converter(value) if converter else value
+
+        return ConsoleEvent(
+            type=event_type,
+            line=text,
+            data=data,
+            level=groups.get('level'),
+            offset=offset
+        )
+
+    def subscribe(self, event_type: str, callback: Callable[[ConsoleEvent], None]):
+        """Register a callback for an event type (or ALL_EVENTS)"""
+        with self._lock:
+            self._subscribers.setdefault(event_type, []).append(callback)
+
+    def unsubscribe(self, event_type: str, callback: Callable[[ConsoleEvent], None]):
+        """Remove a previously registered callback"""
+        with self._lock:
+            callbacks = self._subscribers.get(event_type, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def expect(self, event_type: str, predicate: Optional[Callable[[ConsoleEvent], bool]] = None) -> EventWaiter:
+        """Start waiting for an event before triggering it, to avoid missing a fast reply"""
+        waiter = EventWaiter(self, event_type, predicate)
+        self.subscribe(event_type, waiter._on_event)
+        return waiter
+
+    def dispatch(self, line: str, offset: Optional[int] = None) -> Optional[ConsoleEvent]:
+        """Parse a line and notify subscribers of the resulting event"""
+        event = self.parse(line, offset)
+        if event:
+            self.publish(event)
+        return event
+
+    def publish(self, event: ConsoleEvent):
+        """Notify subscribers of an already-built event"""
+        with self._lock:
+            callbacks = self._subscribers.get(event.type, []) + self._subscribers.get(ALL_EVENTS, [])
+
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                logging.error(f"Console event handler failed for {event.type}: {e}")
@@ -0,0 +1,86 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class ConsoleBuffer:
+    """Fixed-size in-memory ring buffer of server console lines.
+
+    Every appended line gets a monotonically increasing offset, so readers
+    can tail the console from the last offset they saw without re-reading
+    anything from disk. Once the buffer is full the oldest lines are
+    overwritten; a reader that falls behind simply resumes from the oldest
+    line still held.
+    """
+
+    def __init__(self, capacity: int = 5000):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._slots: List[Optional[Tuple[float, str]]] = [None] * capacity
+        self._next_offset = 0
+        self._condition = threading.Condition()
+
+    @property
+    def next_offset(self) -> int:
+        """Offset that the next appended line will receive"""
+        with self._condition:
+            return self._next_offset
+
+    @property
+    def first_offset(self) -> int:
+        """Offset of the oldest line still held in the buffer"""
+        with self._condition:
+            return max(0, self._next_offset - self.capacity)
+
+    def resume_offset(self, offset: Optional[int]) -> int:
+        """Where a reader asking for offset should start.
+
+        An offset beyond the newest line comes from before the offsets were
+        reset (the buffer belongs to a new server manager, e.g. after MCUS
+        restarted), so that reader starts over from the oldest line held.
+        """
+        with self._condition:
+            first = max(0, self._next_offset - self.capacity)
+            if offset is None or offset > self._next_offset:
+                return first
+            return max(first, offset)
+
+    def append(self, line: str) -> int:
+        """Append a console line and return its offset"""
+        with self._condition:
+            offset = self._next_offset
+            self._slots[offset % self.capacity] = (time.time(), line.rstrip('\r\n'))
+            self._next_offset = offset + 1
+            self._condition.notify_all()
+            return offset
+
+    def read(self, offset: Optional[int] = None, limit: Optional[int] = None) -> Tuple[List[Dict], int]:
+        """Read lines starting at offset.
+
+        With no offset, or one past the newest line, the read starts at the
+        oldest buffered line. Returns the lines (each with its offset and
+        timestamp) and the offset to pass on the next call.
+        """
+        with self._condition:
+            start = self.resume_offset(offset)
+            end = self._next_offset
+            if limit is not None:
+                end = min(end, start + max(0, limit))
+
+            lines = []
+            for current in range(start, end):
+                timestamp, text = self._slots[current % self.capacity]
+                lines.append({'offset': current, 'time': timestamp, 'line': text})
+            return lines, end
+
+    def tail(self, count: int) -> Tuple[List[Dict], int]:
+        """Read the newest count lines"""
+        with self._condition:
+            start = max(0, self._next_offset - min(count, self.capacity))
+        return self.read(start)
+
+    def wait_for(self, offset: int, timeout: Optional[float] = None) -> bool:
+        """Block until a line at or after offset exists, or timeout expires"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._next_offset > offset, timeout)
@@ -0,0 +1,271 @@
+import os
+import re
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from collections import deque
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Relative to the server directory (the JVM's working directory), which
+# keeps drive-letter colons out of -Xlog's colon-separated option string
+GC_LOG_FILE = "logs/gc.log"
+GC_LOG_FILE_COUNT = 5
+GC_LOG_FILE_SIZE = "20M"
+
+# Upper bounds (ms) of the pause histogram buckets; the last bucket is open-ended
+PAUSE_BUCKETS_MS = (5, 10, 20, 50, 100, 200, 500, 1000)
+
+# A pause this long is felt in game as a server freeze
+LONG_PAUSE_MS = 200
+
+MAX_EVENTS = 50000
+
+SIZE = r'(?P<{0}>\d+(?:\.\d+)?)(?P<{0}_unit>[KMG])'
+
+# Java 9+ unified logging (decorations time,uptime,level,tags):
+# [2024-05-01T12:00:00.123+0000][12.345s][info][gc] GC(7) Pause Young (Normal) (G1 Evacuation Pause) 1234M->567M(2048M) 12.345ms
+UNIFIED_PAUSE = re.compile(
+    r'^\[(?P<time>[^\]]+)\]\[(?P<uptime>\d+(?:\.\d+)?)s\]\[[^\]]*\]\[gc\s*\] GC\(\d+\) '
+    r'(?P<kind>Pause .+?) '
+    + SIZE.format('before') + r'->' + SIZE.format('after') + r'\(' + SIZE.format('total') + r'\) '
+    r'(?P<ms>\d+(?:\.\d+)?)ms'
+)
+
+# Java 8 -XX:+PrintGC with date and uptime stamps:
+# 2024-05-01T12:00:00.123+0000: 12.345: [GC pause (G1 Evacuation Pause) (young) 1234M->567M(2048M), 0.0123456 secs]
+LEGACY_PAUSE = re.compile(
+    r'^(?P<time>\d{4}-\d\d-\d\dT[^ ]+): (?P<uptime>\d+(?:\.\d+)?): '
+    r'\[(?P<kind>(?:Full )?GC.*?)\s*'
+    + SIZE.format('before') + r'->' + SIZE.format('after') + r'\(' + SIZE.format('total') + r'\), '
+    r'(?P<secs>\d+(?:\.\d+)?) secs\]'
+)
+
+UNIT_MB = {'K': 1 / 1024, 'M': 1, 'G': 1024}
+
+
+def gc_log_args(java_major: Optional[int], log_file: str = GC_LOG_FILE) -> List[str]:
+    """JVM flags that write a rotating GC log the analyzer can read"""
+    if java_major is not None and java_major <= 8:
+        return [
+            f"-Xloggc:{log_file}",
+            "-XX:+PrintGC",
+            "-XX:+PrintGCDateStamps",
+            "-XX:+PrintGCTimeStamps",
+            "-XX:+UseGCLogFileRotation",
+            f"-XX:NumberOfGCLogFiles={GC_LOG_FILE_COUNT}",
+            f"-XX:GCLogFileSize={GC_LOG_FILE_SIZE}",
+        ]
+    return [
+        f"-Xlog:gc*:file={log_file}:time,uptime,level,tags:"
+        f"filecount={GC_LOG_FILE_COUNT},filesize={GC_LOG_FILE_SIZE}"
+    ]
+
+
+@dataclass
+class GcPause:
+    time: float
+    uptime: float
+    kind: str
+    pause_ms: float
+    before_mb: float
+    after_mb: float
+    total_mb: float
+
+
+def _mb(match, name: str) -> float:
+    return float(match.group(name)) * UNIT_MB[match.group(f'{name}_unit')]
+
+
+def _timestamp(value: str) -> float:
+    # Both formats print offsets without a colon (+0000), which %z accepts
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f%z').timestamp()
+
+
+def parse_line(line: str) -> Optional[GcPause]:
+    match = UNIFIED_PAUSE.match(line)
+    if match:
+        pause_ms = float(match.group('ms'))
+    else:
+        match = LEGACY_PAUSE.match(line)
+        if not match:
+            return None
+        pause_ms = float(match.group('secs')) * 1000
+    try:
+        timestamp = _timestamp(match.group('time'))
+    except ValueError:
+        return None
+    return GcPause(
+        time=timestamp,
+        uptime=float(match.group('uptime')),
+        kind=' '.join(match.group('kind').split()),
+        pause_ms=pause_ms,
+        before_mb=_mb(match, 'before'),
+        after_mb=_mb(match, 'after'),
+        total_mb=_mb(match, 'total')
+    )
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 2)
+
+
+class GcLogAnalyzer:
+    """Reads the server's rotating GC log into pause events and summarises them.
+
+    Files are parsed incrementally: each file's size, inode and read offset
+    are remembered, so a refresh only reads lines appended since the last
+    one, and rotated files (which never change again) are parsed once.
+    """
+
+    def __init__(self, log_file: Path, max_events: int = MAX_EVENTS):
+        self.log_file = Path(log_file)
+        self.max_events = max_events
+        self._files: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _log_files(self) -> List[Path]:
+        directory = self.log_file.parent
+        if not directory.exists():
+            return []
+        # gc.log plus its rotations (gc.log.0 ... for unified logging, gc.log.N.current for Java 8)
+        files = [path for path in directory.glob(f"{self.log_file.name}*") if path.is_file()]
+        return sorted(files, key=lambda path: path.stat().st_mtime_ns)
+
+    def refresh(self) -> List[GcPause]:
+        """Bring the parsed events up to date and return them, oldest first"""
+        with self._lock:
+            present = set()
+            for path in self._log_files():
+                key = str(path)
+                present.add(key)
+                try:
+                    self._read_file(key, path.stat())
+                except OSError as e:
+                    logging.debug(f"Could not read GC log {path}: {e}")
+            for key in list(self._files):
+                if key not in present:
+                    del self._files[key]
+
+            events = [event for entry in self._files.values() for event in entry['events']]
+        events.sort(key=lambda event: event.time)
+        return events[-self.max_events:]
+
+    def _read_file(self, key: str, stat: os.stat_result):
+        entry = self._files.get(key)
+        if entry and entry['inode'] == stat.st_ino and entry['offset'] == stat.st_size:
+            return
+        if not entry or entry['inode'] != stat.st_ino or stat.st_size < entry['offset']:
+            # New, rotated into place or truncated: parse from the start
+            entry = {'inode': stat.st_ino, 'offset': 0, 'events': deque(maxlen=self.max_events)}
+            self._files[key] = entry
+
+        with open(key, 'rb') as f:
+            f.seek(entry['offset'])
+            data = f.read(stat.st_size - entry['offset'])
+        # Leave a trailing partial line for the next refresh
+        end = data.rfind(b'\n') + 1
+        entry['offset'] += end
+        for raw in data[:end].splitlines():
+            event = parse_line(raw.decode('utf-8', errors='replace'))
+            if event:
+                entry['events'].append(event)
+
+    def summary(self, since: Optional[float] = None, trend_points: int = 200) -> Dict:
+        """Pause-time histogram and percentiles, allocation rate and heap-after-GC trend"""
+        events = self.refresh()
+        if since is not None:
+            events = events[bisect_right([event.time for event in events], since):]
+
+        pauses = sorted(event.pause_ms for event in events)
+        histogram = [0] * (len(PAUSE_BUCKETS_MS) + 1)
+        for pause in pauses:
+            histogram[bisect_left(PAUSE_BUCKETS_MS, pause)] += 1
+        labels = [f"<={bound}ms" for bound in PAUSE_BUCKETS_MS] + [f">{PAUSE_BUCKETS_MS[-1]}ms"]
+
+        by_kind: Dict[str, Dict] = {}
+        for event in events:
+            kind = by_kind.setdefault(event.kind, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            kind['count'] += 1
+            kind['total_ms'] = round(kind['total_ms'] + event.pause_ms, 2)
+            kind['max_ms'] = max(kind['max_ms'], event.pause_ms)
+
+        allocation = self._allocation(events)
+        span = events[-1].time - events[0].time if len(events) > 1 else 0
+        total_pause_ms = sum(pauses)
+        trend = self._heap_trend(events, trend_points)
+
+        return {
+            'log_file': str(self.log_file),
+            'events': len(events),
+            'first': events[0].time if events else None,
+            'last': events[-1].time if events else None,
+            'pauses': {
+                'histogram': dict(zip(labels, histogram)),
+                'p50_ms': _percentile(pauses, 0.50),
+                'p95_ms': _percentile(pauses, 0.95),
+                'p99_ms': _percentile(pauses, 0.99),
+                'max_ms': round(pauses[-1], 2) if pauses else None,
+                'total_ms': round(total_pause_ms, 2),
+                'long_pauses': sum(1 for pause in pauses if pause >= LONG_PAUSE_MS),
+                # Share of wall time the server spent stopped for GC
+                'overhead_percent': round(100 * total_pause_ms / 1000 / span, 3) if span else None,
+                'by_kind': by_kind
+            },
+            'allocation': allocation,
+            'heap_after_gc': {
+                'latest_mb': round(events[-1].after_mb, 1) if events else None,
+                'max_mb': round(max(event.after_mb for event in events), 1) if events else None,
+                'committed_mb': round(events[-1].total_mb, 1) if events else None,
+                'trend': trend
+            }
+        }
+
+    @staticmethod
+    def _allocation(events: List[GcPause]) -> Dict:
+        """Allocation rate from the heap growth between consecutive collections"""
+        allocated = 0.0
+        elapsed = 0.0
+        rates = []
+        previous = None
+        for event in events:
+            # Uptime going backwards means a new JVM; start over from its first collection
+            if previous and event.uptime > previous.uptime:
+                grown = max(0.0, event.before_mb - previous.after_mb)
+                interval = event.uptime - previous.uptime
+                allocated += grown
+                elapsed += interval
+                rates.append((event.time, grown / interval))
+            previous = event
+        recent = [rate for _, rate in rates[-20:]]
+        return {
+            'average_mb_per_sec': round(allocated / elapsed, 2) if elapsed else None,
+            'recent_mb_per_sec': round(sum(recent) / len(recent), 2) if recent else None,
+            'peak_mb_per_sec': round(max(rate for _, rate in rates), 2) if rates else None
+        }
+
+    @staticmethod
+    def _heap_trend(events: List[GcPause], points: int) -> List[Dict]:
+        """Heap after GC over time, reduced to at most points samples (keeping each window's peak)"""
+        if not events or points <= 0:
+            return []
+        step = max(1, -(-len(events) // points))
+        trend = []
+        for start in range(0, len(events), step):
+            window = events[start:start + step]
+            peak = max(window, key=lambda event: event.after_mb)
+            trend.append({'time': window[-1].time, 'after_mb': round(peak.after_mb, 1),
+                          'committed_mb': round(window[-1].total_mb, 1)})
+        return trend
+
+    def pauses(self, since: Optional[float] = None, limit: int = 100) -> List[Dict]:
+        """The most recent pause events, newest first"""
+        events = self.refresh()
+        if since is not None:
+            events = [event for event in events if event.time > since]
+        return [asdict(event) for event in reversed(events[-limit:])]
@@ -0,0 +1,325 @@
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .server_manager import ServerManager
+    from .preflight import port_available
+    from .jvm_tuning import parse_memory_mb, format_memory, HOST_RESERVE_MB, HOST_RESERVE_FRACTION
+except ImportError:
+    from server_manager import ServerManager
+    from preflight import port_available
+    from jvm_tuning import parse_memory_mb, format_memory, HOST_RESERVE_MB, HOST_RESERVE_FRACTION
+
+DEFAULT_INSTANCE = 'default'
+
+INSTANCE_NAME = re.compile(r'^[a-z0-9][a-z0-9_-]{0,31}$')
+
+# Where allocation starts for each kind of port. Query is UDP, so it can
+# share the game port's number, as vanilla does by default
+GAME_PORT_BASE = 25565
+RCON_PORT_BASE = 25575
+PORT_LIMIT = 65535
+
+# Memory a JVM uses beyond its heap (metaspace, thread stacks, GC and
+# direct buffers): a quarter of the heap, and at least this much
+MIN_NATIVE_OVERHEAD_MB = 512
+
+# Settings that belong to one instance and are never copied from the main config
+INSTANCE_KEYS = ('port', 'rcon_port', 'query_port', 'java_memory', 'rcon_password')
+
+
+def footprint_mb(heap_mb: Optional[int]) -> int:
+    """Host memory a server with this heap needs"""
+    if not heap_mb:
+        return 0
+    return heap_mb + max(MIN_NATIVE_OVERHEAD_MB, heap_mb // 4)
+
+
+class InstanceManager:
+    """Runs several Minecraft servers side by side on one host.
+
+    Each instance is a ServerManager with its own server and backup
+    directories, its own game, RCON and query ports and its own memory
+    budget (its java_memory heap cap). The default instance is the
+    original server/ and backups/ directories with the main config; the
+    rest live under instances/<name>/ with a copy of the main config plus
+    their own overrides, recorded in instances/instances.json.
+
+    Ports are allocated when an instance is created: the lowest free port
+    from each base that no other instance claims and nothing on the host
+    is bound to. Memory is enforced when an instance starts: the running
+    instances' heaps plus JVM overhead must fit in the host's RAM less the
+    same reserve the JVM planner leaves for the OS.
+    """
+
+    def __init__(self, base_config: Dict, base_dir: Path = Path("instances")):
+        self.base_config = base_config
+        self.base_dir = Path(base_dir)
+        self.registry_file = self.base_dir / "instances.json"
+        self._records: Dict[str, Dict] = {}
+        self._managers: Dict[str, ServerManager] = {}
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        # The main config always describes the default instance
+        self._records = {DEFAULT_INSTANCE: {
+            'name': DEFAULT_INSTANCE,
+            'server_dir': 'server',
+            'backup_dir': 'backups',
+            'created': None,
+            'config': {}
+        }}
+        try:
+            if self.registry_file.exists():
+                with open(self.registry_file, 'r') as f:
+                    for record in json.load(f).get('instances', []):
+                        if record['name'] != DEFAULT_INSTANCE:
+                            self._records[record['name']] = record
+        except Exception as e:
+            logging.error(f"Failed to read instance registry {self.registry_file}: {e}")
+
+    def _save(self):
+        try:
+            self.base_dir.mkdir(parents=True, exist_ok=True)
+            records = [record for name, record in self._records.items() if name != DEFAULT_INSTANCE]
+            temp_file = self.registry_file.with_suffix('.tmp')
+            with open(temp_file, 'w') as f:
+                json.dump({'instances': records}, f, indent=2)
+            os.replace(temp_file, self.registry_file)
+        except Exception as e:
+            logging.error(f"Failed to save instance registry: {e}")
+
+    # Instances
+
+    def names(self) -> List[str]:
+        return list(self._records)
+
+    def config_for(self, name: str) -> Dict:
+        record = self._records[name]
+        if name == DEFAULT_INSTANCE:
+            # Shared with the settings page, so changes there apply directly
+            return self.base_config
+        config = {key: value for key, value in self.base_config.items() if key not in INSTANCE_KEYS}
+        config.update(record['config'])
+        config.update(port=record['port'], rcon_port=record['rcon_port'], query_port=record['query_port'],
+                      java_memory=format_memory(record['memory_mb']))
+        return config
+
+    def manager(self, name: str = DEFAULT_INSTANCE) -> Optional[ServerManager]:
+        """The instance's ServerManager, created on first use"""
+        with self._lock:
+            if name not in self._records:
+                return None
+            manager = self._managers.get(name)
+            if manager is None:
+                record = self._records[name]
+                manager = ServerManager(self.config_for(name), server_dir=record['server_dir'],
+                                        backup_dir=record['backup_dir'], instance=name)
+                manager.instances = self
+                self._managers[name] = manager
+            return manager
+
+    def managers(self) -> Dict[str, ServerManager]:
+        return {name: self.manager(name) for name in self.names()}
+
+    def create(self, name: str, memory_mb: int, config: Optional[Dict] = None) -> Tuple[Optional[Dict], Optional[str]]:
+        """Add an instance with freshly allocated ports; returns (record, None) or (None, reason)"""
+        if not INSTANCE_NAME.match(name or ''):
+            return None, 'Instance names are 1-32 lowercase letters, digits, "-" or "_"'
+        usable = self.usable_memory_mb()
+        if usable is not None and footprint_mb(memory_mb) > usable:
+            return None, (f"{memory_mb} MB of heap needs {footprint_mb(memory_mb)} MB with JVM overhead; "
+                          f"this host has {usable} MB for servers")
+        overrides = {key: value for key, value in (config or {}).items() if key not in INSTANCE_KEYS}
+
+        with self._lock:
+            if name in self._records:
+                return None, f"Instance {name} already exists"
+            game_port, rcon_port, query_port = self.allocate_ports()
+            directory = self.base_dir / name
+            record = {
+                'name': name,
+                'server_dir': str(directory / "server"),
+                'backup_dir': str(directory / "backups"),
+                'port': game_port,
+                'rcon_port': rcon_port,
+                'query_port': query_port,
+                'memory_mb': int(memory_mb),
+                'created': time.time(),
+                'config': overrides
+            }
+            Path(record['server_dir']).mkdir(parents=True, exist_ok=True)
+            self._records[name] = record
+            self._save()
+        logging.info(f"Created instance {name}: port {game_port}, RCON {rcon_port}, query {query_port}, "
+                     f"{memory_mb} MB heap")
+        return record, None
+
+    def update(self, name: str, memory_mb: Optional[int] = None, config: Optional[Dict] = None) -> Optional[str]:
+        """Change an instance's memory budget or config overrides (applied at its next start)"""
+        with self._lock:
+            record = self._records.get(name)
+            if not record:
+                return f"Instance {name} not found"
+            if name == DEFAULT_INSTANCE:
+                return 'The default instance is configured on the settings page'
+            if memory_mb is not None:
+                usable = self.usable_memory_mb()
+                if usable is not None and footprint_mb(memory_mb) > usable:
+                    return f"{memory_mb} MB of heap does not fit in the {usable} MB this host has for servers"
+                record['memory_mb'] = int(memory_mb)
+            if config:
+                record['config'].update({key: value for key, value in config.items() if key not in INSTANCE_KEYS})
+            self._save()
+            manager = self._managers.get(name)
+            if manager:
+                manager.config.update(self.config_for(name))
+        return None
+
+    def remove(self, name: str, delete_files: bool = False) -> Optional[str]:
+        """Forget a stopped instance, and optionally delete its directories"""
+        with self._lock:
+            record = self._records.get(name)
+            if not record:
+                return f"Instance {name} not found"
+            if name == DEFAULT_INSTANCE:
+                return 'The default instance cannot be removed'
+            manager = self._managers.get(name)
+            if manager and (manager.is_running or manager.lifecycle.busy):
+                return f"Stop instance {name} first"
+            if manager:
+                manager.backup_scheduler.stop()
+                manager.tick_monitor.stop()
+            del self._records[name]
+            self._managers.pop(name, None)
+            self._save()
+        if delete_files:
+            shutil.rmtree(self.base_dir / name, ignore_errors=True)
+        logging.info(f"Removed instance {name}" + (" and its files" if delete_files else ""))
+        return None
+
+    # Ports
+
+    def _claimed_ports(self) -> Tuple[set, set]:
+        """TCP and UDP ports any instance (or MCUS itself) is configured to use"""
+        tcp, udp = set(), set()
+        for name in self._records:
+            config = self.config_for(name) if name != DEFAULT_INSTANCE else self.base_config
+            port = int(config.get('port', GAME_PORT_BASE))
+            tcp.update((port, int(config.get('rcon_port', RCON_PORT_BASE))))
+            udp.add(int(config.get('query_port', port)))
+        tcp.add(int(self.base_config.get('network_port', 25566)))
+        tcp.add(int(os.environ.get('PORT', 3000)))
+        return tcp, udp
+
+    @staticmethod
+    def _next_free(start: int, claimed: set, udp: bool = False) -> int:
+        for port in range(start, PORT_LIMIT + 1):
+            if port not in claimed and port_available(port, udp):
+                return port
+        raise RuntimeError(f"No free {'UDP' if udp else 'TCP'} port from {start}")
+
+    def allocate_ports(self) -> Tuple[int, int, int]:
+        """Game, RCON and query ports for a new instance"""
+        tcp, udp = self._claimed_ports()
+        game_port = self._next_free(GAME_PORT_BASE, tcp)
+        tcp.add(game_port)
+        rcon_port = self._next_free(RCON_PORT_BASE, tcp)
+        query_port = self._next_free(game_port, udp, udp=True)
+        return game_port, rcon_port, query_port
+
+    # Memory
+
+    @staticmethod
+    def host_memory_mb() -> Optional[int]:
+        try:
+            import psutil
+            return int(psutil.virtual_memory().total / (1024 * 1024))
+        except ImportError:
+            return None
+
+    def usable_memory_mb(self) -> Optional[int]:
+        """Host RAM left for servers after the OS reserve, or None without psutil"""
+        total = self.host_memory_mb()
+        if total is None:
+            return None
+        return total - max(HOST_RESERVE_MB, int(total * HOST_RESERVE_FRACTION))
+
+    def heap_mb(self, name: str) -> Optional[int]:
+        """The instance's heap: what its current launch planned, else its configured budget"""
+        manager = self._managers.get(name)
+        if manager and manager.jvm_plan:
+            return manager.jvm_plan.heap_max_mb
+        try:
+            return parse_memory_mb(self.config_for(name).get('java_memory', 'auto'))
+        except ValueError:
+            return None
+
+    def _active(self, exclude: Optional[str] = None) -> List[str]:
+        """Instances that are running or on their way up"""
+        return [name for name, manager in self._managers.items()
+                if name != exclude and (manager.is_running or manager.lifecycle.busy)]
+
+    def budget_problem(self, name: str) -> Optional[str]:
+        """Why starting the instance would overcommit host memory, or None if it fits"""
+        usable = self.usable_memory_mb()
+        if usable is None:
+            return None
+        # An "auto" heap is sized by the JVM planner against what's available when it starts
+        wanted = footprint_mb(self.heap_mb(name))
+        active = self._active(exclude=name)
+        committed = sum(footprint_mb(self.heap_mb(other)) for other in active)
+        if committed + wanted > usable:
+            return (f"Instance {name} needs {wanted} MB, but {', '.join(active) or 'nothing'} already "
+                    f"commit{'s' if len(active) == 1 else ''} {committed} MB of the {usable} MB this host has "
+                    f"for servers")
+        return None
+
+    # Reporting
+
+    def describe(self, name: str) -> Optional[Dict]:
+        record = self._records.get(name)
+        if not record:
+            return None
+        manager = self._managers.get(name)
+        config = self.config_for(name)
+        job = manager.lifecycle.current if manager else None
+        heap = self.heap_mb(name)
+        return {
+            'name': name,
+            'server_dir': record['server_dir'],
+            'backup_dir': record['backup_dir'],
+            'created': record['created'],
+            'port': config.get('port', GAME_PORT_BASE),
+            'rcon_port': config.get('rcon_port', RCON_PORT_BASE),
+            'query_port': config.get('query_port', config.get('port', GAME_PORT_BASE)),
+            'heap_mb': heap,
+            'footprint_mb': footprint_mb(heap),
+            'config': record['config'],
+            'running': bool(manager and manager.is_running),
+            'job': job.to_dict() if job else None
+        }
+
+    def summary(self) -> Dict:
+        """Every instance, plus how much of the host's memory the active ones commit"""
+        with self._lock:
+            instances = [self.describe(name) for name in self.names()]
+            active = self._active()
+        committed = sum(footprint_mb(self.heap_mb(name)) for name in active)
+        return {
+            'instances': instances,
+            'memory': {
+                'host_mb': self.host_memory_mb(),
+                'usable_mb': self.usable_memory_mb(),
+                'committed_mb': committed,
+                'allocated_mb': sum(instance['footprint_mb'] for instance in instances)
+            }
+        }
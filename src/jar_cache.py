@@ -0,0 +1,129 @@
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+CACHE_VERSION = 1
+
+# Delay before writing the cache after a change, so a scan over many JARs
+# results in one write instead of one per JAR
+SAVE_DELAY = 1.0
+
+
+class JarCache:
+    """Persistent cache of JAR classification results.
+
+    Results are stored per JAR path under a named key (e.g. "valid_server",
+    "forge_version") together with the file's size and mtime. When either
+    changes, every cached result for that JAR is discarded, so each JAR is
+    opened and inspected once per change rather than on every lookup.
+    """
+
+    def __init__(self, cache_file: Path):
+        self.cache_file = Path(cache_file)
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.RLock()
+        self._save_timer = None
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        try:
+            if self.cache_file.exists():
+                with open(self.cache_file, 'r') as f:
+                    data = json.load(f)
+                if data.get('version') == CACHE_VERSION:
+                    self._entries = data.get('jars', {})
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable JAR cache {self.cache_file}: {e}")
+            self._entries = {}
+
+    def lookup(self, jar_path, key: str, compute: Callable[[], Any]) -> Any:
+        """Get a cached result for jar_path, computing and storing it if stale"""
+        path = Path(jar_path)
+        try:
+            stat = path.stat()
+        except OSError:
+            # Missing files aren't cached; let the caller's own checks report it
+            return compute()
+
+        cache_key = str(path.resolve())
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                if key in entry['results']:
+                    self.hits += 1
+                    return entry['results'][key]
+            else:
+                entry = {'size': stat.st_size, 'mtime': stat.st_mtime, 'results': {}}
+                self._entries[cache_key] = entry
+
+        self.misses += 1
+        result = compute()
+
+        with self._lock:
+            # Only store if the entry wasn't replaced while we were computing
+            if self._entries.get(cache_key) is entry:
+                entry['results'][key] = result
+                self._schedule_save()
+        return result
+
+    def invalidate(self, jar_path=None):
+        """Forget cached results for one JAR, or for all JARs"""
+        with self._lock:
+            if jar_path is None:
+                self._entries = {}
+            else:
+                self._entries.pop(str(Path(jar_path).resolve()), None)
+            self._schedule_save()
+
+    def prune(self):
+        """Drop entries for JARs that no longer exist"""
+        with self._lock:
+            missing = [path for path in self._entries if not os.path.exists(path)]
+            for path in missing:
+                del self._entries[path]
+            if missing:
+                self._schedule_save()
+        return len(missing)
+
+    def stats(self) -> Dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def _schedule_save(self):
+        if self._save_timer:
+            return
+        self._save_timer = threading.Timer(SAVE_DELAY, self.save)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def save(self):
+        """Write the cache to disk atomically"""
+        with self._lock:
+            self._save_timer = None
+            data = {'version': CACHE_VERSION, 'jars': self._entries}
+            try:
+                self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+                temp_file = self.cache_file.with_suffix('.tmp')
+                with open(temp_file, 'w') as f:
+                    json.dump(data, f)
+                os.replace(temp_file, self.cache_file)
+            except Exception as e:
+                logging.warning(f"Failed to save JAR cache: {e}")
+
+
+_caches: Dict[str, JarCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_jar_cache(server_dir: Path) -> JarCache:
+    """Get the shared JAR cache for a server directory"""
+    cache_file = Path(server_dir) / "mcus_data" / "jar_cache.json"
+    key = str(cache_file.resolve())
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = JarCache(cache_file)
+        return _caches[key]
@@ -0,0 +1,142 @@
+import re
+import struct
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set
+
+# Zip end-of-central-directory structures (see APPNOTE.TXT)
+EOCD_SIGNATURE = b'PK\x05\x06'
+EOCD_STRUCT = struct.Struct('<4s4H2LH')
+ZIP64_LOCATOR_SIGNATURE = b'PK\x06\x07'
+ZIP64_LOCATOR_STRUCT = struct.Struct('<4sLQL')
+ZIP64_EOCD_SIGNATURE = b'PK\x06\x06'
+ZIP64_EOCD_STRUCT = struct.Struct('<4sQ2H2L4Q')
+CENTRAL_HEADER_SIGNATURE = b'PK\x01\x02'
+CENTRAL_HEADER_STRUCT = struct.Struct('<4s6H3L5H2L')
+
+MAX_COMMENT = 65535
+UTF8_FLAG = 0x800
+
+
+def iter_entry_names(jar_path) -> Iterator[str]:
+    """Yield entry names straight from a zip's central directory.
+
+    Unlike zipfile.ZipFile, which parses the whole central directory before
+    returning, this reads it incrementally, so a caller that stops iterating
+    early never touches the rest of a large JAR. Raises zipfile.BadZipFile
+    for files that aren't valid zip archives.
+    """
+    with open(jar_path, 'rb') as f:
+        cd_offset, cd_size = _find_central_directory(f)
+        f.seek(cd_offset)
+        remaining = cd_size
+        while remaining >= CENTRAL_HEADER_STRUCT.size:
+            header = f.read(CENTRAL_HEADER_STRUCT.size)
+            fields = CENTRAL_HEADER_STRUCT.unpack(header)
+            if fields[0] != CENTRAL_HEADER_SIGNATURE:
+                raise zipfile.BadZipFile("Bad central directory entry")
+            flags, name_len, extra_len, comment_len = fields[3], fields[10], fields[11], fields[12]
+            raw_name = f.read(name_len)
+            f.seek(extra_len + comment_len, 1)
+            remaining -= CENTRAL_HEADER_STRUCT.size + name_len + extra_len + comment_len
+            yield raw_name.decode('utf-8' if flags & UTF8_FLAG else 'cp437')
+
+
+def _find_central_directory(f):
+    """Locate the central directory, returning (offset, size)"""
+    f.seek(0, 2)
+    file_size = f.tell()
+    tail_size = min(file_size, EOCD_STRUCT.size + MAX_COMMENT)
+    f.seek(file_size - tail_size)
+    tail = f.read(tail_size)
+
+    eocd_index = tail.rfind(EOCD_SIGNATURE)
+    if eocd_index < 0 or eocd_index + EOCD_STRUCT.size > len(tail):
+        raise zipfile.BadZipFile("File is not a zip file")
+    eocd_pos = file_size - tail_size + eocd_index
+    _, _, _, _, _, cd_size, cd_offset, _ = EOCD_STRUCT.unpack_from(tail, eocd_index)
+    end_of_cd = eocd_pos
+
+    if cd_offset == 0xFFFFFFFF or cd_size == 0xFFFFFFFF:
+        # Zip64: the real values live in the zip64 end-of-central-directory record
+        locator_pos = eocd_pos - ZIP64_LOCATOR_STRUCT.size
+        f.seek(locator_pos)
+        locator = ZIP64_LOCATOR_STRUCT.unpack(f.read(ZIP64_LOCATOR_STRUCT.size))
+        if locator[0] != ZIP64_LOCATOR_SIGNATURE:
+            raise zipfile.BadZipFile("Corrupt zip64 end of central directory locator")
+        f.seek(locator[2])
+        record = ZIP64_EOCD_STRUCT.unpack(f.read(ZIP64_EOCD_STRUCT.size))
+        if record[0] != ZIP64_EOCD_SIGNATURE:
+            raise zipfile.BadZipFile("Corrupt zip64 end of central directory record")
+        cd_size, cd_offset = record[8], record[9]
+        end_of_cd = locator[2]
+
+    # Data prepended to the archive (e.g. a launcher stub) shifts every offset
+    prefix = end_of_cd - cd_size - cd_offset
+    if prefix < 0:
+        raise zipfile.BadZipFile("Bad central directory offset")
+    return cd_offset + prefix, cd_size
+
+
+class IndicatorMatcher:
+    """Finds which of a set of indicators occur in a stream of entry names.
+
+    Each indicator is a substring (or, with regex=True, a pattern) and may be
+    case-insensitive. All outstanding indicators are compiled into one
+    alternation, so every entry name is checked against all of them in a
+    single regex search; an indicator drops out of the alternation once it
+    has been seen, and scanning stops as soon as the caller's decision
+    function says the answer is certain.
+    """
+
+    def __init__(self, indicators: Iterable[str] = (), ignorecase: Iterable[str] = (),
+                 patterns: Optional[Dict[str, str]] = None):
+        self._patterns: Dict[str, str] = {}
+        for indicator in indicators:
+            self._patterns[indicator] = re.escape(indicator)
+        for indicator in ignorecase:
+            self._patterns[indicator] = f'(?i:{re.escape(indicator)})'
+        for name, pattern in (patterns or {}).items():
+            self._patterns[name] = pattern
+
+    @property
+    def names(self) -> Set[str]:
+        return set(self._patterns)
+
+    def _compile(self, outstanding):
+        names = sorted(outstanding)
+        alternation = '|'.join(f'(?P<i{index}>{self._patterns[name]})' for index, name in enumerate(names))
+        return re.compile(alternation), names
+
+    def scan(self, entry_names: Iterable[str],
+             decided: Optional[Callable[[Set[str]], bool]] = None) -> Set[str]:
+        """Return the indicators found, stopping early once decided(hits) is true"""
+        outstanding = set(self._patterns)
+        hits: Set[str] = set()
+        if not outstanding:
+            return hits
+
+        regex, names = self._compile(outstanding)
+        for entry in entry_names:
+            match = regex.search(entry)
+            while match:
+                found = names[int(match.lastgroup[1:])]
+                hits.add(found)
+                outstanding.discard(found)
+                if not outstanding or (decided and decided(hits)):
+                    return hits
+                # Other indicators may occur in this same entry
+                regex, names = self._compile(outstanding)
+                match = regex.search(entry)
+        return hits
+
+
+def scan_jar(jar_path, matcher: IndicatorMatcher,
+             decided: Optional[Callable[[Set[str]], bool]] = None) -> Set[str]:
+    """Scan a JAR's central directory once for all of a matcher's indicators"""
+    return matcher.scan(iter_entry_names(Path(jar_path)), decided)
+
+
+def any_hit(hits: Set[str]) -> bool:
+    """Decision function: stop at the first indicator found"""
+    return bool(hits)
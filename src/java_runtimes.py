@@ -0,0 +1,300 @@
+import os
+import re
+import sys
+import glob
+import json
+import time
+import shutil
+import logging
+import platform
+import subprocess
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+CACHE_VERSION = 1
+
+# Directory listings are reused for this long before looking for new JDKs
+SCAN_TTL = 300.0
+
+JAVA_BINARY = "java.exe" if os.name == 'nt' else "java"
+
+# Glob patterns for JDK/JRE home directories, per platform
+if os.name == 'nt':
+    _program_dirs = [os.environ.get('ProgramFiles', r'C:\Program Files'),
+                     os.environ.get('ProgramFiles(x86)', r'C:\Program Files (x86)')]
+    HOME_PATTERNS = [
+        os.path.join(base, vendor, '*')
+        for base in _program_dirs
+        for vendor in ('Java', 'Eclipse Adoptium', 'Eclipse Foundation', 'AdoptOpenJDK', 'Microsoft',
+                       'Zulu', 'Amazon Corretto', 'BellSoft', 'Semeru')
+    ]
+elif sys.platform == 'darwin':
+    HOME_PATTERNS = [
+        '/Library/Java/JavaVirtualMachines/*/Contents/Home',
+        os.path.expanduser('~/Library/Java/JavaVirtualMachines/*/Contents/Home'),
+        '/opt/homebrew/opt/openjdk*/libexec/openjdk.jdk/Contents/Home',
+        '/usr/local/opt/openjdk*/libexec/openjdk.jdk/Contents/Home',
+    ]
+else:
+    HOME_PATTERNS = ['/usr/lib/jvm/*', '/usr/java/*', '/opt/java/*', '/opt/jdk*', '/opt/*jdk*']
+HOME_PATTERNS += [os.path.expanduser('~/.sdkman/candidates/java/*'), os.path.expanduser('~/.jdks/*')]
+
+# Minecraft version -> (minimum, maximum) Java major version. Checked in order; first match wins.
+# The maximum is the newest major known to work; a java_path set explicitly may go past it
+JAVA_REQUIREMENTS = [
+    ((1, 20, 5), (21, None)),
+    ((1, 18, 0), (17, None)),
+    ((1, 17, 0), (16, None)),
+    # Vanilla 1.16.5 and Forge 36.2.26+ run on Java 17
+    ((1, 16, 0), (8, 17)),
+    ((1, 13, 0), (8, 11)),
+    ((0, 0, 0), (8, 8)),
+]
+
+MINECRAFT_VERSION = re.compile(r'\b(1\.\d+(?:\.\d+)?)\b')
+
+
+def required_java(minecraft_version: Optional[str]) -> Tuple[int, Optional[int]]:
+    """(minimum, maximum) Java major version for a Minecraft version; maximum None means no limit"""
+    match = MINECRAFT_VERSION.search(minecraft_version or '')
+    if not match:
+        return 8, None
+    version = tuple(int(part) for part in match.group(1).split('.'))
+    version = version + (0,) * (3 - len(version))
+    for since, requirement in JAVA_REQUIREMENTS:
+        if version >= since:
+            return requirement
+    return 8, None
+
+
+def _resolve(path: str) -> str:
+    """Resolved path of a Java binary, looking bare names like "java" up on PATH"""
+    try:
+        return str(Path(shutil.which(path) or path).resolve())
+    except OSError:
+        return path
+
+
+def _major(version: str) -> Optional[int]:
+    match = re.match(r'(\d+)(?:\.(\d+))?', version)
+    if not match:
+        return None
+    major = int(match.group(1))
+    return int(match.group(2)) if major == 1 and match.group(2) else major
+
+
+@dataclass
+class JavaRuntime:
+    path: str
+    version: str
+    major: int
+    arch: Optional[str] = None
+    vendor: Optional[str] = None
+    home: Optional[str] = None
+
+    @property
+    def is_64bit(self) -> bool:
+        return (self.arch or '') in ('amd64', 'x86_64', 'aarch64', 'arm64', 'ppc64le', 's390x')
+
+    def to_dict(self) -> Dict:
+        return dict(asdict(self), is_64bit=self.is_64bit)
+
+
+class JavaRegistry:
+    """Finds installed Java runtimes and remembers what each one is.
+
+    Candidates come from the configured java_path, JAVA_HOME, PATH and the
+    usual JDK install directories. Each binary is identified once: from its
+    home's "release" file when there is one, otherwise by running it with
+    -XshowSettings:properties. Results are cached on disk keyed by the
+    resolved binary path with its size and mtime, so nothing is re-run
+    until a JDK is installed, upgraded or removed.
+    """
+
+    def __init__(self, cache_file: Path, extra_paths: Optional[List[str]] = None):
+        self.cache_file = Path(cache_file)
+        self.extra_paths = list(extra_paths or [])
+        self._entries: Dict[str, Dict] = {}
+        self._runtimes: Optional[List[JavaRuntime]] = None
+        self._scanned_at = 0.0
+        self._lock = threading.RLock()
+        self.probes = 0
+        self._load()
+
+    def _load(self):
+        try:
+            if self.cache_file.exists():
+                with open(self.cache_file, 'r') as f:
+                    data = json.load(f)
+                if data.get('version') == CACHE_VERSION:
+                    self._entries = data.get('runtimes', {})
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable Java runtime cache {self.cache_file}: {e}")
+            self._entries = {}
+
+    def _save(self):
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.cache_file.with_suffix('.tmp')
+            with open(temp_file, 'w') as f:
+                json.dump({'version': CACHE_VERSION, 'runtimes': self._entries}, f)
+            os.replace(temp_file, self.cache_file)
+        except Exception as e:
+            logging.warning(f"Failed to save Java runtime cache: {e}")
+
+    # Discovery
+
+    def _candidates(self) -> List[str]:
+        candidates = list(self.extra_paths)
+        java_home = os.environ.get('JAVA_HOME')
+        if java_home:
+            candidates.append(os.path.join(java_home, 'bin', JAVA_BINARY))
+        on_path = shutil.which('java')
+        if on_path:
+            candidates.append(on_path)
+        for pattern in HOME_PATTERNS:
+            candidates.extend(glob.glob(os.path.join(pattern, 'bin', JAVA_BINARY)))
+        return candidates
+
+    def runtimes(self, refresh: bool = False) -> List[JavaRuntime]:
+        """Every working runtime found, newest first"""
+        with self._lock:
+            if not refresh and self._runtimes is not None and time.time() - self._scanned_at < SCAN_TTL:
+                return list(self._runtimes)
+
+            found: Dict[str, JavaRuntime] = {}
+            changed = False
+            for candidate in self._candidates():
+                try:
+                    resolved = _resolve(candidate)
+                    stat = os.stat(resolved)
+                except OSError:
+                    continue
+                if resolved in found:
+                    continue
+                entry = self._entries.get(resolved)
+                if not entry or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+                    entry = {'size': stat.st_size, 'mtime': stat.st_mtime, 'runtime': self._probe(resolved)}
+                    self._entries[resolved] = entry
+                    changed = True
+                if entry['runtime']:
+                    found[resolved] = JavaRuntime(**entry['runtime'])
+
+            stale = [path for path in self._entries if not os.path.exists(path)]
+            for path in stale:
+                del self._entries[path]
+            if changed or stale:
+                self._save()
+
+            self._runtimes = sorted(found.values(), key=lambda r: (r.major, r.version), reverse=True)
+            self._scanned_at = time.time()
+            return list(self._runtimes)
+
+    def _probe(self, binary: str) -> Optional[Dict]:
+        """Identify a Java binary, preferring its release file over starting a JVM"""
+        home = Path(binary).parent.parent
+        # Java 8 JREs inside a JDK keep the release file one level up
+        for candidate in (home, home.parent):
+            runtime = self._from_release_file(binary, candidate)
+            if runtime:
+                return asdict(runtime)
+        runtime = self._from_properties(binary, home)
+        return asdict(runtime) if runtime else None
+
+    @staticmethod
+    def _from_release_file(binary: str, home: Path) -> Optional[JavaRuntime]:
+        release = home / "release"
+        if not release.is_file():
+            return None
+        values = {}
+        try:
+            for line in release.read_text(encoding='utf-8', errors='replace').splitlines():
+                key, sep, value = line.partition('=')
+                if sep:
+                    values[key.strip()] = value.strip().strip('"')
+        except OSError:
+            return None
+        version = values.get('JAVA_VERSION') or values.get('JAVA_RUNTIME_VERSION')
+        major = _major(version) if version else None
+        if not major:
+            return None
+        return JavaRuntime(path=binary, version=version, major=major, arch=values.get('OS_ARCH'),
+                           vendor=values.get('IMPLEMENTOR'), home=str(home))
+
+    def _from_properties(self, binary: str, home: Path) -> Optional[JavaRuntime]:
+        self.probes += 1
+        try:
+            result = subprocess.run([binary, '-XshowSettings:properties', '-version'],
+                                    capture_output=True, text=True, timeout=15)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logging.info(f"Could not run {binary}: {e}")
+            return None
+        output = result.stderr + result.stdout
+        properties = dict(re.findall(r'^\s+([\w.]+) = (.*)$', output, re.MULTILINE))
+        version = properties.get('java.version')
+        if not version:
+            # Very old runtimes without -XshowSettings still print a version line
+            match = re.search(r'version "([^"]+)"', output)
+            version = match.group(1) if match else None
+        major = _major(version) if version else None
+        if result.returncode != 0 and not major:
+            return None
+        if not major:
+            return None
+        return JavaRuntime(path=binary, version=version, major=major, arch=properties.get('os.arch'),
+                           vendor=properties.get('java.vendor'), home=properties.get('java.home', str(home)))
+
+    # Selection
+
+    def select(self, minecraft_version: Optional[str] = None,
+               preferred: Optional[str] = None) -> Tuple[Optional[JavaRuntime], Optional[str]]:
+        """Pick the runtime to launch a Minecraft version with.
+
+        Returns (runtime, None), (runtime, warning), or (None, reason) when
+        nothing suitable is installed. A preferred path (the configured
+        java_path) is used whenever it meets the minimum version, with a
+        warning if it is newer than the version is known to work with; if
+        it is skipped, the warning says why. Otherwise the lowest major
+        version that satisfies the requirement wins (newer majors can break
+        older mod loaders), with 64-bit runtimes ahead of 32-bit ones for
+        the larger address space.
+        """
+        minimum, maximum = required_java(minecraft_version)
+        runtimes = self.runtimes()
+        if not runtimes:
+            return None, 'Java not found. Please install Java 8 or higher.'
+
+        wanted = f"Java {minimum}" + ("+" if maximum is None else (f"-{maximum}" if maximum != minimum else ""))
+        target = f"Minecraft {minecraft_version}" if minecraft_version else "this server"
+        warning = None
+        if preferred:
+            resolved = _resolve(preferred)
+            chosen = next((r for r in runtimes if r.path == resolved), None)
+            if not chosen:
+                warning = f"Configured Java {preferred} was skipped: it is not a working Java runtime"
+            elif chosen.major < minimum:
+                warning = f"Configured Java {preferred} was skipped: it is Java {chosen.major} and {target} needs {wanted}"
+            elif maximum is not None and chosen.major > maximum:
+                return chosen, (f"Configured Java {preferred} is Java {chosen.major}, newer than {target} is known "
+                                f"to work with ({wanted}); using it as configured")
+            else:
+                return chosen, None
+
+        fits = [r for r in runtimes if r.major >= minimum and (maximum is None or r.major <= maximum)]
+        if not fits:
+            installed = ', '.join(sorted({str(r.major) for r in runtimes}, key=int))
+            error = f"{target} needs {wanted}; installed: Java {installed}"
+            return None, f"{error}. {warning}" if warning else error
+
+        best = min(fits, key=lambda r: (r.major, not r.is_64bit, [-int(n) for n in re.findall(r'\d+', r.version)]))
+        return best, warning
+
+    def describe(self) -> Dict:
+        return {
+            'runtimes': [runtime.to_dict() for runtime in self.runtimes()],
+            'scanned_at': self._scanned_at,
+            'probes': self.probes,
+            'host_arch': platform.machine()
+        }
@@ -0,0 +1,277 @@
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+MIN_HEAP_MB = 1024
+HEAP_STEP_MB = 256
+
+# Baseline heap for a vanilla server, plus a per-mod allowance; a 200-mod pack
+# lands around 6 GB, which matches what large Forge packs need in practice
+BASE_HEAP_MB = 1536
+PER_MOD_HEAP_MB = 24
+
+# Headroom over the highest heap usage seen in earlier runs
+OBSERVED_HEADROOM = 1.3
+# Headroom over the live set (heap after GC, from the GC log). G1 needs room
+# for the young generation and to start marking well before the heap is full
+LIVE_SET_HEADROOM = 2.5
+# After an out-of-memory exit, grow at least this much over the heap that failed
+OOM_GROWTH = 1.5
+
+# Rough JVM off-heap footprint (metaspace, code cache, thread stacks) included in RSS
+NON_HEAP_ESTIMATE_MB = 512
+
+# Memory left to the OS, the JVM's off-heap usage and everything else on the host
+HOST_RESERVE_MB = 1536
+HOST_RESERVE_FRACTION = 0.15
+
+# Pre-touching only pays off for big heaps on hosts with memory to spare
+PRETOUCH_MIN_HEAP_MB = 6144
+PRETOUCH_SPARE_MB = 2048
+
+# Flag sets, chosen by heap size (Aikar's G1 settings; the large variant is his
+# recommendation for heaps of 12 GB and up)
+G1_COMMON = [
+    "-XX:+UseG1GC",
+    "-XX:+ParallelRefProcEnabled",
+    "-XX:MaxGCPauseMillis=200",
+    "-XX:+UnlockExperimentalVMOptions",
+    "-XX:+DisableExplicitGC",
+    "-XX:G1HeapWastePercent=5",
+    "-XX:G1MixedGCCountTarget=4",
+    "-XX:G1MixedGCLiveThresholdPercent=90",
+    "-XX:G1RSetUpdatingPauseTimePercent=5",
+    "-XX:SurvivorRatio=32",
+    "-XX:+PerfDisableSharedMem",
+    "-XX:MaxTenuringThreshold=1",
+]
+FLAG_SETS = {
+    'g1-small': G1_COMMON + [
+        "-XX:G1NewSizePercent=30",
+        "-XX:G1MaxNewSizePercent=40",
+        "-XX:G1HeapRegionSize=4M",
+        "-XX:G1ReservePercent=20",
+        "-XX:InitiatingHeapOccupancyPercent=15",
+    ],
+    'g1-standard': G1_COMMON + [
+        "-XX:G1NewSizePercent=30",
+        "-XX:G1MaxNewSizePercent=40",
+        "-XX:G1HeapRegionSize=8M",
+        "-XX:G1ReservePercent=20",
+        "-XX:InitiatingHeapOccupancyPercent=15",
+    ],
+    'g1-large': G1_COMMON + [
+        "-XX:G1NewSizePercent=40",
+        "-XX:G1MaxNewSizePercent=50",
+        "-XX:G1HeapRegionSize=16M",
+        "-XX:G1ReservePercent=15",
+        "-XX:InitiatingHeapOccupancyPercent=20",
+    ],
+}
+
+MEMORY_VALUE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*$', re.IGNORECASE)
+UNIT_MB = {'': 1 / (1024 * 1024), 'K': 1 / 1024, 'M': 1, 'G': 1024, 'T': 1024 * 1024}
+
+
+def parse_memory_mb(value) -> Optional[int]:
+    """Parse a JVM-style memory size ("4G", "3584M") into MB; bare numbers are MB"""
+    if value is None or value == 'auto':
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = MEMORY_VALUE.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid memory size: {value!r}")
+    number, unit = match.groups()
+    unit = unit.upper() or 'M'
+    return int(float(number) * UNIT_MB[unit])
+
+
+def format_memory(mb: int) -> str:
+    return f"{mb // 1024}G" if mb % 1024 == 0 else f"{mb}M"
+
+
+@dataclass
+class JvmPlan:
+    heap_max_mb: int
+    heap_min_mb: int
+    flag_set: str
+    pretouch: bool
+    inputs: Dict
+    reasons: List[str] = field(default_factory=list)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+
+    @property
+    def memory_args(self) -> List[str]:
+        return [f"-Xmx{format_memory(self.heap_max_mb)}", f"-Xms{format_memory(self.heap_min_mb)}"]
+
+    @property
+    def flags(self) -> List[str]:
+        flags = list(FLAG_SETS[self.flag_set])
+        if self.pretouch:
+            flags.append("-XX:+AlwaysPreTouch")
+        return flags
+
+    @property
+    def jvm_args(self) -> List[str]:
+        return self.memory_args + self.flags
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data['jvm_args'] = self.jvm_args
+        return data
+
+
+class JvmTuner:
+    """Chooses heap size and GC flags for each launch.
+
+    The heap is sized from what the server is likely to need (a baseline
+    plus an allowance per installed mod, or the live heap reported by the
+    GC log in earlier runs with headroom, falling back to their peak RSS,
+    and growing after an out-of-memory exit) and
+    then capped by the java_memory budget and by what the host can spare.
+    Each plan is appended to a JSON-lines launch log, and the outcome of the
+    run (peak heap/RSS, OOM) is appended under the same ID when it ends, so
+    later launches learn from earlier ones.
+    """
+
+    def __init__(self, history_file: Path, history_runs: int = 5):
+        self.history_file = Path(history_file)
+        self.history_file.parent.mkdir(parents=True, exist_ok=True)
+        self.history_runs = history_runs
+        self._lock = threading.Lock()
+
+    def plan(self, budget_mb: Optional[int], total_mb: Optional[int], available_mb: Optional[int],
+             mod_count: int) -> JvmPlan:
+        reasons = []
+        want = BASE_HEAP_MB + PER_MOD_HEAP_MB * mod_count
+        reasons.append(f"{mod_count} mods suggest {want} MB")
+
+        live = self.observed_live_mb()
+        observed = None if live else self.observed_peak_mb()
+        if live:
+            live_want = int(live * LIVE_SET_HEADROOM)
+            reasons.append(f"live heap of up to {live} MB after GC in recent runs suggests {live_want} MB")
+            want = max(want, live_want)
+        elif observed:
+            observed_want = int(observed * OBSERVED_HEADROOM)
+            reasons.append(f"peak heap of {observed} MB in recent runs suggests {observed_want} MB")
+            want = max(want, observed_want)
+
+        last = self.last_launch()
+        if last and last.get('oom'):
+            oom_want = int(last['heap_max_mb'] * OOM_GROWTH)
+            reasons.append(f"last run ran out of memory at {last['heap_max_mb']} MB")
+            want = max(want, oom_want)
+
+        cap = budget_mb
+        if budget_mb:
+            if want > budget_mb:
+                reasons.append(f"capped at the java_memory budget of {budget_mb} MB "
+                               f"(raise it to about {want} MB for this server)")
+        if total_mb:
+            host_cap = total_mb - max(HOST_RESERVE_MB, int(total_mb * HOST_RESERVE_FRACTION))
+            if available_mb:
+                host_cap = min(host_cap, available_mb - 512)
+            if cap is None or host_cap < cap:
+                if want > host_cap:
+                    reasons.append(f"capped at {host_cap} MB to leave memory for the host")
+                cap = host_cap
+
+        heap = want if cap is None else min(want, cap)
+        heap = max(MIN_HEAP_MB, heap // HEAP_STEP_MB * HEAP_STEP_MB)
+
+        pretouch = (heap >= PRETOUCH_MIN_HEAP_MB and available_mb is not None
+                    and available_mb >= heap + PRETOUCH_SPARE_MB)
+        # With pre-touch the whole heap is committed up front anyway, so start at full size
+        heap_min = heap if pretouch else min(heap, max(MIN_HEAP_MB, heap // 4 // HEAP_STEP_MB * HEAP_STEP_MB))
+
+        if heap >= 12288:
+            flag_set = 'g1-large'
+        elif heap >= 4096:
+            flag_set = 'g1-standard'
+        else:
+            flag_set = 'g1-small'
+
+        return JvmPlan(
+            heap_max_mb=heap,
+            heap_min_mb=heap_min,
+            flag_set=flag_set,
+            pretouch=pretouch,
+            inputs={'budget_mb': budget_mb, 'total_mb': total_mb, 'available_mb': available_mb,
+                    'mod_count': mod_count, 'observed_peak_mb': observed, 'observed_live_mb': live},
+            reasons=reasons
+        )
+
+    # Launch log
+
+    def record_launch(self, plan: JvmPlan, launcher: str):
+        self._append(dict(plan.to_dict(), type='launch', launcher=launcher, time=time.time()))
+
+    def record_result(self, launch_id: str, peak_heap_mb: Optional[float] = None,
+                      peak_rss_mb: Optional[float] = None, oom: bool = False,
+                      live_heap_mb: Optional[float] = None, gc: Optional[Dict] = None):
+        self._append({'type': 'result', 'id': launch_id, 'time': time.time(),
+                      'peak_heap_mb': peak_heap_mb, 'peak_rss_mb': peak_rss_mb, 'oom': oom,
+                      'live_heap_mb': live_heap_mb, 'gc': gc})
+
+    def _append(self, record: Dict):
+        with self._lock:
+            try:
+                with open(self.history_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            except Exception as e:
+                logging.error(f"Failed to record JVM launch: {e}")
+
+    def launches(self, limit: Optional[int] = None) -> List[Dict]:
+        """Launch records merged with their results, newest first"""
+        launches: Dict[str, Dict] = {}
+        if self.history_file.exists():
+            try:
+                with open(self.history_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        if record.get('type') == 'launch':
+                            launches[record['id']] = record
+                        elif record.get('id') in launches:
+                            result = {k: v for k, v in record.items() if k not in ('type', 'id', 'time')}
+                            launches[record['id']].update(result, ended=record['time'])
+            except Exception as e:
+                logging.warning(f"Failed to read JVM launch history: {e}")
+        ordered = sorted(launches.values(), key=lambda r: r['time'], reverse=True)
+        return ordered[:limit] if limit else ordered
+
+    def last_launch(self) -> Optional[Dict]:
+        launches = self.launches(1)
+        return launches[0] if launches else None
+
+    def observed_live_mb(self) -> Optional[int]:
+        """Largest live set (heap after GC) in recent runs that had a GC log"""
+        lives = [launch['live_heap_mb'] for launch in self.launches(self.history_runs)
+                 if launch.get('live_heap_mb')]
+        return int(max(lives)) if lives else None
+
+    def observed_peak_mb(self) -> Optional[int]:
+        """Highest heap usage in recent runs.
+
+        Uses the GC-reported peak when known. Otherwise falls back to RSS,
+        but only for runs without pre-touch, where RSS tracks heap actually
+        used rather than the whole reservation.
+        """
+        peaks = []
+        for launch in self.launches(self.history_runs):
+            if launch.get('peak_heap_mb'):
+                peaks.append(launch['peak_heap_mb'])
+            elif launch.get('peak_rss_mb') and not launch.get('pretouch'):
+                peaks.append(min(launch['peak_rss_mb'] - NON_HEAP_ESTIMATE_MB, launch['heap_max_mb']))
+        peaks = [peak for peak in peaks if peak > 0]
+        return int(max(peaks)) if peaks else None
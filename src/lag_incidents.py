@@ -0,0 +1,240 @@
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from . import console_events
+except ImportError:
+    import console_events
+
+# The server prints at most one "Can't keep up" warning per 15 seconds, so
+# warnings closer together than this belong to the same stall
+MERGE_WINDOW = 45.0
+
+# Joins this long before a stall are counted as possible triggers
+RECENT_JOIN_WINDOW = 60.0
+
+# Extra look-back before an incident when matching GC pauses, since the
+# warning is printed some time after the stall it reports
+LOOKBACK_SLACK = 5.0
+
+# A GC pause at least this long during an incident marks GC as a suspect
+LONG_GC_PAUSE_MS = 200.0
+
+# Heap after GC above this share of the committed heap marks heap pressure
+HEAP_PRESSURE_FRACTION = 0.85
+
+INCIDENTS_KEPT = 500
+
+
+class LagIncidentDetector:
+    """Groups "Can't keep up" warnings into lag incidents with their context.
+
+    An incident opens on the first overload warning and absorbs every
+    warning that follows within MERGE_WINDOW seconds of the previous one.
+    What the server was doing is captured when it opens (players online,
+    recent joins, backup or chunk pre-generation running, process memory
+    and CPU) and GC pauses in the incident window are added when it closes.
+    From that, each incident lists its suspected causes. An incident is
+    closed by a timer once merge_window passes without a warning, or right
+    away when the server exits, and then appended to a JSON-lines file.
+    """
+
+    def __init__(self, server_manager, history_file: Path, merge_window: float = MERGE_WINDOW):
+        self.server_manager = server_manager
+        self.history_file = Path(history_file)
+        self.history_file.parent.mkdir(parents=True, exist_ok=True)
+        self.merge_window = merge_window
+        self.current: Optional[Dict] = None
+        self._timer: Optional[threading.Timer] = None
+        self._recent = deque(maxlen=INCIDENTS_KEPT)
+        self._joins = deque(maxlen=100)
+        self._lock = threading.Lock()
+        self._load()
+
+        events = server_manager.events
+        events.subscribe(console_events.OVERLOAD, self.on_overload)
+        events.subscribe(console_events.JOIN, self.on_join)
+
+    def _load(self):
+        if not self.history_file.exists():
+            return
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._recent.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except Exception as e:
+            logging.warning(f"Failed to read lag incident history: {e}")
+
+    # Event handlers
+
+    def on_join(self, event):
+        self._joins.append((event.time, event.data['player']))
+
+    def on_overload(self, event):
+        behind_ms = event.data.get('ms', 0)
+        ticks = event.data.get('ticks', 0)
+        with self._lock:
+            self._close_if_quiet(event.time)
+            if self.current is None:
+                self.current = self._open(event.time)
+                self._schedule_close(self.merge_window)
+                logging.warning(f"Lag incident started: server running {behind_ms}ms behind")
+            incident = self.current
+            incident['ended'] = event.time
+            incident['warnings'] += 1
+            incident['behind_ms'] += behind_ms
+            incident['max_behind_ms'] = max(incident['max_behind_ms'], behind_ms)
+            incident['ticks_skipped'] += ticks
+
+    def _open(self, started: float) -> Dict:
+        manager = self.server_manager
+        resources = manager.sampler.latest() if manager.sampler.attached else None
+        pregen = manager.pregen_job
+        tick = manager.tick_monitor.last_sample
+        recent_joins = [player for joined, player in self._joins if started - joined <= RECENT_JOIN_WINDOW]
+        return {
+            'id': uuid.uuid4().hex[:12],
+            'started': started,
+            'ended': started,
+            'warnings': 0,
+            'behind_ms': 0,
+            'max_behind_ms': 0,
+            'ticks_skipped': 0,
+            'context': {
+                'players_online': manager.players.online_count(),
+                'recent_joins': recent_joins,
+                'backup_in_progress': manager.backup_in_progress,
+                'pregen_running': bool(pregen and pregen.active),
+                'rss_mb': resources['rss_mb'] if resources else None,
+                'cpu_percent': resources['cpu_percent'] if resources else None,
+                'heap_max_mb': manager.jvm_plan.heap_max_mb if manager.jvm_plan else None,
+                'tps': tick['dimensions'].get('overall') if tick else None
+            }
+        }
+
+    # Closing
+
+    def _close_if_quiet(self, now: float):
+        """Close the current incident once no warning has arrived for merge_window seconds"""
+        if self.current and now - self.current['ended'] > self.merge_window:
+            self._close_current()
+
+    def _schedule_close(self, delay: float):
+        self._timer = threading.Timer(delay, self._on_quiet_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_quiet_timer(self):
+        with self._lock:
+            if not self.current:
+                return
+            # Warnings since the timer was set push the close back
+            remaining = self.current['ended'] + self.merge_window - time.time()
+            if remaining > 0:
+                self._schedule_close(remaining + 0.1)
+            else:
+                self._close_current()
+
+    def close_current(self):
+        """Close the incident in progress now (the server exited, so it can't continue)"""
+        with self._lock:
+            if self.current:
+                self._close_current()
+
+    def _close_current(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        self._close(self.current)
+        self.current = None
+
+    def _close(self, incident: Dict):
+        context = incident['context']
+        # The warning is printed after the stall, so look back over the time it reports
+        stall_start = incident['started'] - incident['max_behind_ms'] / 1000.0
+        window_start = stall_start - LOOKBACK_SLACK
+        try:
+            pauses = self.server_manager.gc_log.pauses(since=window_start, limit=1000)
+            pauses = [pause for pause in pauses if pause['time'] <= incident['ended']]
+            context['gc'] = {
+                'pauses': len(pauses),
+                'total_ms': round(sum(pause['pause_ms'] for pause in pauses), 2),
+                'max_ms': round(max((pause['pause_ms'] for pause in pauses), default=0), 2),
+                'heap_after_mb': pauses[0]['after_mb'] if pauses else None,
+                'heap_committed_mb': pauses[0]['total_mb'] if pauses else None
+            }
+        except Exception as e:
+            logging.debug(f"No GC data for lag incident: {e}")
+            context['gc'] = None
+
+        incident['duration'] = round(incident['ended'] - stall_start, 1)
+        incident['suspects'] = self._suspects(incident)
+        logging.warning(f"Lag incident ended: {incident['warnings']} warnings, {incident['behind_ms']}ms behind"
+                        f"{' (suspects: ' + ', '.join(incident['suspects']) + ')' if incident['suspects'] else ''}")
+
+        self._recent.append(incident)
+        try:
+            with open(self.history_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(incident, separators=(',', ':')) + '\n')
+        except Exception as e:
+            logging.error(f"Failed to record lag incident {incident['id']}: {e}")
+
+    @staticmethod
+    def _suspects(incident: Dict) -> List[str]:
+        context = incident['context']
+        suspects = []
+        if context['backup_in_progress']:
+            suspects.append('backup')
+        if context['pregen_running']:
+            suspects.append('chunk_pregen')
+        if context['recent_joins']:
+            suspects.append('player_join')
+        gc = context.get('gc')
+        if gc and gc['pauses']:
+            if gc['max_ms'] >= LONG_GC_PAUSE_MS or gc['total_ms'] >= 0.25 * incident['behind_ms']:
+                suspects.append('gc_pause')
+            if gc['heap_committed_mb'] and gc['heap_after_mb'] >= HEAP_PRESSURE_FRACTION * gc['heap_committed_mb']:
+                suspects.append('heap_pressure')
+        return suspects
+
+    # Reporting
+
+    def list(self, limit: Optional[int] = None, since: Optional[float] = None) -> List[Dict]:
+        """Closed incidents plus the one in progress, newest first"""
+        with self._lock:
+            self._close_if_quiet(time.time())
+            incidents = list(reversed(self._recent))
+            if self.current:
+                incidents.insert(0, dict(self.current, in_progress=True))
+        if since is not None:
+            incidents = [incident for incident in incidents if incident['started'] > since]
+        return incidents[:limit] if limit else incidents
+
+    def get(self, incident_id: str) -> Optional[Dict]:
+        for incident in self.list():
+            if incident['id'] == incident_id:
+                return incident
+        return None
+
+    def summary(self, since: Optional[float] = None) -> Dict:
+        """Incident counts and how often each suspect shows up"""
+        incidents = [incident for incident in self.list(since=since) if not incident.get('in_progress')]
+        suspects: Dict[str, int] = {}
+        for incident in incidents:
+            for suspect in incident.get('suspects', []):
+                suspects[suspect] = suspects.get(suspect, 0) + 1
+        return {
+            'incidents': len(incidents),
+            'total_behind_ms': sum(incident['behind_ms'] for incident in incidents),
+            'unexplained': sum(1 for incident in incidents if not incident.get('suspects')),
+            'suspects': dict(sorted(suspects.items(), key=lambda item: item[1], reverse=True))
+        }
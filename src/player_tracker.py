@@ -0,0 +1,153 @@
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from dataclasses import dataclass
+
+
+@dataclass
+class PlayerSession:
+    name: str
+    joined_at: float
+    left_at: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        """Length of the session in seconds (so far, if still online)"""
+        end = self.left_at if self.left_at is not None else time.time()
+        return max(0.0, end - self.joined_at)
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'joined_at': self.joined_at,
+            'left_at': self.left_at,
+            'duration': round(self.duration, 1)
+        }
+
+
+class PlayerTracker:
+    """Tracks the online roster and an append-only history of play sessions.
+
+    The roster is a dict keyed by player name, so membership checks are O(1).
+    Each finished session is appended to a JSON-lines file as one short record
+    ({"p": name, "s": start, "e": end}); per-player totals are kept in memory
+    so playtime questions never require scanning server logs.
+    """
+
+    def __init__(self, history_file: Path):
+        self.history_file = Path(history_file)
+        self.history_file.parent.mkdir(parents=True, exist_ok=True)
+        self._online: Dict[str, PlayerSession] = {}
+        self._totals: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._load_totals()
+
+    def _load_totals(self):
+        """Build per-player totals from the session history once at startup"""
+        for record in self._iter_history():
+            self._add_to_totals(record['p'], record['s'], record['e'])
+
+    def _add_to_totals(self, name: str, start: float, end: float):
+        totals = self._totals.setdefault(name, {'sessions': 0, 'playtime': 0.0, 'first_seen': start, 'last_seen': end})
+        totals['sessions'] += 1
+        totals['playtime'] += max(0.0, end - start)
+        totals['first_seen'] = min(totals['first_seen'], start)
+        totals['last_seen'] = max(totals['last_seen'], end)
+
+    def _iter_history(self):
+        if not self.history_file.exists():
+            return
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except Exception as e:
+            logging.warning(f"Failed to read session history: {e}")
+
+    def _append_history(self, session: PlayerSession):
+        record = {'p': session.name, 's': round(session.joined_at, 1), 'e': round(session.left_at, 1)}
+        try:
+            with open(self.history_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, separators=(',', ':')) + '\n')
+        except Exception as e:
+            logging.error(f"Failed to record session for {session.name}: {e}")
+
+    def player_joined(self, name: str, when: Optional[float] = None):
+        """Start a session for a player"""
+        with self._lock:
+            if name in self._online:
+                return
+            self._online[name] = PlayerSession(name=name, joined_at=when or time.time())
+
+    def player_left(self, name: str, when: Optional[float] = None):
+        """End a player's session and record it"""
+        with self._lock:
+            session = self._online.pop(name, None)
+            if not session:
+                return
+            session.left_at = when or time.time()
+            self._add_to_totals(session.name, session.joined_at, session.left_at)
+        self._append_history(session)
+
+    def end_all_sessions(self, when: Optional[float] = None):
+        """Close every open session, e.g. when the server stops or dies"""
+        with self._lock:
+            names = list(self._online)
+        for name in names:
+            self.player_left(name, when)
+
+    def on_join(self, event):
+        """Console event handler for player joins"""
+        self.player_joined(event.data['player'], event.time)
+
+    def on_leave(self, event):
+        """Console event handler for player leaves"""
+        self.player_left(event.data['player'], event.time)
+
+    def is_online(self, name: str) -> bool:
+        return name in self._online
+
+    def online_count(self) -> int:
+        return len(self._online)
+
+    def get_online_players(self) -> List[Dict]:
+        """Get the current roster with per-session start times"""
+        with self._lock:
+            sessions = list(self._online.values())
+        return [session.to_dict() for session in sorted(sessions, key=lambda s: s.joined_at)]
+
+    def get_sessions(self, player: Optional[str] = None, since: Optional[float] = None,
+                     until: Optional[float] = None, limit: int = 100) -> List[Dict]:
+        """Get recorded sessions (newest first), optionally filtered by player and time window"""
+        sessions = []
+        for record in self._iter_history():
+            if player and record['p'] != player:
+                continue
+            if since is not None and record['e'] < since:
+                continue
+            if until is not None and record['s'] > until:
+                continue
+            sessions.append(PlayerSession(name=record['p'], joined_at=record['s'], left_at=record['e']).to_dict())
+
+        sessions.reverse()
+        return sessions[:limit]
+
+    def get_player_stats(self) -> Dict[str, Dict]:
+        """Get session count, total playtime and first/last seen per player"""
+        with self._lock:
+            stats = {name: dict(totals) for name, totals in self._totals.items()}
+            for session in self._online.values():
+                totals = stats.setdefault(session.name, {'sessions': 0, 'playtime': 0.0,
+                                                         'first_seen': session.joined_at,
+                                                         'last_seen': session.joined_at})
+                totals['playtime'] += session.duration
+                totals['last_seen'] = time.time()
+        for totals in stats.values():
+            totals['playtime'] = round(totals['playtime'], 1)
+        return stats
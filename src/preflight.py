@@ -0,0 +1,194 @@
+import os
+import time
+import socket
+import logging
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, List, Optional
+
+# Check severities: an error stops the launch, a warning is only reported
+ERROR = 'error'
+WARNING = 'warning'
+
+
+def port_available(port: int, udp: bool = False) -> bool:
+    """Whether a local port can be bound right now"""
+    kind = socket.SOCK_DGRAM if udp else socket.SOCK_STREAM
+    with socket.socket(socket.AF_INET, kind) as probe:
+        # Match the JVM, which sets SO_REUSEADDR on POSIX (on Windows it would let us steal the port)
+        if os.name != 'nt' and not udp:
+            probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            probe.bind(('', port))
+            return True
+        except OSError:
+            return False
+
+
+@dataclass
+class CheckResult:
+    name: str
+    ok: bool
+    message: str
+    severity: str = ERROR
+    duration_ms: float = 0.0
+    details: Dict = field(default_factory=dict)
+
+
+class PreflightReport:
+    """Merged results of one pre-flight run, plus what the launch needs from it"""
+
+    def __init__(self, prepare: bool):
+        self.prepare = prepare
+        self.started = time.time()
+        self.duration_ms = 0.0
+        self.checks: Dict[str, CheckResult] = {}
+        self.server_jar = None
+        self.java_info: Optional[Dict] = None
+        self.memory_info: Optional[Dict] = None
+
+    def add(self, result: CheckResult):
+        self.checks[result.name] = result
+
+    @property
+    def ok(self) -> bool:
+        return all(check.ok for check in self.checks.values() if check.severity == ERROR)
+
+    @property
+    def failed(self) -> List[str]:
+        return [check.name for check in self.checks.values() if not check.ok and check.severity == ERROR]
+
+    def issues(self) -> List[str]:
+        return [check.message for check in self.checks.values() if not check.ok]
+
+    def summary(self) -> str:
+        issues = self.issues()
+        return "Issues found: " + "; ".join(issues) if issues else "All pre-flight checks passed"
+
+    def to_dict(self) -> Dict:
+        return {
+            'ok': self.ok,
+            'prepare': self.prepare,
+            'started': self.started,
+            'duration_ms': self.duration_ms,
+            'failed': self.failed,
+            'issues': self.issues(),
+            'checks': {name: asdict(check) for name, check in self.checks.items()}
+        }
+
+
+def _timed(name: str, check: Callable[[], CheckResult], phase) -> Callable[[], CheckResult]:
+    def run() -> CheckResult:
+        started = time.perf_counter()
+        try:
+            with phase(name):
+                result = check()
+        except Exception as e:
+            logging.error(f"Pre-flight check {name} failed: {e}")
+            result = CheckResult(name, False, f"{name} check failed: {e}")
+        result.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        return result
+    return run
+
+
+def run_preflight(server_manager, prepare: bool = True, phase=None) -> PreflightReport:
+    """Run the start_server pre-flight checks concurrently and merge them into one report.
+
+    The directory check runs first since the others read and write inside
+    it, and the run stops there if it fails. The JAR search and validation,
+    the Java runtime scan, writing server.properties, the resource, port and
+    memory budget checks then run side by side; the Java runtime is picked
+    once the JAR's Minecraft version is known. With prepare=False nothing is
+    installed or written (the directory is only checked for access), which
+    is what the diagnostics pages use. phase, if given, wraps each check
+    (start_server passes the startup profiler's).
+    """
+    manager = server_manager
+    phase = phase or (lambda name: nullcontext())
+    report = PreflightReport(prepare)
+    started = time.perf_counter()
+
+    def directory() -> CheckResult:
+        if prepare:
+            problem = manager._server_directory_problem()
+        elif not manager.server_dir.is_dir():
+            problem = f"Server directory {manager.server_dir} does not exist"
+        elif not os.access(manager.server_dir, os.W_OK | os.X_OK):
+            problem = "No write permission to server directory"
+        else:
+            problem = None
+        return CheckResult('directory', not problem, problem or f"Server directory {manager.server_dir} is writable")
+
+    def server_jar() -> CheckResult:
+        jar = manager.find_server_jar()
+        if not jar and prepare:
+            logging.info("No server JAR found. Attempting to install Forge...")
+            if manager.install_forge():
+                jar = manager.find_server_jar()
+            else:
+                logging.error("Failed to install Forge automatically")
+        if not jar:
+            return CheckResult('server_jar', False, "No server JAR found - please install Forge first")
+        report.server_jar = jar
+        problem = manager._server_jar_problem(jar)
+        return CheckResult('server_jar', not problem, problem or f"Server JAR {jar.name} is valid",
+                           details={'path': str(jar)})
+
+    def java_scan() -> CheckResult:
+        # Only warms the runtime registry; whether a runtime fits is the java check's verdict
+        runtimes = manager.java_runtimes.runtimes()
+        return CheckResult('java_scan', True, f"{len(runtimes)} Java runtime(s) found", severity=WARNING,
+                           details={'versions': [runtime.version for runtime in runtimes]})
+
+    def properties() -> CheckResult:
+        problem = manager._write_server_properties()
+        return CheckResult('properties', not problem, problem or "server.properties written")
+
+    def ports() -> CheckResult:
+        if manager.is_running:
+            return CheckResult('ports', True, "Ports are held by the running server")
+        problem = manager._port_problem()
+        return CheckResult('ports', not problem, problem or "Game and RCON ports are free")
+
+    def memory_budget() -> CheckResult:
+        problem = manager._memory_budget_problem()
+        return CheckResult('memory_budget', not problem, problem or "Fits in the host's memory alongside other instances")
+
+    def resources() -> CheckResult:
+        info = report.memory_info = manager._check_system_resources()
+        return CheckResult('resources', info['sufficient'], info['message'], severity=WARNING,
+                           details={key: value for key, value in info.items() if key not in ('sufficient', 'message')})
+
+    report.add(_timed('directory', directory, phase)())
+    if not report.checks['directory'].ok:
+        report.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        return report
+
+    tasks = {'server_jar': server_jar, 'java_scan': java_scan, 'resources': resources, 'ports': ports,
+             'memory_budget': memory_budget}
+    if prepare:
+        tasks['properties'] = properties
+    with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix='preflight') as pool:
+        futures = [pool.submit(_timed(name, check, phase)) for name, check in tasks.items()]
+        for future in futures:
+            report.add(future.result())
+
+    def java() -> CheckResult:
+        minecraft_version = manager._minecraft_version_of(report.server_jar) if report.server_jar else None
+        info = report.java_info = manager._check_java_installation(minecraft_version)
+        if not info['available']:
+            return CheckResult('java', False, info['error'])
+        return CheckResult('java', True, f"Using Java {info['version']} ({info['arch']}) at {info['path']}",
+                           details=dict(info, minecraft_version=minecraft_version))
+
+    # Picking from the scanned runtimes is quick, so the scan's time is the Java check's cost
+    report.add(_timed('java', java, phase)())
+    # A configured java_path that was skipped, or used outside its known-good range
+    warning = (report.java_info or {}).get('warning')
+    if warning:
+        logging.warning(warning)
+        report.add(CheckResult('java_path', False, warning, severity=WARNING))
+
+    report.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    return report
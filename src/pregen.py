@@ -0,0 +1,304 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    from . import console_events
+    from . import region_files
+except ImportError:
+    import console_events
+    import region_files
+
+# Job states
+PENDING = 'pending'
+RUNNING = 'running'
+PAUSED = 'paused'
+COMPLETED = 'completed'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+DIMENSION_FOLDERS = {
+    'minecraft:overworld': '',
+    'minecraft:the_nether': 'DIM-1',
+    'minecraft:the_end': 'DIM1',
+}
+
+# Vanilla refuses to forceload more than 256 chunks in one command
+MAX_TILE_SIZE = 16
+
+# Without "execute if loaded", how often to save and re-read the tile's region files
+SAVE_POLL_INTERVAL = 5.0
+
+
+def spiral_tiles(center: Tuple[int, int], radius: int, tile_size: int) -> Iterator[Tuple[int, int, int, int]]:
+    """Yield (min_x, min_z, max_x, max_z) chunk tiles covering the square of
+    radius chunks around center, nearest rings first"""
+    cx, cz = center
+    rings = (radius + tile_size - 1) // tile_size
+    origin_x = cx - tile_size // 2
+    origin_z = cz - tile_size // 2
+    for ring in range(rings + 1):
+        for tx in range(-ring, ring + 1):
+            for tz in range(-ring, ring + 1):
+                if max(abs(tx), abs(tz)) != ring:
+                    continue
+                min_x = max(origin_x + tx * tile_size, cx - radius)
+                min_z = max(origin_z + tz * tile_size, cz - radius)
+                max_x = min(origin_x + (tx + 1) * tile_size - 1, cx + radius)
+                max_z = min(origin_z + (tz + 1) * tile_size - 1, cz + radius)
+                if min_x <= max_x and min_z <= max_z:
+                    yield min_x, min_z, max_x, max_z
+
+
+class PregenJob:
+    """Pre-generates the chunks around a point by driving the server's commands.
+
+    Chunks are generated a tile at a time: the tile is force-loaded, which
+    makes the server generate it, checked until every chunk is ready, and
+    released again. Chunks are checked with "execute if loaded"; where the
+    server can't answer that (older versions, or commands going over stdin
+    without output) the world is saved and the tile's region files are
+    re-read instead. Only verified chunks count as generated, and a tile
+    with chunks neither check could confirm fails the job. Between tiles the job waits
+    batch_delay seconds, and it pauses while players are online (so it only
+    uses idle capacity) or after the server reports "Can't keep up", the
+    server's own signal that tick time has degraded. Chunks already on disk
+    are skipped, so a cancelled job picks up where it left off.
+    """
+
+    def __init__(self, server_manager, radius: int, center: Tuple[int, int] = (0, 0),
+                 dimension: str = 'minecraft:overworld', tile_size: int = 8, batch_delay: float = 2.0,
+                 pause_when_players: bool = True, overload_cooldown: float = 60.0, tile_timeout: float = 120.0):
+        self.server_manager = server_manager
+        self.radius = radius
+        self.center = center
+        self.dimension = dimension
+        self.tile_size = max(1, min(tile_size, MAX_TILE_SIZE))
+        self.batch_delay = batch_delay
+        self.pause_when_players = pause_when_players
+        self.overload_cooldown = overload_cooldown
+        self.tile_timeout = tile_timeout
+
+        self.state = PENDING
+        self.pause_reason: Optional[str] = None
+        self.error: Optional[str] = None
+        self.chunks_total = (2 * radius + 1) ** 2
+        self.chunks_done = 0
+        self.chunks_skipped = 0
+        self.tiles_done = 0
+        self.generating_seconds = 0.0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+        self._last_overload = 0.0
+        self._user_paused = False
+        self._cancel = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._verify_loaded = True
+
+    # Control
+
+    def start(self):
+        self.state = RUNNING
+        self.started = time.time()
+        self.server_manager.events.subscribe(console_events.OVERLOAD, self._on_overload)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def pause(self):
+        self._user_paused = True
+
+    def resume(self):
+        self._user_paused = False
+        self._wake.set()
+
+    def cancel(self):
+        self._cancel.set()
+        self._wake.set()
+
+    @property
+    def active(self) -> bool:
+        return self.state in (PENDING, RUNNING, PAUSED)
+
+    def _on_overload(self, event):
+        self._last_overload = event.time
+
+    # Work
+
+    def _run(self):
+        try:
+            existing = self._existing_chunks()
+            for tile in spiral_tiles(self.center, self.radius, self.tile_size):
+                chunks = self._tile_chunks(tile)
+                missing = [chunk for chunk in chunks if chunk not in existing]
+                self.chunks_skipped += len(chunks) - len(missing)
+                if missing:
+                    if not self._wait_until_clear():
+                        break
+                    self._generate_tile(tile, missing)
+                    if self._cancel.wait(self.batch_delay):
+                        break
+                self.tiles_done += 1
+
+            self.state = CANCELLED if self._cancel.is_set() else COMPLETED
+        except Exception as e:
+            logging.error(f"Chunk pre-generation failed: {e}")
+            self.error = str(e)
+            self.state = FAILED
+        finally:
+            self.finished = time.time()
+            self.server_manager.events.unsubscribe(console_events.OVERLOAD, self._on_overload)
+            logging.info(f"Chunk pre-generation {self.state}: {self.chunks_done} chunks generated, "
+                         f"{self.chunks_skipped} already present")
+
+    def _dimension_dir(self):
+        folder = DIMENSION_FOLDERS.get(self.dimension)
+        if folder is None:
+            namespace, _, path = self.dimension.partition(':')
+            folder = f"dimensions/{namespace}/{path}"
+        return self.server_manager.world_dir / folder if folder else self.server_manager.world_dir
+
+    def _existing_chunks(self) -> Set[Tuple[int, int]]:
+        """Chunks already saved in the dimension's region files"""
+        existing = set()
+        for region in region_files.iter_region_files(self._dimension_dir()):
+            try:
+                existing.update((c.x, c.z) for c in region.chunks(read_fields=False))
+            except OSError:
+                continue
+        return existing
+
+    def _saved_chunks(self, chunks: List[Tuple[int, int]]) -> Set[Tuple[int, int]]:
+        """Which of chunks are saved, reading only the region files they fall in"""
+        wanted = set(chunks)
+        saved = set()
+        region_dir = self._dimension_dir() / "region"
+        for rx, rz in {(x >> 5, z >> 5) for x, z in chunks}:
+            path = region_dir / f"r.{rx}.{rz}.mca"
+            if not path.exists():
+                continue
+            try:
+                saved.update((c.x, c.z) for c in region_files.RegionFile(path).chunks(read_fields=False)
+                             if (c.x, c.z) in wanted)
+            except OSError:
+                continue
+        return saved
+
+    def _tile_chunks(self, tile) -> List[Tuple[int, int]]:
+        min_x, min_z, max_x, max_z = tile
+        return [(x, z) for x in range(min_x, max_x + 1) for z in range(min_z, max_z + 1)]
+
+    def _pause_reason(self) -> Optional[str]:
+        if self._user_paused:
+            return 'paused by user'
+        if not self.server_manager.is_running:
+            return 'server not running'
+        if self.pause_when_players and self.server_manager.players.online_count() > 0:
+            return 'players online'
+        if time.time() - self._last_overload < self.overload_cooldown:
+            return 'server overloaded'
+        return None
+
+    def _wait_until_clear(self) -> bool:
+        """Block while the job should be paused; False if it was cancelled"""
+        while not self._cancel.is_set():
+            reason = self._pause_reason()
+            if not reason:
+                self.state = RUNNING
+                self.pause_reason = None
+                return True
+            if self.state != PAUSED:
+                logging.info(f"Chunk pre-generation paused: {reason}")
+            self.state = PAUSED
+            self.pause_reason = reason
+            self._wake.wait(5)
+            self._wake.clear()
+        return False
+
+    def _command(self, command: str) -> Optional[str]:
+        return self.server_manager.execute_command(f"execute in {self.dimension} {command}")
+
+    def _generate_tile(self, tile, chunks: List[Tuple[int, int]]):
+        min_x, min_z, max_x, max_z = tile
+        started = time.time()
+        area = f"{min_x * 16} {min_z * 16} {max_x * 16 + 15} {max_z * 16 + 15}"
+        self._command(f"run forceload add {area}")
+        try:
+            verified = self._wait_for_chunks(chunks)
+        finally:
+            self._command(f"run forceload remove {area}")
+        self.generating_seconds += time.time() - started
+        self.chunks_done += len(verified)
+
+        unverified = len(chunks) - len(verified)
+        if unverified and not self._cancel.is_set():
+            raise RuntimeError(f"{unverified} of {len(chunks)} chunks in tile {min_x},{min_z} to {max_x},{max_z} "
+                               f"could not be verified as generated within {self.tile_timeout:.0f}s")
+
+    def _wait_for_chunks(self, chunks: List[Tuple[int, int]]) -> Set[Tuple[int, int]]:
+        """Poll until every chunk in the tile is verified, or the tile times out; returns the verified chunks"""
+        deadline = time.time() + self.tile_timeout
+        pending = list(chunks)
+        verified: Set[Tuple[int, int]] = set()
+        # The RCON pool spreads the per-chunk checks over its connections
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            while pending and time.time() < deadline and not self._cancel.is_set():
+                if self._verify_loaded:
+                    results = list(executor.map(self._is_loaded, pending))
+                    if any(result is None for result in results):
+                        logging.info("Chunk pre-generation: \"execute if loaded\" unavailable, "
+                                     "checking region files instead")
+                        self._verify_loaded = False
+                        continue
+                    ready = {chunk for chunk, loaded in zip(pending, results) if loaded}
+                    interval = 0.5
+                else:
+                    ready = self._saved_since_flush(pending)
+                    interval = 0
+                verified |= ready
+                pending = [chunk for chunk in pending if chunk not in ready]
+                if pending and interval:
+                    self._cancel.wait(interval)
+        if pending and not self._cancel.is_set():
+            logging.warning(f"Chunk pre-generation: {len(pending)} chunks not verified after {self.tile_timeout}s")
+        return verified
+
+    def _saved_since_flush(self, chunks: List[Tuple[int, int]]) -> Set[Tuple[int, int]]:
+        """Save the world, give it time to write, and read back which chunks reached the region files"""
+        # A save during a backup's save-off window would break the snapshot
+        if not self.server_manager.backup_in_progress:
+            self.server_manager.execute_command("save-all")
+        self._cancel.wait(SAVE_POLL_INTERVAL)
+        return self._saved_chunks(chunks)
+
+    def _is_loaded(self, chunk: Tuple[int, int]) -> Optional[bool]:
+        """True/False from "execute if loaded", or None if the server can't answer"""
+        output = self._command(f"if loaded {chunk[0] * 16} 0 {chunk[1] * 16}")
+        if output is None or 'Unknown' in output or 'Incorrect' in output:
+            return None
+        return 'passed' in output
+
+    # Reporting
+
+    def get_status(self) -> Dict:
+        elapsed = ((self.finished or time.time()) - self.started) if self.started else 0
+        rate = self.chunks_done / self.generating_seconds if self.generating_seconds else 0
+        remaining = self.chunks_total - self.chunks_done - self.chunks_skipped
+        return {
+            'state': self.state,
+            'pause_reason': self.pause_reason,
+            'error': self.error,
+            'dimension': self.dimension,
+            'center': list(self.center),
+            'radius': self.radius,
+            'chunks_total': self.chunks_total,
+            'chunks_done': self.chunks_done,
+            'chunks_skipped': self.chunks_skipped,
+            'progress': round(100.0 * (self.chunks_done + self.chunks_skipped) / self.chunks_total, 2),
+            'chunks_per_second': round(rate, 2),
+            'eta_seconds': round(remaining / rate) if rate and self.active else None,
+            'elapsed': round(elapsed, 1)
+        }
@@ -0,0 +1,212 @@
+import math
+import time
+import logging
+import threading
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+FIELDS = ('rss_mb', 'cpu_percent', 'threads', 'open_fds', 'read_bps', 'write_bps')
+
+# (name, bucket seconds, capacity). With the default 1s interval this keeps
+# 10 minutes at full resolution, 2 hours at 10s and a day at 1 minute.
+RESOLUTIONS = (
+    ('raw', None, 600),
+    ('10s', 10, 720),
+    ('1m', 60, 1440),
+)
+
+
+class MetricRing:
+    """Fixed-capacity ring buffer of samples, stored column-wise in flat
+    float arrays (8 bytes per value) rather than per-sample dicts"""
+
+    def __init__(self, fields: Sequence[str], capacity: int):
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self._times = array('d', bytes(8 * capacity))
+        self._columns = [array('d', bytes(8 * capacity)) for _ in self.fields]
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def append(self, timestamp: float, values: Sequence[float]):
+        with self._lock:
+            slot = self._count % self.capacity
+            self._times[slot] = timestamp
+            for column, value in zip(self._columns, values):
+                column[slot] = value
+            self._count += 1
+
+    def _row(self, slot: int) -> Dict:
+        row = {'time': self._times[slot]}
+        for name, column in zip(self.fields, self._columns):
+            value = column[slot]
+            row[name] = None if math.isnan(value) else round(value, 2)
+        return row
+
+    def read(self, since: Optional[float] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Samples newer than since, oldest first (at most the newest limit)"""
+        with self._lock:
+            first = max(0, self._count - self.capacity)
+            slots = [i % self.capacity for i in range(first, self._count)]
+            if since is not None:
+                slots = [slot for slot in slots if self._times[slot] > since]
+            if limit:
+                slots = slots[-limit:]
+            return [self._row(slot) for slot in slots]
+
+    def latest(self) -> Optional[Dict]:
+        with self._lock:
+            if not self._count:
+                return None
+            return self._row((self._count - 1) % self.capacity)
+
+
+class _Downsampler:
+    """Averages samples into fixed time buckets and appends each finished bucket to a ring"""
+
+    def __init__(self, ring: MetricRing, step: float):
+        self.ring = ring
+        self.step = step
+        self._bucket = None
+        self._sums = [0.0] * len(ring.fields)
+        self._counts = [0] * len(ring.fields)
+
+    def add(self, timestamp: float, values: Sequence[float]):
+        bucket = int(timestamp // self.step)
+        if self._bucket is not None and bucket != self._bucket:
+            self._flush()
+        self._bucket = bucket
+        for i, value in enumerate(values):
+            if not math.isnan(value):
+                self._sums[i] += value
+                self._counts[i] += 1
+
+    def _flush(self):
+        averages = [s / c if c else math.nan for s, c in zip(self._sums, self._counts)]
+        self.ring.append(self._bucket * self.step, averages)
+        self._sums = [0.0] * len(self._sums)
+        self._counts = [0] * len(self._counts)
+
+
+class ProcessSampler:
+    """Samples one process's resource usage on a background thread.
+
+    A single psutil.Process handle is kept for the life of the process, so
+    CPU percentages are measured between consecutive samples and nothing is
+    re-resolved per request. Readers only ever touch the ring buffers.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.rings = {name: MetricRing(FIELDS, capacity) for name, _, capacity in RESOLUTIONS}
+        self._downsamplers = [_Downsampler(self.rings[name], step) for name, step, _ in RESOLUTIONS if step]
+        self._process = None
+        self._last_io = None
+        self.peak_rss_mb: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return psutil is not None
+
+    @property
+    def attached(self) -> bool:
+        return self._process is not None
+
+    def attach(self, pid: int):
+        """Start sampling a process"""
+        if not psutil:
+            logging.info("psutil not available; server resource sampling disabled")
+            return
+        with self._lock:
+            try:
+                self._process = psutil.Process(pid)
+                # Prime the CPU counter; the first call always returns 0
+                self._process.cpu_percent(None)
+            except psutil.Error as e:
+                logging.warning(f"Cannot sample process {pid}: {e}")
+                self._process = None
+                return
+            self._last_io = None
+            self.peak_rss_mb = None
+            if not self._thread or not self._thread.is_alive() or self._stop.is_set():
+                # Each thread gets its own stop event so a re-attach never races a stopping thread
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,), daemon=True)
+                self._thread.start()
+
+    def detach(self):
+        """Stop sampling; history is kept"""
+        with self._lock:
+            self._process = None
+            self._stop.set()
+
+    def _run(self, stop: threading.Event):
+        while not stop.wait(self.interval):
+            process = self._process
+            if not process:
+                continue
+            try:
+                values = self._sample(process)
+            except psutil.NoSuchProcess:
+                with self._lock:
+                    if self._process is process:
+                        self._process = None
+                        stop.set()
+                break
+            except psutil.Error as e:
+                logging.debug(f"Resource sample failed: {e}")
+                continue
+            now = time.time()
+            self.peak_rss_mb = max(self.peak_rss_mb or 0.0, values[0])
+            self.rings['raw'].append(now, values)
+            for downsampler in self._downsamplers:
+                downsampler.add(now, values)
+
+    def _sample(self, process) -> List[float]:
+        with process.oneshot():
+            rss = process.memory_info().rss / (1024 * 1024)
+            cpu = process.cpu_percent(None)
+            threads = process.num_threads()
+            fds = self._optional(process, 'num_fds') or self._optional(process, 'num_handles')
+            io = self._optional(process, 'io_counters')
+
+        read_bps = write_bps = math.nan
+        now = time.time()
+        if io is not None:
+            if self._last_io:
+                last_time, last_io = self._last_io
+                elapsed = max(now - last_time, 1e-6)
+                read_bps = (io.read_bytes - last_io.read_bytes) / elapsed
+                write_bps = (io.write_bytes - last_io.write_bytes) / elapsed
+            self._last_io = (now, io)
+        return [rss, cpu, threads, math.nan if fds is None else fds, read_bps, write_bps]
+
+    @staticmethod
+    def _optional(process, method: str):
+        # num_fds is POSIX-only, num_handles Windows-only, io_counters missing on macOS
+        if not hasattr(process, method):
+            return None
+        try:
+            return getattr(process, method)()
+        except (psutil.AccessDenied, NotImplementedError):
+            return None
+
+    def latest(self) -> Optional[Dict]:
+        return self.rings['raw'].latest()
+
+    def history(self, resolution: str = 'raw', since: Optional[float] = None,
+                limit: Optional[int] = None) -> List[Dict]:
+        if resolution not in self.rings:
+            raise ValueError(f"Unknown resolution {resolution!r}; choose from {', '.join(self.rings)}")
+        return self.rings[resolution].read(since, limit)
@@ -0,0 +1,286 @@
+import socket
+import struct
+import logging
+import threading
+import itertools
+from typing import List, Optional, Callable
+
+# Source RCON packet types used by Minecraft
+PACKET_RESPONSE = 0
+PACKET_COMMAND = 2
+PACKET_LOGIN = 3
+
+# Packet type the server doesn't understand; its reply marks the end of a
+# (possibly fragmented) command response
+PACKET_SENTINEL = 100
+
+MAX_PAYLOAD = 4096
+
+# Vanilla and Forge read at most this much per packet and expect exactly one packet per read
+MAX_READ = 1460
+
+
+class RconError(Exception):
+    """Raised when an RCON connection or command fails"""
+
+
+class RconTimeout(RconError):
+    """Raised when a command gets no complete reply in time; it may still have run"""
+
+
+def encode_packet(request_id: int, packet_type: int, payload: str) -> bytes:
+    body = struct.pack('<ii', request_id, packet_type) + payload.encode('utf-8') + b'\x00\x00'
+    return struct.pack('<i', len(body)) + body
+
+
+def read_packet(sock: socket.socket):
+    """Read one packet, returning (request_id, type, payload)"""
+    header = _recv_exact(sock, 4)
+    length = struct.unpack('<i', header)[0]
+    if length < 10 or length > MAX_PAYLOAD + 1024:
+        raise RconError(f"Invalid RCON packet length: {length}")
+    body = _recv_exact(sock, length)
+    request_id, packet_type = struct.unpack('<ii', body[:8])
+    payload = body[8:-2].decode('utf-8', errors='replace')
+    return request_id, packet_type, payload
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise RconError("RCON connection closed")
+        data += chunk
+    return data
+
+
+class RconClient:
+    """Persistent RCON connection running one command at a time.
+
+    Vanilla and Forge read a single chunk of at most 1460 bytes per packet
+    and drop the connection if it holds more than one, so nothing is
+    pipelined: a command is sent, its first response packet is awaited,
+    and only then is a sentinel packet sent. Responses split over several
+    packets are reassembled up to the sentinel's reply. Callers on other
+    threads queue for the connection; RconPool spreads them over several.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 25575, password: str = '', timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.sock: Optional[socket.socket] = None
+        self._ids = itertools.count(1)
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+        self._command_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self.sock is not None
+
+    @property
+    def pending_count(self) -> int:
+        """Commands running or queued on this connection"""
+        return self._waiting
+
+    def connect(self):
+        """Open the connection and authenticate"""
+        with self._state_lock:
+            if self.sock:
+                return
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            try:
+                login_id = next(self._ids)
+                sock.sendall(encode_packet(login_id, PACKET_LOGIN, self.password))
+                request_id, _, _ = read_packet(sock)
+                if request_id == -1:
+                    raise RconError("RCON authentication failed")
+                if request_id != login_id:
+                    raise RconError(f"Unexpected RCON login reply id {request_id}")
+            except Exception:
+                sock.close()
+                raise
+            self.sock = sock
+            logging.info(f"RCON connected to {self.host}:{self.port}")
+
+    def close(self):
+        """Close the connection; a command running on it fails"""
+        with self._state_lock:
+            sock, self.sock = self.sock, None
+        if sock:
+            try:
+                sock.close()
+            except Exception:
+                pass
+
+    def command(self, command: str, timeout: Optional[float] = None) -> str:
+        """Run a command and return its output"""
+        with self._waiting_lock:
+            self._waiting += 1
+        try:
+            with self._command_lock:
+                if not self.sock:
+                    self.connect()
+                sock = self.sock
+                if not sock:
+                    raise RconError("RCON not connected")
+                try:
+                    return self._exchange(sock, command, timeout or self.timeout)
+                except socket.timeout:
+                    # Whatever the server still sends for this command would be read as the next one's reply
+                    self.close()
+                    raise RconTimeout(f"RCON command timed out: {command}")
+                except (RconError, OSError) as e:
+                    self.close()
+                    raise RconError(f"RCON command failed: {e}")
+        finally:
+            with self._waiting_lock:
+                self._waiting -= 1
+
+    def _exchange(self, sock: socket.socket, command: str, timeout: float) -> str:
+        sock.settimeout(timeout)
+        request_id = next(self._ids)
+        sock.sendall(encode_packet(request_id, PACKET_COMMAND, command))
+        reply_id, _, payload = read_packet(sock)
+        if reply_id != request_id:
+            raise RconError(f"Unexpected RCON reply id {reply_id} for {request_id}")
+        chunks = [payload]
+
+        # The server has queued every fragment of the reply by now, so the
+        # sentinel's answer comes after the last of them
+        sentinel_id = next(self._ids)
+        sock.sendall(encode_packet(sentinel_id, PACKET_SENTINEL, ''))
+        while True:
+            reply_id, _, payload = read_packet(sock)
+            if reply_id == sentinel_id:
+                return ''.join(chunks)
+            if reply_id != request_id:
+                raise RconError(f"Unexpected RCON reply id {reply_id} for {request_id}")
+            chunks.append(payload)
+
+
+class RconPool:
+    """Small pool of RCON connections; each command goes to the least busy one.
+
+    A connection runs one command at a time, so the pool's size is how many
+    commands can be in flight at once.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 25575, password: str = '',
+                 size: int = 2, timeout: float = 10.0):
+        self.clients = [RconClient(host, port, password, timeout) for _ in range(max(1, size))]
+
+    def command(self, command: str, timeout: Optional[float] = None) -> str:
+        """Run a command on the least busy connection, retrying once on a dropped connection"""
+        client = min(self.clients, key=lambda c: (c.pending_count, not c.connected))
+        was_connected = client.connected
+        try:
+            return client.command(command, timeout)
+        except RconTimeout:
+            raise
+        except RconError:
+            if not was_connected:
+                raise
+            # A stale connection (e.g. from before a server restart); reconnect and try once more
+            return client.command(command, timeout)
+
+    def connect(self):
+        for client in self.clients:
+            client.connect()
+
+    def close(self):
+        for client in self.clients:
+            client.close()
+
+
+class LocalRconServer:
+    """Minimal in-process RCON server for tests and local development.
+
+    Speaks the same wire protocol as Minecraft: authenticates with a
+    password, answers command packets through a handler function, splits
+    long replies into 4096-byte packets and answers unknown packet types
+    with "Unknown request". Like Minecraft it reads each packet with a
+    single read of at most 1460 bytes; a read holding more than one packet
+    drops the connection, so clients that pipeline fail here as they would
+    against a real server.
+    """
+
+    def __init__(self, password: str = 'test', handler: Optional[Callable[[str], str]] = None,
+                 host: str = '127.0.0.1', port: int = 0):
+        self.password = password
+        self.handler = handler or (lambda command: f"Executed: {command}")
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((host, port))
+        self.host, self.port = self.server_socket.getsockname()
+        self.commands: List[str] = []
+        self.rejected_reads = 0
+        self.is_running = False
+
+    def start(self):
+        self.server_socket.listen(5)
+        self.is_running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.is_running = False
+        try:
+            self.server_socket.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _accept_loop(self):
+        while self.is_running:
+            try:
+                client_socket, _ = self.server_socket.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._handle_client, args=(client_socket,), daemon=True).start()
+
+    def _handle_client(self, client_socket: socket.socket):
+        authenticated = False
+        try:
+            while self.is_running:
+                packet = self._read_single_packet(client_socket)
+                if packet is None:
+                    break
+                request_id, packet_type, payload = packet
+                if packet_type == PACKET_LOGIN:
+                    authenticated = payload == self.password
+                    client_socket.sendall(encode_packet(request_id if authenticated else -1, PACKET_COMMAND, ''))
+                elif not authenticated:
+                    client_socket.sendall(encode_packet(-1, PACKET_COMMAND, ''))
+                elif packet_type == PACKET_COMMAND:
+                    self.commands.append(payload)
+                    reply = self.handler(payload)
+                    for start in range(0, max(1, len(reply)), MAX_PAYLOAD):
+                        client_socket.sendall(encode_packet(request_id, PACKET_RESPONSE, reply[start:start + MAX_PAYLOAD]))
+                else:
+                    client_socket.sendall(encode_packet(request_id, PACKET_RESPONSE, f"Unknown request {packet_type:x}"))
+        except Exception:
+            pass
+        finally:
+            client_socket.close()
+
+    def _read_single_packet(self, client_socket: socket.socket):
+        data = client_socket.recv(MAX_READ)
+        if len(data) < 14:
+            return None
+        length = struct.unpack('<i', data[:4])[0]
+        if length < 10 or len(data) != length + 4:
+            # A partial packet or more than one packet in the read
+            self.rejected_reads += 1
+            return None
+        request_id, packet_type = struct.unpack('<ii', data[4:12])
+        return request_id, packet_type, data[12:-2].decode('utf-8', errors='replace')
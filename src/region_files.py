@@ -0,0 +1,364 @@
+import os
+import re
+import gzip
+import zlib
+import struct
+import logging
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+# Anvil region format: an 8 KiB header of 1024 chunk locations (3-byte sector
+# offset, 1-byte sector count) followed by 1024 big-endian save timestamps,
+# then chunk payloads in 4 KiB sectors. Each payload starts with a 4-byte
+# length and a 1-byte compression type.
+SECTOR_SIZE = 4096
+CHUNKS_PER_REGION = 1024
+HEADER_SECTORS = 2
+LOCATIONS = struct.Struct('>1024I')
+TIMESTAMPS = struct.Struct('>1024I')
+CHUNK_HEADER = struct.Struct('>IB')
+
+COMPRESSION_GZIP = 1
+COMPRESSION_ZLIB = 2
+COMPRESSION_NONE = 3
+COMPRESSION_LZ4 = 4
+EXTERNAL_FLAG = 0x80
+
+REGION_NAME = re.compile(r'r\.(-?\d+)\.(-?\d+)\.mca$')
+
+# NBT tags read from chunk data, matched as raw bytes (tag type, name length,
+# name) so the chunk never has to be parsed. Both live in the chunk root on
+# 1.18+ and in its "Level" compound before that; either way the bytes match.
+TAG_LONG = 4
+TAG_INT = 3
+CHUNK_FIELDS = {'InhabitedTime': TAG_LONG, 'LastUpdate': TAG_LONG}
+TAG_FORMATS = {TAG_LONG: struct.Struct('>q'), TAG_INT: struct.Struct('>i')}
+
+# Decompressed bytes produced per step while looking for the chunk fields
+INFLATE_STEP = 16 * 1024
+
+# Region folders that hold per-chunk data alongside the terrain in region/
+COMPANION_FOLDERS = ('entities', 'poi')
+
+VANILLA_DIMENSIONS = {'': 'minecraft:overworld', 'DIM-1': 'minecraft:the_nether', 'DIM1': 'minecraft:the_end'}
+
+TICKS_PER_SECOND = 20
+
+
+@dataclass
+class ChunkInfo:
+    x: int
+    z: int
+    index: int
+    sector_offset: int
+    sector_count: int
+    timestamp: int
+    length: int = 0
+    compression: int = 0
+    external: bool = False
+    inhabited_time: Optional[int] = None
+    last_update: Optional[int] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _tag_pattern(name: str, tag_type: int) -> bytes:
+    encoded = name.encode('utf-8')
+    return bytes([tag_type]) + struct.pack('>H', len(encoded)) + encoded
+
+
+CHUNK_FIELD_PATTERNS = {name: (_tag_pattern(name, tag), TAG_FORMATS[tag]) for name, tag in CHUNK_FIELDS.items()}
+
+
+def find_tag_values(data: bytes, patterns: Dict) -> Dict:
+    """Pick named numeric tags out of raw NBT bytes"""
+    values = {}
+    for name, (pattern, value_format) in patterns.items():
+        position = data.find(pattern)
+        end = position + len(pattern) + value_format.size
+        if position >= 0 and end <= len(data):
+            values[name] = value_format.unpack_from(data, position + len(pattern))[0]
+    return values
+
+
+def _scan_compressed(payload: bytes, decompressor, patterns: Dict) -> Dict:
+    """Inflate only as much of a chunk as it takes to find every pattern"""
+    inflated = bytearray()
+    data = payload
+    while True:
+        inflated += decompressor.decompress(data, INFLATE_STEP)
+        data = decompressor.unconsumed_tail
+        if not data and not decompressor.eof:
+            inflated += decompressor.flush()
+        values = find_tag_values(inflated, patterns)
+        if len(values) == len(patterns) or decompressor.eof or not data:
+            return values
+
+
+class RegionFile:
+    """Reads one .mca region file's chunk table and per-chunk metadata"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        match = REGION_NAME.search(self.path.name)
+        if not match:
+            raise ValueError(f"Not a region file name: {self.path.name}")
+        self.region_x = int(match.group(1))
+        self.region_z = int(match.group(2))
+
+    def read_header(self, f) -> List[ChunkInfo]:
+        header = f.read(SECTOR_SIZE * HEADER_SECTORS)
+        if len(header) < SECTOR_SIZE * HEADER_SECTORS:
+            return []
+        locations = LOCATIONS.unpack_from(header, 0)
+        timestamps = TIMESTAMPS.unpack_from(header, SECTOR_SIZE)
+        chunks = []
+        for index, location in enumerate(locations):
+            if not location:
+                continue
+            chunks.append(ChunkInfo(
+                x=self.region_x * 32 + index % 32,
+                z=self.region_z * 32 + index // 32,
+                index=index,
+                sector_offset=location >> 8,
+                sector_count=location & 0xFF,
+                timestamp=timestamps[index]
+            ))
+        return chunks
+
+    def chunks(self, read_fields: bool = True) -> List[ChunkInfo]:
+        """List the chunks present, optionally with InhabitedTime/LastUpdate"""
+        with open(self.path, 'rb') as f:
+            chunks = self.read_header(f)
+            for chunk in chunks:
+                f.seek(chunk.sector_offset * SECTOR_SIZE)
+                header = f.read(CHUNK_HEADER.size)
+                if len(header) < CHUNK_HEADER.size:
+                    continue
+                chunk.length, compression = CHUNK_HEADER.unpack(header)
+                chunk.external = bool(compression & EXTERNAL_FLAG)
+                chunk.compression = compression & ~EXTERNAL_FLAG
+                if read_fields:
+                    try:
+                        self._read_fields(f, chunk)
+                    except (zlib.error, OSError) as e:
+                        logging.warning(f"Unreadable chunk {chunk.x},{chunk.z} in {self.path.name}: {e}")
+        return chunks
+
+    def _read_fields(self, f, chunk: ChunkInfo):
+        if chunk.external:
+            external_path = self.path.with_name(f"c.{chunk.x}.{chunk.z}.mcc")
+            payload = external_path.read_bytes()
+        else:
+            payload = f.read(max(0, chunk.length - 1))
+
+        if chunk.compression == COMPRESSION_ZLIB:
+            values = _scan_compressed(payload, zlib.decompressobj(), CHUNK_FIELD_PATTERNS)
+        elif chunk.compression == COMPRESSION_GZIP:
+            values = _scan_compressed(payload, zlib.decompressobj(16 + zlib.MAX_WBITS), CHUNK_FIELD_PATTERNS)
+        elif chunk.compression == COMPRESSION_NONE:
+            values = find_tag_values(payload, CHUNK_FIELD_PATTERNS)
+        else:
+            # LZ4 (1.20.5+ option) would need a third-party decoder; leave the fields unknown
+            return
+        chunk.inhabited_time = values.get('InhabitedTime')
+        chunk.last_update = values.get('LastUpdate')
+
+    def rewrite_without(self, indices: Set[int]) -> int:
+        """Drop chunks by index, compacting the file. Returns bytes freed.
+
+        The file is rewritten to a temporary file and swapped in, and removed
+        entirely if no chunks remain.
+        """
+        old_size = self.path.stat().st_size
+        with open(self.path, 'rb') as f:
+            chunks = self.read_header(f)
+            kept = [chunk for chunk in chunks if chunk.index not in indices]
+            removed = [chunk for chunk in chunks if chunk.index in indices]
+            if not removed:
+                return 0
+            if not kept:
+                f.close()
+                self._remove_external(removed)
+                self.path.unlink()
+                return old_size
+
+            locations = [0] * CHUNKS_PER_REGION
+            timestamps = [0] * CHUNKS_PER_REGION
+            temp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(temp_path, 'wb') as out:
+                out.write(b'\0' * SECTOR_SIZE * HEADER_SECTORS)
+                next_sector = HEADER_SECTORS
+                for chunk in sorted(kept, key=lambda c: c.sector_offset):
+                    f.seek(chunk.sector_offset * SECTOR_SIZE)
+                    data = f.read(chunk.sector_count * SECTOR_SIZE)
+                    data += b'\0' * (-len(data) % SECTOR_SIZE)
+                    out.write(data)
+                    locations[chunk.index] = (next_sector << 8) | chunk.sector_count
+                    timestamps[chunk.index] = chunk.timestamp
+                    next_sector += chunk.sector_count
+                out.seek(0)
+                out.write(LOCATIONS.pack(*locations))
+                out.write(TIMESTAMPS.pack(*timestamps))
+
+        os.replace(temp_path, self.path)
+        self._remove_external(removed)
+        return old_size - self.path.stat().st_size
+
+    def _remove_external(self, chunks: Iterable[ChunkInfo]):
+        for chunk in chunks:
+            self.path.with_name(f"c.{chunk.x}.{chunk.z}.mcc").unlink(missing_ok=True)
+
+
+def find_dimensions(world_dir: Path) -> Dict[str, Path]:
+    """Map dimension IDs to their folders (the ones containing region/)"""
+    world_dir = Path(world_dir)
+    dimensions = {}
+    for region_dir in sorted(world_dir.glob('**/region')):
+        if not region_dir.is_dir():
+            continue
+        dimension_dir = region_dir.parent
+        relative = dimension_dir.relative_to(world_dir).as_posix()
+        relative = '' if relative == '.' else relative
+        if relative in VANILLA_DIMENSIONS:
+            name = VANILLA_DIMENSIONS[relative]
+        elif relative.startswith('dimensions/') and relative.count('/') >= 2:
+            _, namespace, path = relative.split('/', 2)
+            name = f"{namespace}:{path}"
+        else:
+            name = relative
+        dimensions[name] = dimension_dir
+    return dimensions
+
+
+def iter_region_files(dimension_dir: Path, folder: str = 'region') -> Iterator[RegionFile]:
+    for path in sorted((Path(dimension_dir) / folder).glob('r.*.*.mca')):
+        try:
+            yield RegionFile(path)
+        except ValueError:
+            continue
+
+
+def read_spawn(world_dir: Path) -> Optional[tuple]:
+    """Get the world spawn block position from level.dat"""
+    patterns = {name: (_tag_pattern(name, TAG_INT), TAG_FORMATS[TAG_INT]) for name in ('SpawnX', 'SpawnZ')}
+    try:
+        with gzip.open(Path(world_dir) / 'level.dat', 'rb') as f:
+            values = find_tag_values(f.read(), patterns)
+    except (OSError, EOFError):
+        return None
+    if len(values) < 2:
+        return None
+    return values['SpawnX'], values['SpawnZ']
+
+
+def analyze_world(world_dir: Path, read_fields: bool = True, min_inhabited_ticks: int = 0) -> Dict:
+    """Report region and chunk sizes per dimension.
+
+    With read_fields, each chunk's InhabitedTime is read and chunks at or
+    below min_inhabited_ticks are counted as unvisited.
+    """
+    report = {'dimensions': {}, 'total_bytes': 0, 'total_chunks': 0, 'unvisited_chunks': 0}
+    for name, dimension_dir in find_dimensions(world_dir).items():
+        dimension = {'path': str(dimension_dir), 'regions': [], 'region_bytes': 0, 'companion_bytes': 0,
+                     'chunks': 0, 'unvisited_chunks': 0}
+        for region in iter_region_files(dimension_dir):
+            try:
+                chunks = region.chunks(read_fields)
+            except OSError as e:
+                logging.warning(f"Skipping unreadable region {region.path}: {e}")
+                continue
+            size = region.path.stat().st_size
+            used = sum(chunk.sector_count for chunk in chunks) * SECTOR_SIZE
+            unvisited = sum(1 for chunk in chunks
+                            if chunk.inhabited_time is not None and chunk.inhabited_time <= min_inhabited_ticks)
+            inhabited = [chunk.inhabited_time for chunk in chunks if chunk.inhabited_time is not None]
+            dimension['regions'].append({
+                'file': region.path.name,
+                'x': region.region_x,
+                'z': region.region_z,
+                'size': size,
+                'used_bytes': used,
+                'chunks': len(chunks),
+                'unvisited_chunks': unvisited,
+                'inhabited_ticks': sum(inhabited),
+                'last_saved': max((chunk.timestamp for chunk in chunks), default=None)
+            })
+            dimension['region_bytes'] += size
+            dimension['chunks'] += len(chunks)
+            dimension['unvisited_chunks'] += unvisited
+
+        for folder in COMPANION_FOLDERS:
+            for path in (dimension_dir / folder).glob('r.*.*.mca'):
+                dimension['companion_bytes'] += path.stat().st_size
+
+        dimension['regions'].sort(key=lambda r: r['size'], reverse=True)
+        report['dimensions'][name] = dimension
+        report['total_bytes'] += dimension['region_bytes'] + dimension['companion_bytes']
+        report['total_chunks'] += dimension['chunks']
+        report['unvisited_chunks'] += dimension['unvisited_chunks']
+    return report
+
+
+def trim_world(world_dir: Path, min_inhabited_ticks: int = 0, protect_radius: int = 0,
+               dimensions: Optional[Iterable[str]] = None, dry_run: bool = True,
+               keep: Optional[Callable[[str, ChunkInfo], bool]] = None) -> Dict:
+    """Delete chunks players spent no more than min_inhabited_ticks in.
+
+    Chunks within protect_radius chunks of the world spawn (overworld) are
+    always kept, as is any chunk whose InhabitedTime can't be read. The
+    matching entity and POI data is removed along with the terrain so the
+    game regenerates the chunk cleanly. Only run this on a stopped server.
+    """
+    world_dir = Path(world_dir)
+    spawn = read_spawn(world_dir)
+    spawn_chunk = (spawn[0] >> 4, spawn[1] >> 4) if spawn else (0, 0)
+    wanted = set(dimensions) if dimensions else None
+    stats = {'dry_run': dry_run, 'chunks_removed': 0, 'regions_rewritten': 0,
+             'regions_deleted': 0, 'bytes_freed': 0, 'dimensions': {}}
+
+    for name, dimension_dir in find_dimensions(world_dir).items():
+        if wanted is not None and name not in wanted:
+            continue
+        removed_here = 0
+        for region in iter_region_files(dimension_dir):
+            chunks = region.chunks(read_fields=True)
+            doomed = set()
+            for chunk in chunks:
+                if chunk.inhabited_time is None or chunk.inhabited_time > min_inhabited_ticks:
+                    continue
+                if (name == VANILLA_DIMENSIONS[''] and
+                        max(abs(chunk.x - spawn_chunk[0]), abs(chunk.z - spawn_chunk[1])) <= protect_radius):
+                    continue
+                if keep and keep(name, chunk):
+                    continue
+                doomed.add(chunk.index)
+            if not doomed:
+                continue
+
+            removed_here += len(doomed)
+            if dry_run:
+                stats['bytes_freed'] += sum(c.sector_count for c in chunks if c.index in doomed) * SECTOR_SIZE
+                continue
+
+            region_files = [region] + [RegionFile(path) for folder in COMPANION_FOLDERS
+                                       for path in [dimension_dir / folder / region.path.name] if path.exists()]
+            for region_file in region_files:
+                deleting = len(doomed) == len(chunks) and region_file is region
+                stats['bytes_freed'] += region_file.rewrite_without(doomed)
+                if region_file is region:
+                    stats['regions_deleted' if deleting else 'regions_rewritten'] += 1
+
+        stats['dimensions'][name] = removed_here
+        stats['chunks_removed'] += removed_here
+
+    verb = "Would remove" if dry_run else "Removed"
+    logging.info(f"{verb} {stats['chunks_removed']} unvisited chunks, "
+                 f"{stats['bytes_freed'] / (1024 * 1024):.1f} MB")
+    return stats
+
+
+def seconds_to_ticks(seconds: float) -> int:
+    return int(seconds * TICKS_PER_SECOND)
@@ -0,0 +1,262 @@
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from . import console_events
+except ImportError:
+    import console_events
+
+# Job kinds
+START = 'start'
+STOP = 'stop'
+
+# Job states
+VALIDATING = 'validating'
+LAUNCHING = 'launching'
+LOADING_MODS = 'loading_mods'
+READY = 'ready'
+STOPPING = 'stopping'
+STOPPED = 'stopped'
+FAILED = 'failed'
+
+FINAL_STATES = (READY, STOPPED, FAILED)
+
+# Heavily modded servers can take several minutes to reach "Done"
+DEFAULT_READY_TIMEOUT = 900.0
+
+# Long polls are capped so a forgotten client can't hold a request thread for long
+MAX_WAIT = 60.0
+
+JOBS_KEPT = 50
+
+
+class LifecycleJob:
+    """One start or stop request and the states it has been through"""
+
+    def __init__(self, kind: str, state: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.state = state
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.transitions = [{'state': state, 'time': self.created}]
+        self.details: Dict = {}
+        # Bumped on every change; long polls wait for it to move past what they've seen
+        self.version = 1
+        self._changed = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.state in FINAL_STATES
+
+    def set_state(self, state: str, error: Optional[str] = None, **details):
+        with self._changed:
+            if self.done or (state == self.state and not details):
+                return
+            now = time.time()
+            if state != self.state:
+                self.state = state
+                self.transitions.append({'state': state, 'time': now})
+            self.details.update(details)
+            if error:
+                self.error = error
+            if self.done:
+                self.finished = now
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait(self, version: Optional[int] = None, timeout: float = MAX_WAIT) -> bool:
+        """Block until the job changes past version (or finishes); False on timeout"""
+        deadline = time.monotonic() + min(timeout, MAX_WAIT)
+        with self._changed:
+            while not self.done and (version is None or self.version <= version):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+            return True
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'state': self.state,
+            'done': self.done,
+            'error': self.error,
+            'created': self.created,
+            'finished': self.finished,
+            'duration': round((self.finished or time.time()) - self.created, 3),
+            'transitions': list(self.transitions),
+            'details': dict(self.details),
+            'version': self.version
+        }
+
+
+class ServerLifecycle:
+    """Runs server starts and stops as background jobs.
+
+    start() and stop() return at once with a job that moves through
+    validating, launching, loading_mods and ready (or stopping and stopped)
+    on its own thread, so no web request waits on pre-flight checks or the
+    JVM. A start is ready when the console prints its "Done" line, not
+    after a fixed delay; it fails if the checks fail, the process exits
+    first, or ready_timeout passes. One job runs at a time: starting while
+    a start is under way returns that job, and a stop is accepted once
+    the process exists, or while a crashed server waits to be restarted,
+    in which case it cancels the restart and is done at once.
+    """
+
+    def __init__(self, server_manager):
+        self.server_manager = server_manager
+        self.current: Optional[LifecycleJob] = None
+        self._jobs: 'OrderedDict[str, LifecycleJob]' = OrderedDict()
+        self._listeners: List[Callable[[LifecycleJob], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        """Whether a start or stop is under way"""
+        return bool(self.current and not self.current.done)
+
+    @property
+    def ready_timeout(self) -> float:
+        return float(self.server_manager.config.get('ready_timeout', DEFAULT_READY_TIMEOUT))
+
+    def add_listener(self, callback: Callable[[LifecycleJob], None]):
+        """Call callback(job) on every state change"""
+        self._listeners.append(callback)
+
+    def _set_state(self, job: LifecycleJob, state: str, error: Optional[str] = None, **details):
+        previous = job.state
+        job.set_state(state, error, **details)
+        if job.state == previous:
+            return
+        logging.info(f"Server {job.kind} job {job.id}: {state}" + (f" ({error})" if error else ''))
+        for callback in list(self._listeners):
+            try:
+                callback(job)
+            except Exception as e:
+                logging.error(f"Server job listener failed: {e}")
+
+    def _add(self, job: LifecycleJob):
+        self.current = job
+        self._jobs[job.id] = job
+        while len(self._jobs) > JOBS_KEPT:
+            self._jobs.popitem(last=False)
+
+    # Requests
+
+    def start(self) -> Tuple[Optional[LifecycleJob], Optional[str]]:
+        """Start the server in the background; returns (job, None) or (None, reason)"""
+        with self._lock:
+            current = self.current
+            if current and not current.done:
+                if current.kind == START:
+                    return current, None
+                return None, 'The server is stopping'
+            if self.server_manager.is_running:
+                return None, 'Server is already running'
+            job = LifecycleJob(START, VALIDATING)
+            self._add(job)
+        threading.Thread(target=self._run_start, args=(job,), daemon=True).start()
+        return job, None
+
+    def stop(self) -> Tuple[Optional[LifecycleJob], Optional[str]]:
+        """Stop the server in the background; returns (job, None) or (None, reason)"""
+        with self._lock:
+            current = self.current
+            if current and not current.done:
+                if current.kind == STOP:
+                    return current, None
+                if current.state == VALIDATING:
+                    return None, 'The server is still being checked; stop it once it has launched'
+            supervisor = self.server_manager.supervisor
+            running = self.server_manager.is_running
+            if not running and not supervisor.restart_pending:
+                return None, 'Server is not running'
+            if not running:
+                # The server crashed and is waiting to be restarted; stopping it means not restarting it
+                supervisor.cancel_restart()
+            job = LifecycleJob(STOP, STOPPING)
+            self._add(job)
+        if not running:
+            self._set_state(job, STOPPED, cancelled_restart=True)
+            return job, None
+        threading.Thread(target=self._run_stop, args=(job,), daemon=True).start()
+        return job, None
+
+    # Job threads
+
+    def _run_start(self, job: LifecycleJob):
+        manager = self.server_manager
+        events = manager.events
+        ready = threading.Event()
+
+        def on_ready(event):
+            ready.set()
+
+        def on_stage(event):
+            if job.state == LAUNCHING:
+                self._set_state(job, LOADING_MODS)
+
+        # Listen before launching so a fast server can't finish unseen
+        events.subscribe(console_events.READY, on_ready)
+        events.subscribe(console_events.STARTUP_STAGE, on_stage)
+        try:
+            started = manager.start_server(on_progress=lambda state: self._set_state(job, state))
+            report = manager.last_preflight
+            if report:
+                job.set_state(job.state, preflight=report.to_dict())
+            if not started:
+                error = report.summary() if report and not report.ok else \
+                    'The server process failed to start; check the console log for details'
+                self._set_state(job, FAILED, error)
+                return
+
+            deadline = time.monotonic() + self.ready_timeout
+            while not ready.wait(1.0):
+                if not manager.is_running:
+                    self._set_state(job, FAILED, 'The server was stopped before it was ready' if manager.stop_requested
+                                    else 'The server exited before it was ready')
+                    return
+                if time.monotonic() > deadline:
+                    self._set_state(job, FAILED, f"The server did not report ready within {self.ready_timeout:.0f}s; "
+                                                 f"it is still running")
+                    return
+            # The startup profiler has already closed this launch's timings
+            latest = manager.startup_profiler.list(limit=1)
+            self._set_state(job, READY, startup=latest[0] if latest else None)
+        except Exception as e:
+            logging.error(f"Server start job failed: {e}")
+            self._set_state(job, FAILED, str(e))
+        finally:
+            events.unsubscribe(console_events.READY, on_ready)
+            events.unsubscribe(console_events.STARTUP_STAGE, on_stage)
+
+    def _run_stop(self, job: LifecycleJob):
+        try:
+            if self.server_manager.stop_server():
+                self._set_state(job, STOPPED)
+            elif self.server_manager.last_stop == 'not_running':
+                # It exited on its own (and the supervisor cleaned up) before the stop got to it
+                self._set_state(job, STOPPED, already_exited=True)
+            else:
+                self._set_state(job, FAILED, 'The server did not stop cleanly and was killed')
+        except Exception as e:
+            logging.error(f"Server stop job failed: {e}")
+            self._set_state(job, FAILED, str(e))
+
+    # Reporting
+
+    def get(self, job_id: str) -> Optional[LifecycleJob]:
+        return self._jobs.get(job_id)
+
+    def list(self, limit: Optional[int] = None) -> List[Dict]:
+        """Recent jobs, newest first"""
+        jobs = [job.to_dict() for job in reversed(list(self._jobs.values()))]
+        return jobs[:limit] if limit else jobs
@@ -11,22 +11,216 @@ import re
 from pathlib import Path
 from datetime import datetime
 import logging
+import secrets
 import webbrowser
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+
+try:
+    from .console_stream import ConsoleBuffer
+    from . import console_events
+    from .player_tracker import PlayerTracker
+    from .rcon import RconPool, RconError
+    from .jar_cache import get_jar_cache
+    from .jar_index import IndicatorMatcher, iter_entry_names, scan_jar, any_hit
+    from .backup_store import BackupStore
+    from .world_snapshot import WorldStager
+    from .backup_archive import ArchiveWriter
+    from .backup_scheduler import BackupScheduler, BackupJobHistory, select_retained
+    from .backup_restore import WorldRestorer, RestoreError
+    from . import region_files
+    from .pregen import PregenJob
+    from .process_sampler import ProcessSampler
+    from .jvm_tuning import JvmTuner, parse_memory_mb
+    from .gc_log import GcLogAnalyzer, GC_LOG_FILE, gc_log_args
+    from .tick_monitor import TickMonitor
+    from .lag_incidents import LagIncidentDetector
+    from .supervisor import ServerSupervisor
+    from .java_runtimes import JavaRegistry
+    from .startup_profiler import StartupProfiler
+    from .preflight import run_preflight, port_available
+    from .server_jobs import ServerLifecycle, LAUNCHING
+except ImportError:
+    from console_stream import ConsoleBuffer
+    import console_events
+    from player_tracker import PlayerTracker
+    from rcon import RconPool, RconError
+    from jar_cache import get_jar_cache
+    from jar_index import IndicatorMatcher, iter_entry_names, scan_jar, any_hit
+    from backup_store import BackupStore
+    from world_snapshot import WorldStager
+    from backup_archive import ArchiveWriter
+    from backup_scheduler import BackupScheduler, BackupJobHistory, select_retained
+    from backup_restore import WorldRestorer, RestoreError
+    import region_files
+    from pregen import PregenJob
+    from process_sampler import ProcessSampler
+    from jvm_tuning import JvmTuner, parse_memory_mb
+    from gc_log import GcLogAnalyzer, GC_LOG_FILE, gc_log_args
+    from tick_monitor import TickMonitor
+    from lag_incidents import LagIncidentDetector
+    from supervisor import ServerSupervisor
+    from java_runtimes import JavaRegistry
+    from startup_profiler import StartupProfiler
+    from preflight import run_preflight, port_available
+    from server_jobs import ServerLifecycle, LAUNCHING
+
+# How often a Forge scan waiting on slow JAR inspections checks for a cancel
+FORGE_SCAN_POLL = 0.25
+
+# How long a backup waits for a prune, restore or trim to finish before giving up
+BACKUP_MAINTENANCE_WAIT = 600
+
+# JAR content indicators, matched as substrings of entry names
+SERVER_JAR_INDICATORS = [
+    'META-INF/MANIFEST.MF',
+    'net/minecraft/server/',
+    'com/mojang/',
+    'META-INF/mods.toml',  # Forge mods
+    'fabric.mod.json',     # Fabric mods
+    'server.properties',
+    'eula.txt'
+]
+
+FORGE_SERVER_JAR_INDICATORS = [
+    'META-INF/mods.toml',
+    'net/minecraftforge/',
+    'cpw/mods/',
+    'org/spongepowered/',
+    'fml/',
+    'forge-'
+]
+
+FORGE_JAR_INDICATORS = [
+    'net/minecraftforge/',
+    'META-INF/mods.toml',
+    'forge-',
+    'fml/',
+    'cpw/mods/'
+]
+
+VERIFY_FORGE_INDICATORS = [
+    'META-INF/mods.toml',
+    'net/minecraftforge/',
+    'cpw/mods/',
+    'org/spongepowered/',
+    'fml/',
+    'META-INF/MANIFEST.MF'
+]
+
+# Entries with both "minecraft" and "server" in their name (any case)
+MINECRAFT_SERVER_ENTRY = {'minecraft_server_entry': r'(?i:minecraft.*server|server.*minecraft)'}
+
+META_INF_MATCHER = IndicatorMatcher(['META-INF'])
+SERVER_JAR_MATCHER = IndicatorMatcher(SERVER_JAR_INDICATORS, patterns=MINECRAFT_SERVER_ENTRY)
+FORGE_NAMED_SERVER_JAR_MATCHER = IndicatorMatcher(SERVER_JAR_INDICATORS + FORGE_SERVER_JAR_INDICATORS,
+                                                  patterns=MINECRAFT_SERVER_ENTRY)
+FORGE_SERVER_JAR_MATCHER = IndicatorMatcher(FORGE_SERVER_JAR_INDICATORS)
+FORGE_JAR_MATCHER = IndicatorMatcher(FORGE_JAR_INDICATORS)
+VERIFY_FORGE_MATCHER = IndicatorMatcher(VERIFY_FORGE_INDICATORS, ignorecase=['installer'])
 
 class ServerManager:
-    def __init__(self, config):
+    def __init__(self, config, server_dir="server", backup_dir="backups", instance="default"):
         self.config = config
         self.server_process = None
         self.is_running = False
         self.hosts = []
         self.current_host = None
-        self.server_dir = Path("server")
+        
+        # One Minecraft server; an InstanceManager may run several side by side
+        self.instance = instance
+        self.instances = None
+        self.server_dir = Path(server_dir)
         self.mods_dir = self.server_dir / "mods"
         self.world_dir = self.server_dir / "world"
+        self.data_dir = self.server_dir / "mcus_data"
+        self.backup_dir = Path(backup_dir)
+        self._backup_store = None
+        self.last_backup = None
+        self.last_backup_error = None
+        self.backup_status = {'state': 'idle'}
+        # Held by backups and by the maintenance that mustn't overlap them (prune, restore, trim);
+        # backup_operation says which one is running
+        self._backup_lock = threading.Lock()
+        self.backup_operation = None
+        self._backup_thread = None
+        self._backup_job = None
+        self.stager = WorldStager()
+        self.start_time = None
+        
+        # Server process resource usage, sampled in the background
+        self.sampler = ProcessSampler(config.get('resource_sample_interval', 1.0))
+        
+        # In-memory console history for live tailing from the web UI
+        self.console = ConsoleBuffer(config.get('console_buffer_lines', 5000))
+        
+        # Console lines are classified once and fanned out to subscribers
+        self.events = console_events.ConsoleEventParser()
+        self.events.subscribe(console_events.READY, self.handle_server_ready)
+        self.events.subscribe(console_events.JOIN, self.handle_player_join)
+        self.events.subscribe(console_events.LEAVE, self.handle_player_leave)
         
         # Create directories
-        self.server_dir.mkdir(exist_ok=True)
+        self.server_dir.mkdir(parents=True, exist_ok=True)
         self.mods_dir.mkdir(exist_ok=True)
+        self.data_dir.mkdir(exist_ok=True)
+        
+        # JAR inspection results, shared with the Forge installer
+        self.jar_cache = get_jar_cache(self.server_dir)
+        
+        # Installed Java runtimes, identified once per binary and cached on disk
+        java_paths = ([config['java_path']] if config.get('java_path') else []) + config.get('java_paths', [])
+        self.java_runtimes = JavaRegistry(self.data_dir / "java_runtimes.json", extra_paths=java_paths)
+        
+        # Online roster and play session history
+        self.players = PlayerTracker(self.data_dir / "player_sessions.jsonl")
+        
+        # Scheduled backups and the history of every backup run
+        self.backup_jobs = BackupJobHistory(self.data_dir / "backup_jobs.jsonl")
+        self.backup_scheduler = BackupScheduler(self)
+        
+        # RCON gives commands a result; stdin is the fallback when it's unavailable
+        self.rcon_enabled = config.get('rcon_enabled', True)
+        self.rcon_port = config.get('rcon_port', 25575)
+        self.rcon_password = config.get('rcon_password') or self._load_rcon_password()
+        self.rcon = None
+        self._stdin_lock = threading.Lock()
+        
+        # Running Forge detection scans, by scan ID, so they can be cancelled
+        self.forge_scans = {}
+        
+        # Current (or last) chunk pre-generation job
+        self.pregen_job = None
+        
+        # Heap and GC flags are planned per launch and learned from previous runs
+        self.jvm_tuner = JvmTuner(self.data_dir / "jvm_launches.jsonl")
+        self.jvm_plan = None
+        self._jvm_planned_at = None
+        self._out_of_memory = False
+        self.gc_log = GcLogAnalyzer(self.server_dir / GC_LOG_FILE)
+        self.events.subscribe(console_events.OUT_OF_MEMORY, self.handle_out_of_memory)
+        
+        # Tick performance (TPS/MSPT) polled over the command channel
+        self.tick_monitor = TickMonitor(self)
+        
+        # "Can't keep up" warnings grouped into lag incidents with what was going on at the time
+        self.lag_incidents = LagIncidentDetector(self, self.data_dir / "lag_incidents.jsonl")
+        
+        # Restarts the server when its process dies without being asked to stop
+        self.stop_requested = False
+        self._exit_lock = threading.Lock()
+        self.supervisor = ServerSupervisor(self, self.data_dir / "server_exits.jsonl")
+        
+        # Per-launch timing of the pre-flight steps and of the JVM's boot
+        self.startup_profiler = StartupProfiler(self, self.data_dir / "startup_timings.jsonl")
+        self.last_preflight = None
+        # How the last stop_server call ended: 'stopped', 'killed' or 'not_running'
+        self.last_stop = None
+        
+        # Start and stop requests from the web UI run as background jobs
+        self.lifecycle = ServerLifecycle(self)
+        self.supervisor.add_listener(self._on_supervisor_event)
         
         # Setup logging
         logging.basicConfig(
@@ -35,59 +229,53 @@ class ServerManager:
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         
-    def start_server(self):
-        """Start the Minecraft server with comprehensive error checking"""
+    def start_server(self, on_progress=None):
+        """Start the Minecraft server with comprehensive error checking.
+        
+        Returns once the JVM process is running, not when the server is ready;
+        lifecycle.start() tracks readiness. on_progress(state) is called when the
+        pre-flight checks pass and the launch begins.
+        """
         if self.is_running:
             logging.warning("Server is already running")
             return False
-            
+        
+        # A start by hand takes over from any pending automatic restart
+        if not self.supervisor.restarting:
+            self.supervisor.reset()
+        
+        self.startup_profiler.begin(automatic=self.supervisor.restarting)
+        failed_phase = None
         try:
-            # Step 1: Validate and create server directory
-            if not self._validate_server_directory():
-                return False
-            
-            # Step 2: Check Java installation
-            java_info = self._check_java_installation()
-            if not java_info['available']:
-                logging.error(f"Java not found: {java_info['error']}")
-                return False
-            
-            # Step 3: Check for server JAR
-            server_jar = self.find_server_jar()
-            if not server_jar:
-                logging.info("No server JAR found. Attempting to install Forge...")
-                if not self.install_forge():
-                    logging.error("Failed to install Forge automatically")
-                    return False
-                server_jar = self.find_server_jar()
-                
-            if not server_jar:
-                logging.error("No server JAR found after Forge installation attempt")
+            # Steps 1-6: directory, server JAR, Java, server.properties and resources, checked concurrently
+            report = self.last_preflight = run_preflight(self, phase=self.startup_profiler.phase)
+            if not report.ok:
+                logging.error(f"Pre-flight checks failed: {report.summary()}")
+                self.startup_profiler.fail(report.failed[0])
                 return False
-            
-            # Step 4: Validate server JAR
-            if not self._validate_server_jar(server_jar):
-                return False
-                
-            # Step 5: Create server.properties
-            if not self._create_server_properties():
-                return False
-            
-            # Step 6: Check available memory
-            memory_info = self._check_system_resources()
-            if not memory_info['sufficient']:
-                logging.warning(f"Insufficient memory: {memory_info['message']}")
-                # Continue anyway but with reduced memory allocation
+            for check in report.checks.values():
+                if not check.ok:
+                    # Continue anyway, e.g. with reduced memory allocation
+                    logging.warning(f"Pre-flight {check.name}: {check.message}")
+            logging.info(f"Pre-flight checks passed in {report.duration_ms:.0f}ms; {report.checks['java'].message}")
             
             # Step 7: Start server process
-            return self._start_server_process(server_jar, java_info, memory_info)
+            if on_progress:
+                on_progress(LAUNCHING)
+            failed_phase = 'launch'
+            with self.startup_profiler.phase('launch'):
+                started = self._start_server_process(report.server_jar, report.java_info, report.memory_info)
             
         except Exception as e:
             logging.error(f"Failed to start server: {e}")
-            return False
-
-    def _validate_server_directory(self):
-        """Validate and create server directory with proper permissions"""
+            started = False
+        
+        if not started:
+            self.startup_profiler.fail(failed_phase)
+        return started
+        
+    def _server_directory_problem(self):
+        """Create the server directory and its subdirectories; returns what is wrong, or None"""
         try:
             # Ensure server directory exists
             self.server_dir.mkdir(parents=True, exist_ok=True)
@@ -99,10 +287,10 @@ class ServerManager:
                 test_file.unlink()
             except PermissionError:
                 logging.error(f"Server directory not writable: {self.server_dir}")
-                return False
+                return "No write permission to server directory"
             except Exception as e:
                 logging.error(f"Cannot write to server directory: {e}")
-                return False
+                return f"Cannot write to server directory: {e}"
             
             # Create necessary subdirectories
             subdirs = ['mods', 'config', 'logs', 'world', 'backups']
@@ -111,121 +299,103 @@ class ServerManager:
                 subdir_path.mkdir(exist_ok=True)
             
             logging.info(f"Server directory validated: {self.server_dir}")
-            return True
+            return None
             
         except Exception as e:
             logging.error(f"Failed to validate server directory: {e}")
-            return False
+            return f"Failed to validate server directory: {e}"
 
-    def _check_java_installation(self):
-        """Check Java installation and return detailed information"""
+    def _port_problem(self):
+        """Check that the game and RCON ports are free to bind; returns what is wrong, or None"""
+        ports = {'game': int(self.config.get('port', 25565))}
+        if self.rcon_enabled:
+            ports['RCON'] = int(self.rcon_port)
+        busy = [f"{kind} port {port}" for kind, port in ports.items() if not port_available(port)]
+        if busy:
+            return f"{' and '.join(busy)} already in use by another program or server"
+        return None
+        
+    def _memory_budget_problem(self):
+        """With several instances on this host, check that this one's heap still fits; returns what is wrong, or None"""
+        if not self.instances:
+            return None
+        return self.instances.budget_problem(self.instance)
+        
+    def _check_java_installation(self, minecraft_version=None):
+        """Pick the Java runtime for a Minecraft version and return detailed information"""
         try:
-            # Try to get Java version
-            result = subprocess.run(
-                ["java", "-version"], 
-                capture_output=True, 
-                text=True, 
-                timeout=10
+            runtime, note = self.java_runtimes.select(
+                minecraft_version or self.config.get('minecraft_version'),
+                preferred=self.config.get('java_path')
             )
-            
-            if result.returncode != 0:
-                return {
-                    'available': False,
-                    'error': 'Java command failed',
-                    'version': None,
-                    'path': None
-                }
-            
-            # Parse Java version from stderr (Java outputs version to stderr)
-            version_output = result.stderr
-            if "version" in version_output:
-                # Extract version number
-                import re
-                version_match = re.search(r'"([^"]+)"', version_output)
-                version = version_match.group(1) if version_match else "Unknown"
-                
-                # Check if it's Java 8 or higher
-                version_num = re.search(r'(\d+)', version)
-                if version_num:
-                    major_version = int(version_num.group(1))
-                    if major_version >= 8:
-                        return {
-                            'available': True,
-                            'error': None,
-                            'version': version,
-                            'path': 'java'
-                        }
-                    else:
-                        return {
-                            'available': False,
-                            'error': f'Java version {version} is too old. Java 8 or higher required.',
-                            'version': version,
-                            'path': 'java'
-                        }
-            
-            return {
-                'available': True,
-                'error': None,
-                'version': 'Unknown',
-                'path': 'java'
-            }
-            
-        except FileNotFoundError:
-            return {
-                'available': False,
-                'error': 'Java not found in PATH. Please install Java 8 or higher.',
-                'version': None,
-                'path': None
-            }
-        except subprocess.TimeoutExpired:
-            return {
-                'available': False,
-                'error': 'Java command timed out',
-                'version': None,
-                'path': None
-            }
         except Exception as e:
+            runtime, note = None, f'Error checking Java: {e}'
+        
+        if not runtime:
             return {
                 'available': False,
-                'error': f'Error checking Java: {e}',
+                'error': note,
                 'version': None,
+                'major': None,
+                'arch': None,
                 'path': None
             }
+        return {
+            'available': True,
+            'error': None,
+            'warning': note,
+            'version': runtime.version,
+            'major': runtime.major,
+            'arch': runtime.arch,
+            'vendor': runtime.vendor,
+            'path': runtime.path
+        }
+        
+    def _minecraft_version_of(self, server_jar):
+        """Minecraft version from a server JAR's name or version directory, else the configured one"""
+        match = re.search(r'(?:forge|minecraft_server|server)[-.](1\.\d+(?:\.\d+)?)', str(server_jar))
+        return match.group(1) if match else self.config.get('minecraft_version')
 
-    def _validate_server_jar(self, server_jar):
-        """Validate server JAR file"""
+    def _server_jar_problem(self, server_jar):
+        """Check that a server JAR looks usable; returns what is wrong, or None"""
         try:
             if not server_jar.exists():
                 logging.error(f"Server JAR does not exist: {server_jar}")
-                return False
+                return f"Server JAR does not exist: {server_jar}"
             
             # Check file size (should be at least 1MB for a server JAR)
-            if server_jar.stat().st_size < 1024 * 1024:
-                logging.error(f"Server JAR seems too small: {server_jar.stat().st_size} bytes")
-                return False
+            size = server_jar.stat().st_size
+            if size < 1024 * 1024:
+                logging.error(f"Server JAR seems too small: {size} bytes")
+                return f"Server JAR {server_jar.name} seems too small ({size} bytes)"
             
             # Try to read JAR file to ensure it's valid
-            import zipfile
-            try:
-                with zipfile.ZipFile(server_jar, 'r') as jar:
-                    # Check for essential files
-                    file_list = jar.namelist()
-                    if not any('META-INF' in f for f in file_list):
-                        logging.error("Invalid JAR file: missing META-INF")
-                        return False
-            except zipfile.BadZipFile:
+            jar_state = self.jar_cache.lookup(server_jar, 'meta_inf', lambda: self._inspect_meta_inf(server_jar))
+            if jar_state == 'bad_zip':
                 logging.error(f"Invalid JAR file: {server_jar}")
-                return False
+                return f"Server JAR {server_jar.name} is not a valid JAR file"
+            if jar_state == 'missing':
+                logging.error("Invalid JAR file: missing META-INF")
+                return f"Server JAR {server_jar.name} is missing META-INF"
             
             logging.info(f"Server JAR validated: {server_jar}")
-            return True
+            return None
             
         except Exception as e:
             logging.error(f"Failed to validate server JAR: {e}")
-            return False
+            return f"Failed to validate server JAR: {e}"
 
-    def _create_server_properties(self):
-        """Create server.properties with error handling"""
+    def _inspect_meta_inf(self, server_jar):
+        """Open a JAR and report whether it has a META-INF directory"""
+        try:
+            if scan_jar(server_jar, META_INF_MATCHER, any_hit):
+                return 'ok'
+            return 'missing'
+        except zipfile.BadZipFile:
+            return 'bad_zip'
+
+    def _write_server_properties(self):
+        """Write server.properties from the config; returns what went wrong, or None"""
         try:
             properties = {
                 "server-port": self.config.get('port', 25565),
@@ -241,11 +411,11 @@ class ServerManager:
                 "allow-flight": "false",
                 "white-list": "false",
                 "online-mode": "false",
-                "enable-rcon": "false",
-                "rcon-port": "25575",
-                "rcon-password": "",
-                "enable-query": "false",
-                "query-port": "25565"
+                "enable-rcon": "true" if self.rcon_enabled else "false",
+                "rcon-port": str(self.rcon_port),
+                "rcon-password": self.rcon_password if self.rcon_enabled else "",
+                "enable-query": "true" if self.config.get('enable_query', False) else "false",
+                "query-port": str(self.config.get('query_port', self.config.get('port', 25565)))
             }
             
             properties_file = self.server_dir / "server.properties"
@@ -257,17 +427,17 @@ class ServerManager:
                         f.write(f"{key}={value}\n")
             except PermissionError:
                 logging.error(f"Cannot write server.properties: Permission denied")
-                return False
+                return "Cannot write server.properties: Permission denied"
             except Exception as e:
                 logging.error(f"Failed to create server.properties: {e}")
-                return False
+                return f"Failed to create server.properties: {e}"
             
             logging.info("Server properties created successfully")
-            return True
+            return None
             
         except Exception as e:
             logging.error(f"Failed to create server properties: {e}")
-            return False
+            return f"Failed to create server properties: {e}"
 
     def _check_system_resources(self):
         """Check system resources (memory, disk space)"""
@@ -277,6 +447,7 @@ class ServerManager:
             # Check available memory
             memory = psutil.virtual_memory()
             available_gb = memory.available / (1024**3)
+            total_gb = memory.total / (1024**3)
             
             # Check disk space
             disk = psutil.disk_usage(str(self.server_dir))
@@ -291,6 +462,7 @@ class ServerManager:
                     'sufficient': False,
                     'message': f'Only {available_gb:.1f}GB RAM available, {min_memory_gb}GB recommended',
                     'available_memory_gb': available_gb,
+                    'total_memory_gb': total_gb,
                     'available_disk_gb': available_disk_gb
                 }
             
@@ -299,6 +471,7 @@ class ServerManager:
                     'sufficient': False,
                     'message': f'Only {available_disk_gb:.1f}GB disk space available, {min_disk_gb}GB recommended',
                     'available_memory_gb': available_gb,
+                    'total_memory_gb': total_gb,
                     'available_disk_gb': available_disk_gb
                 }
             
@@ -306,6 +479,7 @@ class ServerManager:
                 'sufficient': True,
                 'message': f'System resources OK: {available_gb:.1f}GB RAM, {available_disk_gb:.1f}GB disk',
                 'available_memory_gb': available_gb,
+                'total_memory_gb': total_gb,
                 'available_disk_gb': available_disk_gb
             }
             
@@ -346,46 +520,14 @@ class ServerManager:
     def _start_forge_server(self, forge_files, java_info, memory_info):
         """Start a Forge server using the proper startup method"""
         try:
-            # Determine memory allocation based on available resources
-            if memory_info['available_memory_gb']:
-                available_gb = memory_info['available_memory_gb']
-                if available_gb >= 8:
-                    max_heap = "4G"
-                    min_heap = "2G"
-                elif available_gb >= 4:
-                    max_heap = "3G"
-                    min_heap = "1G"
-                else:
-                    max_heap = "2G"
-                    min_heap = "1G"
-            else:
-                max_heap = "2G"
-                min_heap = "1G"
+            # Size the heap and pick GC flags for this launch
+            plan = self._plan_jvm(memory_info)
             
-            # Create or update user_jvm_args.txt with memory settings
+            # Forge's run scripts read JVM arguments from user_jvm_args.txt
             user_jvm_args = forge_files['user_jvm_args']
             if user_jvm_args:
                 with open(user_jvm_args, 'w') as f:
-                    f.write(f"-Xmx{max_heap}\n")
-                    f.write(f"-Xms{min_heap}\n")
-                    f.write("-XX:+UseG1GC\n")
-                    f.write("-XX:+ParallelRefProcEnabled\n")
-                    f.write("-XX:MaxGCPauseMillis=200\n")
-                    f.write("-XX:+UnlockExperimentalVMOptions\n")
-                    f.write("-XX:+DisableExplicitGC\n")
-                    f.write("-XX:+AlwaysPreTouch\n")
-                    f.write("-XX:G1NewSizePercent=30\n")
-                    f.write("-XX:G1MaxNewSizePercent=40\n")
-                    f.write("-XX:G1HeapRegionSize=8M\n")
-                    f.write("-XX:G1ReservePercent=20\n")
-                    f.write("-XX:G1HeapWastePercent=5\n")
-                    f.write("-XX:G1MixedGCCountTarget=4\n")
-                    f.write("-XX:InitiatingHeapOccupancyPercent=15\n")
-                    f.write("-XX:G1MixedGCLiveThresholdPercent=90\n")
-                    f.write("-XX:G1RSetUpdatingPauseTimePercent=5\n")
-                    f.write("-XX:SurvivorRatio=32\n")
-                    f.write("-XX:+PerfDisableSharedMem\n")
-                    f.write("-XX:MaxTenuringThreshold=1\n")
+                    f.write("\n".join(plan.jvm_args + self._gc_log_args(java_info)) + "\n")
             
             # Build Forge startup command using the specific Java path
             cmd = [java_info['path']]
@@ -415,21 +557,26 @@ class ServerManager:
                 universal_newlines=True,
                 creationflags=subprocess.CREATE_NEW_CONSOLE if os.name == 'nt' else 0
             )
+            self.startup_profiler.spawned('forge', java=java_info['version'], heap_max_mb=plan.heap_max_mb,
+                                          mods=self._mod_count())
             
-            # Wait a moment to see if process starts successfully
-            time.sleep(2)
-            
+            # A JVM that can't start at all (bad flags, wrong Java) exits at once; later
+            # failures are the supervisor's, and readiness comes from the "Done" line
             if self.server_process.poll() is not None:
-                # Process terminated immediately
                 logging.error("Forge server process terminated immediately")
                 return False
             
             self.is_running = True
+            self.start_time = time.time()
+            self.sampler.attach(self.server_process.pid)
+            self.jvm_tuner.record_launch(plan, 'forge')
             
             # Start output monitoring thread
             threading.Thread(target=self.monitor_server_output, daemon=True).start()
+            self.stop_requested = False
+            self.supervisor.watch(self.server_process)
             
-            logging.info(f"Forge server started successfully with {max_heap} max heap, {min_heap} min heap")
+            logging.info(f"Forge server started successfully with {' '.join(plan.memory_args)} ({plan.flag_set})")
             return True
             
         except PermissionError:
@@ -445,45 +592,14 @@ class ServerManager:
     def _start_standard_server(self, server_jar, java_info, memory_info):
         """Start a standard Minecraft server (vanilla or other modloaders)"""
         try:
-            # Determine memory allocation based on available resources
-            if memory_info['available_memory_gb']:
-                available_gb = memory_info['available_memory_gb']
-                if available_gb >= 8:
-                    max_heap = "4G"
-                    min_heap = "2G"
-                elif available_gb >= 4:
-                    max_heap = "3G"
-                    min_heap = "1G"
-                else:
-                    max_heap = "2G"
-                    min_heap = "1G"
-            else:
-                max_heap = "2G"
-                min_heap = "1G"
+            # Size the heap and pick GC flags for this launch
+            plan = self._plan_jvm(memory_info)
             
-            # Build command with optimized JVM arguments using the specific Java path
+            # Build command with the planned JVM arguments using the specific Java path
             cmd = [
                 java_info['path'],
-                f"-Xmx{max_heap}",
-                f"-Xms{min_heap}",
-                "-XX:+UseG1GC",
-                "-XX:+ParallelRefProcEnabled",
-                "-XX:MaxGCPauseMillis=200",
-                "-XX:+UnlockExperimentalVMOptions",
-                "-XX:+DisableExplicitGC",
-                "-XX:+AlwaysPreTouch",
-                "-XX:G1NewSizePercent=30",
-                "-XX:G1MaxNewSizePercent=40",
-                "-XX:G1HeapRegionSize=8M",
-                "-XX:G1ReservePercent=20",
-                "-XX:G1HeapWastePercent=5",
-                "-XX:G1MixedGCCountTarget=4",
-                "-XX:InitiatingHeapOccupancyPercent=15",
-                "-XX:G1MixedGCLiveThresholdPercent=90",
-                "-XX:G1RSetUpdatingPauseTimePercent=5",
-                "-XX:SurvivorRatio=32",
-                "-XX:+PerfDisableSharedMem",
-                "-XX:MaxTenuringThreshold=1",
+                *plan.jvm_args,
+                *self._gc_log_args(java_info),
                 "-jar", str(server_jar),
                 "nogui"
             ]
@@ -500,21 +616,26 @@ class ServerManager:
                 universal_newlines=True,
                 creationflags=subprocess.CREATE_NEW_CONSOLE if os.name == 'nt' else 0
             )
+            self.startup_profiler.spawned('standard', java=java_info['version'], heap_max_mb=plan.heap_max_mb,
+                                          mods=self._mod_count())
             
-            # Wait a moment to see if process starts successfully
-            time.sleep(2)
-            
+            # A JVM that can't start at all (bad flags, wrong Java) exits at once; later
+            # failures are the supervisor's, and readiness comes from the "Done" line
             if self.server_process.poll() is not None:
-                # Process terminated immediately
                 logging.error("Standard server process terminated immediately")
                 return False
             
             self.is_running = True
+            self.start_time = time.time()
+            self.sampler.attach(self.server_process.pid)
+            self.jvm_tuner.record_launch(plan, 'standard')
             
             # Start output monitoring thread
             threading.Thread(target=self.monitor_server_output, daemon=True).start()
+            self.stop_requested = False
+            self.supervisor.watch(self.server_process)
             
-            logging.info(f"Standard server started successfully with {max_heap} max heap, {min_heap} min heap")
+            logging.info(f"Standard server started successfully with {' '.join(plan.memory_args)} ({plan.flag_set})")
             return True
             
         except PermissionError:
@@ -527,45 +648,217 @@ class ServerManager:
             logging.error(f"Failed to start standard server process: {e}")
             return False
             
+    def _plan_jvm(self, memory_info):
+        """Plan heap size and GC flags for a launch and make it the current plan"""
+        plan = self.preview_jvm_plan(memory_info)
+        self.jvm_plan = plan
+        self._jvm_planned_at = time.time()
+        self._out_of_memory = False
+        logging.info(f"JVM plan: {' '.join(plan.memory_args)} ({plan.flag_set}"
+                     f"{', pre-touch' if plan.pretouch else ''}): {'; '.join(plan.reasons)}")
+        return plan
+        
+    def preview_jvm_plan(self, memory_info=None):
+        """Plan heap size and GC flags from the memory budget, host memory, mods and past runs"""
+        if memory_info is None:
+            memory_info = self._check_system_resources()
+        try:
+            budget_mb = parse_memory_mb(self.config.get('java_memory', 'auto'))
+        except ValueError as e:
+            logging.warning(f"Ignoring java_memory setting: {e}")
+            budget_mb = None
+        
+        total_gb = memory_info.get('total_memory_gb')
+        available_gb = memory_info.get('available_memory_gb')
+        mod_count = self._mod_count()
+        
+        return self.jvm_tuner.plan(
+            budget_mb,
+            int(total_gb * 1024) if total_gb else None,
+            int(available_gb * 1024) if available_gb else None,
+            mod_count
+        )
+        
+    def _mod_count(self):
+        return len(list(self.mods_dir.glob("*.jar"))) if self.mods_dir.exists() else 0
+        
+    def _gc_log_args(self, java_info):
+        """Flags for a rotating GC log in logs/, in the syntax the launching Java understands"""
+        if not self.config.get('gc_logging', True):
+            return []
+        (self.server_dir / GC_LOG_FILE).parent.mkdir(parents=True, exist_ok=True)
+        return gc_log_args(java_info.get('major'))
+        
+    def _record_jvm_result(self):
+        """Record how the current launch's heap held up, for the next launch's plan"""
+        if not self.jvm_plan:
+            return
+        live_heap_mb = gc = None
+        try:
+            summary = self.gc_log.summary(since=self._jvm_planned_at, trend_points=0)
+            if summary['events']:
+                live_heap_mb = summary['heap_after_gc']['max_mb']
+                gc = {
+                    'events': summary['events'],
+                    'p99_ms': summary['pauses']['p99_ms'],
+                    'max_ms': summary['pauses']['max_ms'],
+                    'long_pauses': summary['pauses']['long_pauses'],
+                    'overhead_percent': summary['pauses']['overhead_percent'],
+                    'allocation_mb_per_sec': summary['allocation']['average_mb_per_sec']
+                }
+        except Exception as e:
+            logging.warning(f"Could not read GC log: {e}")
+        
+        self.jvm_tuner.record_result(
+            self.jvm_plan.id,
+            peak_rss_mb=round(self.sampler.peak_rss_mb, 1) if self.sampler.peak_rss_mb else None,
+            oom=self._out_of_memory,
+            live_heap_mb=live_heap_mb,
+            gc=gc
+        )
+        self.jvm_plan = None
+        
+    def get_gc_summary(self, since=None):
+        """GC pause, allocation and heap-after-GC analytics (since a timestamp, or the current launch)"""
+        if since is None and self.is_running:
+            since = self._jvm_planned_at
+        summary = self.gc_log.summary(since=since)
+        summary['enabled'] = bool(self.config.get('gc_logging', True))
+        return summary
+        
+    def handle_out_of_memory(self, event):
+        """Remember that the JVM ran out of memory so the next launch gets a bigger heap"""
+        self._out_of_memory = True
+        logging.error(f"Server ran out of memory: {event.line}")
+        
     def stop_server(self):
-        """Stop the Minecraft server"""
+        """Stop the Minecraft server; last_stop records whether it stopped, was killed or had already exited"""
+        self.supervisor.cancel_restart()
         if not self.is_running or not self.server_process:
+            self.last_stop = 'not_running'
             return False
-            
+        
+        process = self.server_process
+        self.stop_requested = True
         try:
-            # Send stop command to server
-            self.send_server_command("stop")
+            # Send stop command over stdin; the RCON connection drops as the server shuts down
+            self._write_stdin("stop")
+            self._close_rcon()
             
             # Wait for process to terminate
-            self.server_process.wait(timeout=30)
-            self.is_running = False
-            self.server_process = None
+            process.wait(timeout=30)
+            self._cleanup_process(process)
             
             logging.info("Server stopped successfully")
+            self.last_stop = 'stopped'
             return True
             
         except Exception as e:
             logging.error(f"Failed to stop server: {e}")
             # Force kill if necessary
-            if self.server_process:
-                self.server_process.kill()
-                self.is_running = False
+            process.kill()
+            self._cleanup_process(process)
+            self.last_stop = 'killed'
             return False
             
+    def _cleanup_process(self, process):
+        """Reset server state after its process has exited.
+        
+        Called by stop_server and by the supervisor's watcher; only the first
+        call for a given process does anything.
+        """
+        with self._exit_lock:
+            if self.server_process is not process:
+                return False
+            self.is_running = False
+            self.server_process = None
+            self.start_time = None
+            self._close_rcon()
+            self.players.end_all_sessions()
+            self._record_jvm_result()
+            self.sampler.detach()
+            return True
+            
     def send_server_command(self, command):
         """Send a command to the running server"""
-        if self.server_process and self.is_running and self.server_process.stdin:
+        if not self.is_running:
+            logging.warning("Server not running")
+            return False
+        
+        try:
+            self.execute_command(command)
+            return True
+        except Exception as e:
+            logging.error(f"Failed to send command: {e}")
+            return False
+            
+    def execute_command(self, command, timeout=10):
+        """Run a command and return its output.
+        
+        Uses RCON when available so the caller gets the command's reply. Falls
+        back to the server's stdin (returning None) if RCON is disabled or the
+        server hasn't opened its RCON listener yet.
+        """
+        if not self.is_running:
+            raise RuntimeError("Server not running")
+        
+        rcon = self._get_rcon()
+        if rcon:
+            try:
+                output = rcon.command(command, timeout)
+                logging.info(f"Sent command to server via RCON: {command}")
+                return output
+            except (RconError, OSError) as e:
+                logging.warning(f"RCON command failed, falling back to stdin: {e}")
+        
+        if not self._write_stdin(command):
+            raise RuntimeError("Server stdin not available")
+        return None
+            
+    def _write_stdin(self, command):
+        """Write a command line to the server's stdin"""
+        if not self.server_process or not self.server_process.stdin:
+            logging.warning("Server not running or stdin not available")
+            return False
+        
+        # Serialize writers so concurrent commands can't interleave on the pipe
+        with self._stdin_lock:
             try:
                 self.server_process.stdin.write(command + "\n")
                 self.server_process.stdin.flush()
                 logging.info(f"Sent command to server: {command}")
                 return True
             except Exception as e:
-                logging.error(f"Failed to send command: {e}")
+                logging.error(f"Failed to write command to server: {e}")
                 return False
-        else:
-            logging.warning("Server not running or stdin not available")
-            return False
+            
+    def _get_rcon(self):
+        """Get the RCON pool, creating it on first use"""
+        if not self.rcon_enabled:
+            return None
+        if not self.rcon:
+            self.rcon = RconPool('127.0.0.1', self.rcon_port, self.rcon_password,
+                                 size=self.config.get('rcon_connections', 2))
+        return self.rcon
+        
+    def _close_rcon(self):
+        if self.rcon:
+            self.rcon.close()
+            self.rcon = None
+            
+    def _load_rcon_password(self):
+        """Load the generated RCON password, creating one on first run"""
+        secret_file = self.data_dir / "rcon_password"
+        try:
+            if secret_file.exists():
+                return secret_file.read_text().strip()
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            password = secrets.token_urlsafe(24)
+            secret_file.write_text(password)
+            return password
+        except Exception as e:
+            logging.warning(f"Failed to persist RCON password: {e}")
+            return secrets.token_urlsafe(24)
         
     def monitor_server_output(self):
         """Monitor server output for logs and status"""
@@ -574,37 +867,53 @@ class ServerManager:
             
         for line in iter(self.server_process.stdout.readline, ''):
             if line:
-                # Log the output
+                # Log the output and keep it available for live tailing
                 logging.info(line.strip())
+                offset = self.console.append(line)
+                self.startup_profiler.on_output()
                 
-                # Check for server ready message
-                if "Done" in line and "For help" in line:
-                    logging.info("Server is ready for connections")
-                    
-                # Check for player join/leave
-                if "joined the game" in line:
-                    self.handle_player_join(line)
-                elif "left the game" in line:
-                    self.handle_player_leave(line)
+                # Classify the line and notify event subscribers
+                self.events.dispatch(line, offset)
                     
-    def handle_player_join(self, line):
-        """Handle player join events"""
-        # Extract player name from log line
-        # Format: [Server thread/INFO]: PlayerName joined the game
+    def get_console_lines(self, offset=None, limit=None):
+        """Get buffered console lines starting at offset"""
+        lines, next_offset = self.console.read(offset, limit)
+        return {
+            'lines': lines,
+            'next_offset': next_offset,
+            'first_offset': self.console.first_offset
+        }
+            
+    def _on_supervisor_event(self, event, details):
+        if event == 'exit':
+            self.startup_profiler.on_exit(details['expected'])
+            # Close a lag incident while its GC log window is still on disk
+            self.lag_incidents.close_current()
+            
+    def handle_server_ready(self, event):
+        """Handle the server finishing startup"""
+        logging.info("Server is ready for connections")
+        
+        # Open RCON connections now so the first command doesn't pay for the handshake
+        rcon = self._get_rcon()
+        if rcon:
+            threading.Thread(target=self._warm_up_rcon, args=(rcon,), daemon=True).start()
+            
+    def _warm_up_rcon(self, rcon):
         try:
-            player_name = line.split("]: ")[1].split(" joined")[0]
-            logging.info(f"Player {player_name} joined the game")
-        except:
-            pass
+            rcon.connect()
+        except Exception as e:
+            logging.warning(f"RCON not available yet: {e}")
             
-    def handle_player_leave(self, line):
+    def handle_player_join(self, event):
+        """Handle player join events"""
+        self.players.on_join(event)
+        logging.info(f"Player {event.data['player']} joined the game")
+            
+    def handle_player_leave(self, event):
         """Handle player leave events"""
-        # Extract player name from log line
-        try:
-            player_name = line.split("]: ")[1].split(" left")[0]
-            logging.info(f"Player {player_name} left the game")
-        except:
-            pass
+        self.players.on_leave(event)
+        logging.info(f"Player {event.data['player']} left the game")
             
     def find_server_jar(self):
         """Find the server jar file with improved Forge detection"""
@@ -698,36 +1007,23 @@ class ServerManager:
         
     def _is_valid_server_jar(self, jar_path):
         """Check if a JAR file is a valid Minecraft server JAR with improved Forge detection"""
+        return self.jar_cache.lookup(jar_path, 'valid_server', lambda: self._inspect_valid_server_jar(jar_path))
+
+    def _inspect_valid_server_jar(self, jar_path):
+        """Open a JAR and check its contents for server indicators (uncached)"""
         try:
-            import zipfile
-            with zipfile.ZipFile(jar_path, 'r') as jar:
-                file_list = jar.namelist()
-                
-                # Check for Forge server JARs specifically
-                if self._is_forge_server_jar(jar_path, file_list):
-                    return True
-                
-                # Check for essential server files
-                server_indicators = [
-                    'META-INF/MANIFEST.MF',
-                    'net/minecraft/server/',
-                    'com/mojang/',
-                    'META-INF/mods.toml',  # Forge mods
-                    'fabric.mod.json',     # Fabric mods
-                    'server.properties',
-                    'eula.txt'
-                ]
-                
-                # Check for any server indicator
-                for indicator in server_indicators:
-                    if any(indicator in f for f in file_list):
-                        return True
-                
-                # Check for Minecraft server classes
-                if any('minecraft' in f.lower() and 'server' in f.lower() for f in file_list):
-                    return True
-                    
-                return False
+            jar_name = jar_path.name.lower()
+            is_forge_named = "forge" in jar_name and "server" in jar_name
+            
+            # Forge server JARs with a version in the name only need to be readable
+            if is_forge_named and any(char.isdigit() for char in jar_name):
+                next(iter_entry_names(jar_path), None)
+                return True
+            
+            # One pass over the entry names answers every indicator; the
+            # first hit is enough to call it a server JAR
+            matcher = FORGE_NAMED_SERVER_JAR_MATCHER if is_forge_named else SERVER_JAR_MATCHER
+            return bool(scan_jar(jar_path, matcher, any_hit))
                 
         except zipfile.BadZipFile:
             logging.warning(f"Invalid JAR file: {jar_path}")
@@ -743,18 +1039,8 @@ class ServerManager:
         # Check if it's a Forge server JAR by name and contents
         if "forge" in jar_name and "server" in jar_name:
             # Check for Forge-specific files
-            forge_indicators = [
-                'META-INF/mods.toml',
-                'net/minecraftforge/',
-                'cpw/mods/',
-                'org/spongepowered/',
-                'fml/',
-                'forge-'
-            ]
-            
-            for indicator in forge_indicators:
-                if any(indicator in f for f in file_list):
-                    return True
+            if FORGE_SERVER_JAR_MATCHER.scan(file_list, any_hit):
+                return True
             
             # Check for Forge version in JAR name
             if any(char.isdigit() for char in jar_name):
@@ -793,23 +1079,12 @@ class ServerManager:
                     logging.info(f"Required Forge file missing: {file_path}")
                     return False
             
-            # Check Java compatibility
-            java_info = self._check_java_installation()
+            # Check for a Java runtime compatible with this Forge version
+            java_info = self._check_java_installation(forge_files['version'])
             if not java_info['available']:
                 logging.info(f"Java not available: {java_info['error']}")
                 return False
             
-            # Check if Java version is compatible with Forge
-            if java_info['version']:
-                import re
-                version_match = re.search(r'(\d+)', java_info['version'])
-                if version_match:
-                    java_major = int(version_match.group(1))
-                    # Forge 1.21.x requires Java 21+
-                    if java_major < 21:
-                        logging.info(f"Java {java_major} is too old for Forge 1.21.x (requires Java 21+)")
-                        return False
-            
             logging.info(f"Forge {forge_files['version']} is properly installed and ready")
             return True
             
@@ -845,27 +1120,20 @@ class ServerManager:
 
     def _verify_forge_server_jar(self, jar_path):
         """Verify that a JAR is actually a Forge server JAR by checking its contents"""
+        return self.jar_cache.lookup(jar_path, 'forge_server', lambda: self._inspect_forge_server_jar(jar_path))
+
+    def _inspect_forge_server_jar(self, jar_path):
+        """Open a JAR and check its contents for Forge server files (uncached)"""
         try:
-            import zipfile
-            with zipfile.ZipFile(jar_path, 'r') as jar:
-                file_list = jar.namelist()
-                
-                # Check for Forge-specific files that indicate this is a server JAR
-                forge_indicators = [
-                    'META-INF/mods.toml',
-                    'net/minecraftforge/',
-                    'cpw/mods/',
-                    'org/spongepowered/',
-                    'fml/',
-                    'META-INF/MANIFEST.MF'
-                ]
-                
-                has_forge_files = any(any(indicator in f for f in file_list) for indicator in forge_indicators)
-                
-                # Also check that it's not an installer
-                is_installer = any('installer' in f.lower() for f in file_list)
-                
-                return has_forge_files and not is_installer
+            # An installer entry settles it, so stop scanning as soon as one shows up
+            hits = scan_jar(jar_path, VERIFY_FORGE_MATCHER, lambda found: 'installer' in found)
+            
+            has_forge_files = bool(hits - {'installer'})
+            
+            # Also check that it's not an installer
+            is_installer = 'installer' in hits
+            
+            return has_forge_files and not is_installer
                 
         except Exception as e:
             logging.warning(f"Error verifying JAR {jar_path}: {e}")
@@ -901,20 +1169,13 @@ class ServerManager:
                 status['issues'].append("Could not determine Forge version from JAR name")
                 return status
             
-            # Check Java compatibility
-            java_info = self._check_java_installation()
+            # Check for a Java runtime compatible with this Forge version
+            java_info = self._check_java_installation(version)
             if not java_info['available']:
                 status['issues'].append(f"Java not available: {java_info['error']}")
             else:
                 status['java_compatible'] = True
-                if java_info['version']:
-                    import re
-                    version_match = re.search(r'(\d+)', java_info['version'])
-                    if version_match:
-                        java_major = int(version_match.group(1))
-                        if java_major < 21:
-                            status['issues'].append(f"Java {java_major} is too old for Forge 1.21.x (requires Java 21+)")
-                            status['java_compatible'] = False
+                status['java_version'] = java_info['version']
             
             # Check startup files
             forge_files = self._get_forge_startup_files(server_jar)
@@ -1127,114 +1388,460 @@ class ServerManager:
             })
         return mods
         
-    def backup_world(self):
-        """Create a backup of the world"""
-        try:
-            if not self.world_dir.exists():
+    def backup_world(self, wait=False, trigger='manual'):
+        """Create a backup of the world.
+        
+        While the server is running the backup is taken live: saving is turned
+        off just long enough to flush and stage the world, then turned back on,
+        and the slow part (hashing or compressing) finishes in the background.
+        Pass wait=True to block until the backup is complete.
+        """
+        if not self.world_dir.exists():
+            return False
+        job = {
+            'id': uuid.uuid4().hex[:12],
+            'trigger': trigger,
+            'started': time.time(),
+            'mode': self.config.get('backup_mode', 'incremental'),
+            'live': bool(self.is_running and self.config.get('live_backup', True))
+        }
+        if not self._backup_lock.acquire(blocking=False):
+            operation = self.backup_operation
+            # A second backup is pointless, but maintenance only delays this one
+            if operation == 'backup' or not self._backup_lock.acquire(
+                    timeout=self.config.get('backup_maintenance_wait', BACKUP_MAINTENANCE_WAIT)):
+                reason = f"{(operation or 'backup').capitalize()} already in progress"
+                logging.warning(reason)
+                self.backup_jobs.record(dict(job, status='skipped', error=reason))
                 return False
-                
-            backup_dir = Path("backups")
-            backup_dir.mkdir(exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_name = f"world_backup_{timestamp}.zip"
-            backup_path = backup_dir / backup_name
-            
-            # Create zip backup
-            shutil.make_archive(
-                str(backup_path.with_suffix('')),
-                'zip',
-                self.world_dir
-            )
+        
+        try:
+            self.backup_operation = 'backup'
+            self.last_backup_error = None
+            self._backup_job = job
+            self.backup_status = {'state': 'starting', 'started': job['started'], 'job_id': job['id']}
+            
+            if not job['live']:
+                self._write_backup(self.world_dir)
+                self._finish_backup()
+                return True
             
-            logging.info(f"World backed up to {backup_path}")
-            return True
+            staging = self._stage_live_world()
+            self._backup_thread = threading.Thread(target=self._complete_live_backup, args=(staging,), daemon=True)
+            self._backup_thread.start()
             
         except Exception as e:
             logging.error(f"Failed to backup world: {e}")
+            self.last_backup_error = str(e)
+            self._finish_backup()
             return False
+        
+        if wait:
+            self._backup_thread.join()
+            return self.last_backup_error is None
+        return True
+        
+    @property
+    def backup_in_progress(self):
+        """Whether a backup (not a prune, restore or trim) is running"""
+        return self.backup_operation == 'backup'
+        
+    @contextmanager
+    def _backup_maintenance(self, operation):
+        """Hold the backup lock for a prune, restore or trim, waiting out any running backup"""
+        with self._backup_lock:
+            self.backup_operation = operation
+            try:
+                yield
+            finally:
+                self.backup_operation = None
+        
+    def _stage_live_world(self):
+        """Flush the running server's world to disk and stage a consistent copy of it"""
+        full_copy = self.config.get('backup_mode', 'incremental') == 'zip'
+        previous = None if full_copy else self.backup_store.latest_manifest()
+        staging_dir = self.backup_dir / "staging" / datetime.now().strftime("%Y%m%d_%H%M%S")
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        timeout = self.config.get('backup_flush_timeout', 60)
+        
+        paused_at = time.time()
+        self.execute_command("save-off")
+        try:
+            self.backup_status['state'] = 'flushing'
+            # Listen before asking, so a fast confirmation isn't missed
+            waiter = self.events.expect(console_events.SAVE_COMPLETE)
+            output = self.execute_command("save-all flush", timeout=timeout)
+            if output and 'Saved the game' in output:
+                waiter.cancel()
+            elif not waiter.wait(timeout):
+                raise RuntimeError(f"Server did not confirm the save within {timeout}s")
+            flushed_at = time.time()
+            
+            self.backup_status['state'] = 'staging'
+            staging = self.stager.stage(self.world_dir, staging_dir, previous['files'] if previous else None)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        finally:
+            try:
+                self.execute_command("save-on")
+            except Exception as e:
+                logging.error(f"Failed to turn saving back on after backup: {e}")
+        
+        staging['staging_dir'] = staging_dir
+        staging['flush_seconds'] = round(flushed_at - paused_at, 3)
+        staging['paused_seconds'] = round(time.time() - paused_at, 3)
+        self.backup_status.update(state='writing', paused_seconds=staging['paused_seconds'])
+        logging.info(
+            f"World staged for backup: saving paused {staging['paused_seconds']}s "
+            f"({staging['staged']} files staged, {len(staging['carried'])} unchanged)"
+        )
+        return staging
+        
+    def _complete_live_backup(self, staging):
+        try:
+            self._write_backup(staging['staging_dir'], staging)
+        except Exception as e:
+            logging.error(f"Failed to backup world: {e}")
+            self.last_backup_error = str(e)
+        finally:
+            shutil.rmtree(staging['staging_dir'], ignore_errors=True)
+            self._finish_backup()
+            
+    def _finish_backup(self):
+        job = self._backup_job
+        finished = time.time()
+        job.update(
+            finished=finished,
+            duration=round(finished - job['started'], 3),
+            status='failed' if self.last_backup_error else 'success',
+            error=self.last_backup_error
+        )
+        if not self.last_backup_error and self.last_backup:
+            job['backup_id'] = self.last_backup['id']
+            if 'live' in self.last_backup:
+                job['paused_seconds'] = self.last_backup['live']['paused_seconds']
+        self.backup_jobs.record(job)
+        
+        self._backup_job = None
+        self.backup_status = {'state': 'idle'}
+        self.backup_operation = None
+        self._backup_lock.release()
+        
+    def prune_backups(self, policy=None):
+        """Delete backups outside the grandfather-father-son retention policy"""
+        policy = policy or self.config.get('backup_retention')
+        removed = 0
+        
+        # Wait out any running backup so it can't reference blocks being collected
+        with self._backup_maintenance('prune'):
+            backups = self.list_backups()
+            
+            # Snapshots and zips are separate backup series, each with its own retention
+            for backup_type in ('snapshot', 'zip'):
+                series = [b for b in backups if b['type'] == backup_type]
+                retained = select_retained(series, policy)
+                for backup in series:
+                    if backup['id'] in retained:
+                        continue
+                    try:
+                        if backup_type == 'snapshot':
+                            self.backup_store.delete_snapshot(backup['id'])
+                        else:
+                            (self.backup_dir / backup['id']).unlink()
+                        removed += 1
+                    except Exception as e:
+                        logging.warning(f"Failed to prune backup {backup['id']}: {e}")
+            
+            if removed:
+                self.backup_store.collect_garbage()
+                logging.info(f"Pruned {removed} backups outside the retention policy")
+        return removed
+        
+    def _write_backup(self, source_dir, staging=None):
+        """Write a backup of source_dir to the configured backup format"""
+        if self.config.get('backup_mode', 'incremental') == 'zip':
+            self._backup_world_zip(source_dir)
+            return
+        
+        # Incremental snapshot: only changed blocks are written
+        snapshot = self.backup_store.create_snapshot(
+            source_dir,
+            carried_files=staging['carried'] if staging else None,
+            source=self.world_dir
+        )
+        if staging:
+            snapshot['live'] = {
+                'paused_seconds': staging['paused_seconds'],
+                'flush_seconds': staging['flush_seconds'],
+                'staged_files': staging['staged'],
+                'staged_bytes': staging['bytes'],
+                'stage_methods': staging['methods']
+            }
+        self.last_backup = snapshot
+        logging.info(f"World snapshot {snapshot['id']} created in {self.backup_store.root}")
+            
+    def _backup_world_zip(self, source_dir=None):
+        """Create a full zip backup of the world"""
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        backup_name = f"world_backup_{timestamp}.zip"
+        backup_path = self.backup_dir / backup_name
+        
+        # Region files are stored as-is; everything else is compressed in parallel
+        writer = ArchiveWriter(
+            codec=self.config.get('backup_codec', 'deflate'),
+            level=self.config.get('backup_compression_level'),
+            workers=self.config.get('backup_workers')
+        )
+        stats = writer.write(source_dir or self.world_dir, backup_path)
+        self.last_backup = dict(stats, id=backup_name, type='zip', created=datetime.now().isoformat())
+        
+        logging.info(f"World backed up to {backup_path}")
+        return True
             
+    @property
+    def backup_store(self):
+        """Content-addressed snapshot store under backups/store"""
+        if not self._backup_store:
+            self._backup_store = BackupStore(self.backup_dir / "store")
+        return self._backup_store
+        
+    def list_backups(self):
+        """List incremental snapshots and legacy zip backups, newest first"""
+        backups = [dict(snapshot, type='snapshot') for snapshot in self.backup_store.list_snapshots()]
+        
+        if self.backup_dir.exists():
+            for zip_file in self.backup_dir.glob("*.zip"):
+                stat = zip_file.stat()
+                backups.append({
+                    'id': zip_file.name,
+                    'type': 'zip',
+                    'created': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                    'total_bytes': stat.st_size
+                })
+        
+        backups.sort(key=lambda b: b['created'], reverse=True)
+        return backups
+            
+    def restore_backup(self, backup_id):
+        """Restore the world from a snapshot or zip backup.
+        
+        The backup is streamed into a staging world and verified file by file;
+        the current world is only swapped out once everything checks out.
+        """
+        if self.is_running:
+            raise RuntimeError("Stop the server before restoring a backup")
+        if Path(backup_id).name != backup_id:
+            raise RestoreError(f"Invalid backup id {backup_id!r}")
+        
+        restorer = WorldRestorer(self.world_dir)
+        # Hold the backup lock so a scheduled backup can't run mid-restore
+        with self._backup_maintenance('restore'):
+            zip_path = self.backup_dir / backup_id
+            if backup_id.endswith('.zip') and zip_path.is_file():
+                stats = restorer.restore_zip(zip_path)
+            else:
+                stats = restorer.restore_snapshot(self.backup_store, backup_id)
+            previous = restorer.swap_in(keep_previous=self.config.get('keep_pre_restore_world', True))
+        
+        stats['backup_id'] = backup_id
+        stats['previous_world'] = str(previous) if previous else None
+        logging.info(
+            f"Restored world from {backup_id}: {stats['files']} files, "
+            f"{stats['bytes'] / (1024 * 1024):.1f} MB verified in {stats['duration']}s"
+        )
+        return stats
+        
+    def analyze_world(self, read_fields=True):
+        """Report region file sizes and unvisited chunks per dimension"""
+        if not self.world_dir.exists():
+            return {'dimensions': {}, 'total_bytes': 0, 'total_chunks': 0, 'unvisited_chunks': 0}
+        threshold = region_files.seconds_to_ticks(self.config.get('trim_min_inhabited_seconds', 0))
+        return region_files.analyze_world(self.world_dir, read_fields, threshold)
+        
+    def trim_world(self, min_inhabited_seconds=None, protect_radius=None, dimensions=None, dry_run=True):
+        """Delete chunks players never really visited so the game regenerates them.
+        
+        A chunk is unvisited if players spent at most min_inhabited_seconds in
+        it. Chunks within protect_radius of spawn are kept. Unless dry_run,
+        the server must be stopped, and a backup is taken first.
+        """
+        if min_inhabited_seconds is None:
+            min_inhabited_seconds = self.config.get('trim_min_inhabited_seconds', 0)
+        if protect_radius is None:
+            protect_radius = self.config.get('trim_protect_radius', 12)
+        
+        if not dry_run:
+            if self.is_running:
+                raise RuntimeError("Stop the server before trimming the world")
+            if self.config.get('backup_before_trim', True) and not self.backup_world(wait=True, trigger='trim'):
+                raise RuntimeError("Backup before trimming failed; world left untouched")
+        
+        with self._backup_maintenance('trim'):
+            return region_files.trim_world(
+                self.world_dir,
+                min_inhabited_ticks=region_files.seconds_to_ticks(min_inhabited_seconds),
+                protect_radius=protect_radius,
+                dimensions=dimensions,
+                dry_run=dry_run
+            )
+        
+    def start_pregen(self, radius, center=None, dimension='minecraft:overworld'):
+        """Start pre-generating chunks within radius chunks of center (default: spawn)"""
+        if not self.is_running:
+            raise RuntimeError("Server not running")
+        if self.pregen_job and self.pregen_job.active:
+            raise RuntimeError("Chunk pre-generation is already running")
+        
+        if center is None:
+            spawn = region_files.read_spawn(self.world_dir)
+            center = (spawn[0] >> 4, spawn[1] >> 4) if spawn else (0, 0)
+        
+        self.pregen_job = PregenJob(
+            self,
+            radius=int(radius),
+            center=tuple(center),
+            dimension=dimension,
+            tile_size=self.config.get('pregen_tile_size', 8),
+            batch_delay=self.config.get('pregen_batch_delay', 2.0),
+            pause_when_players=self.config.get('pregen_pause_when_players', True),
+            overload_cooldown=self.config.get('pregen_overload_cooldown', 60.0)
+        )
+        self.pregen_job.start()
+        logging.info(f"Started chunk pre-generation: radius {radius} around {center} in {dimension}")
+        return self.pregen_job.get_status()
+        
     def get_server_status(self):
         """Get current server status"""
         return {
             'running': self.is_running,
             'players_online': self.get_online_players(),
             'uptime': self.get_uptime(),
-            'memory_usage': self.get_memory_usage()
+            'memory_usage': self.get_memory_usage(),
+            'resources': self.sampler.latest() if self.is_running else None,
+            'tick': self.tick_monitor.last_sample if self.is_running else None,
+            'supervisor': self.supervisor.get_status(),
+            'startup': self.startup_profiler.in_progress()
         }
         
     def get_online_players(self):
         """Get list of online players"""
-        # This would require parsing server logs or using server API
-        # For now, return empty list
-        return []
+        return self.players.get_online_players()
         
     def get_uptime(self):
         """Get server uptime"""
-        if not self.is_running:
+        if not self.is_running or not self.start_time:
             return 0
-        # This would track start time and calculate uptime
-        return 0
+        return int(time.time() - self.start_time)
         
     def get_memory_usage(self):
-        """Get memory usage of server process"""
+        """Get memory usage of server process in MB, from the latest resource sample"""
         if not self.server_process:
             return 0
-        try:
-            import psutil
-            process = psutil.Process(self.server_process.pid)
-            return process.memory_info().rss / 1024 / 1024  # MB
-        except:
-            return 0
+        sample = self.sampler.latest()
+        return sample['rss_mb'] if sample else 0
+        
+    def get_resource_history(self, resolution='raw', since=None, limit=None):
+        """Get sampled resource usage of the server process, oldest first"""
+        return self.sampler.history(resolution, since, limit)
 
     def detect_forge_versions(self):
         """Detect all available Forge versions in the server directory"""
-        detected_versions = []
-        
-        if not self.server_dir.exists():
-            return detected_versions
-            
-        for jar_file in self.server_dir.glob("*.jar"):
-            try:
-                # Check if it's a Forge JAR
-                if self._is_forge_jar(jar_file):
-                    version_info = self._extract_forge_version(jar_file)
-                    if version_info:
-                        detected_versions.append(version_info)
-                        
-            except Exception as e:
-                logging.warning(f"Error analyzing JAR {jar_file.name}: {e}")
+        detected_versions = list(self.iter_forge_versions())
                 
         # Sort by version (newest first)
         detected_versions.sort(key=lambda x: x['version_number'], reverse=True)
         return detected_versions
         
+    def iter_forge_versions(self, cancel_event=None):
+        """Yield Forge version info for each JAR as soon as its inspection finishes.
+        
+        JARs are inspected concurrently on a bounded thread pool. Setting
+        cancel_event stops the scan: queued JARs are skipped and iteration
+        ends without waiting for the ones still being inspected.
+        """
+        if not self.server_dir.exists():
+            return
+        
+        jar_files = list(self.server_dir.glob("*.jar"))
+        if not jar_files:
+            return
+        
+        cancel_event = cancel_event or threading.Event()
+        max_workers = min(len(jar_files), self.config.get('forge_scan_workers', min(8, (os.cpu_count() or 1) + 2)))
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="forge-scan")
+        pending = set()
+        
+        try:
+            pending = {executor.submit(self._detect_forge_jar, jar_file, cancel_event) for jar_file in jar_files}
+            # Wake up regularly so a cancel doesn't wait for the slowest inspection
+            while pending and not cancel_event.is_set():
+                done, pending = wait(pending, timeout=FORGE_SCAN_POLL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if cancel_event.is_set():
+                        break
+                    version_info = future.result()
+                    if version_info:
+                        yield version_info
+        finally:
+            # Drop queued JARs; ones already being inspected finish in the background
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+            
+    def _detect_forge_jar(self, jar_file, cancel_event):
+        """Inspect one JAR for Forge version info (runs on the scan pool)"""
+        if cancel_event.is_set():
+            return None
+        try:
+            # Check if it's a Forge JAR
+            if self._is_forge_jar(jar_file):
+                return self._extract_forge_version(jar_file)
+        except Exception as e:
+            logging.warning(f"Error analyzing JAR {jar_file.name}: {e}")
+        return None
+        
+    def start_forge_scan(self):
+        """Register a cancellable Forge scan, returning its ID, cancel event and iterator"""
+        scan_id = uuid.uuid4().hex[:12]
+        cancel_event = threading.Event()
+        self.forge_scans[scan_id] = cancel_event
+        
+        def scan():
+            try:
+                yield from self.iter_forge_versions(cancel_event)
+            finally:
+                self.forge_scans.pop(scan_id, None)
+        
+        return scan_id, cancel_event, scan()
+        
+    def cancel_forge_scan(self, scan_id):
+        """Cancel a running Forge scan"""
+        cancel_event = self.forge_scans.get(scan_id)
+        if not cancel_event:
+            return False
+        cancel_event.set()
+        return True
+        
     def _is_forge_jar(self, jar_path):
         """Check if a JAR file is a Forge server JAR"""
+        return self.jar_cache.lookup(jar_path, 'forge', lambda: self._inspect_forge_jar(jar_path))
+
+    def _inspect_forge_jar(self, jar_path):
+        """Open a JAR and check its contents for Forge indicators (uncached)"""
         try:
-            import zipfile
-            with zipfile.ZipFile(jar_path, 'r') as jar:
-                file_list = jar.namelist()
-                
-                # Check for Forge-specific indicators
-                forge_indicators = [
-                    'net/minecraftforge/',
-                    'META-INF/mods.toml',
-                    'forge-',
-                    'fml/',
-                    'cpw/mods/'
-                ]
-                
-                for indicator in forge_indicators:
-                    if any(indicator in f for f in file_list):
-                        return True
-                        
-                # Check filename for Forge patterns
-                filename = jar_path.name.lower()
-                if 'forge' in filename and ('server' in filename or 'universal' in filename):
-                    return True
+            # Check for Forge-specific indicators, stopping at the first one
+            if scan_jar(jar_path, FORGE_JAR_MATCHER, any_hit):
+                return True
                     
-                return False
+            # Check filename for Forge patterns
+            filename = jar_path.name.lower()
+            if 'forge' in filename and ('server' in filename or 'universal' in filename):
+                return True
+                
+            return False
                 
         except zipfile.BadZipFile:
             return False
@@ -1244,29 +1851,35 @@ class ServerManager:
             
     def _extract_forge_version(self, jar_path):
         """Extract version information from a Forge JAR"""
+        return self.jar_cache.lookup(jar_path, 'forge_version', lambda: self._inspect_forge_version(jar_path))
+
+    def _inspect_forge_version(self, jar_path):
+        """Open a Forge JAR and extract its version information (uncached)"""
         try:
             import zipfile
             import re
             
+            # Try to extract version from filename first; that only needs the
+            # archive to be readable, not its full entry list
+            filename = jar_path.name
+            version_match = re.search(r'forge-(\d+\.\d+\.\d+)-(\d+\.\d+\.\d+)', filename)
+            if version_match:
+                next(iter_entry_names(jar_path), None)
+                minecraft_version = version_match.group(1)
+                forge_version = version_match.group(2)
+                return {
+                    'file': jar_path.name,
+                    'path': str(jar_path),
+                    'minecraft_version': minecraft_version,
+                    'forge_version': forge_version,
+                    'version_number': f"{minecraft_version}-{forge_version}",
+                    'size_mb': round(jar_path.stat().st_size / (1024 * 1024), 1),
+                    'type': 'server'
+                }
+            
             with zipfile.ZipFile(jar_path, 'r') as jar:
                 file_list = jar.namelist()
                 
-                # Try to extract version from filename first
-                filename = jar_path.name
-                version_match = re.search(r'forge-(\d+\.\d+\.\d+)-(\d+\.\d+\.\d+)', filename)
-                if version_match:
-                    minecraft_version = version_match.group(1)
-                    forge_version = version_match.group(2)
-                    return {
-                        'file': jar_path.name,
-                        'path': str(jar_path),
-                        'minecraft_version': minecraft_version,
-                        'forge_version': forge_version,
-                        'version_number': f"{minecraft_version}-{forge_version}",
-                        'size_mb': round(jar_path.stat().st_size / (1024 * 1024), 1),
-                        'type': 'server'
-                    }
-                
                 # Try to extract from mods.toml
                 for file_name in file_list:
                     if file_name.endswith('mods.toml'):
@@ -0,0 +1,271 @@
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    from . import console_events
+except ImportError:
+    import console_events
+
+# Launch outcomes
+IN_PROGRESS = 'in_progress'
+READY = 'ready'
+FAILED = 'failed'
+EXITED = 'exited'
+STOPPED = 'stopped'
+
+# Console milestones between spawning the JVM and the "Done" line, in the
+# order the server reaches them
+MILESTONES = (
+    ('loading_mods', ('Loading ', 'Forge Mod Loader has identified')),
+    ('server_starting', ('Starting minecraft server version',)),
+    ('world_loading', ('Preparing level',)),
+    ('spawn_area', ('Preparing start region', 'Preparing spawn area')),
+)
+
+LAUNCHES_KEPT = 200
+
+
+def _milestone(text: str) -> Optional[str]:
+    for name, prefixes in MILESTONES:
+        if text.startswith(prefixes):
+            return name
+    return None
+
+
+def _average(values: List[float]) -> Optional[float]:
+    return round(sum(values) / len(values), 3) if values else None
+
+
+class StartupProfiler:
+    """Times each server launch, from the pre-flight checks to the "Done" line.
+
+    start_server wraps each of its steps in phase(), which records how long
+    the step took, and the launch paths call spawned() once the JVM process
+    exists. From there the console supplies the milestones: first output,
+    mod loading, server start, world loading and the ready line (which also
+    carries the server's own startup time). A launch ends when the server
+    is ready, a step fails, or the process exits first; it is then
+    appended to a JSON-lines file, so trends() can tell whether slow starts
+    come from MCUS's own checks or from the JVM and its mods.
+    """
+
+    def __init__(self, server_manager, history_file: Path):
+        self.server_manager = server_manager
+        self.history_file = Path(history_file)
+        self.history_file.parent.mkdir(parents=True, exist_ok=True)
+        self.current: Optional[Dict] = None
+        self._recent = deque(maxlen=LAUNCHES_KEPT)
+        self._began = 0.0
+        self._spawned: Optional[float] = None
+        self._lock = threading.Lock()
+        self._load()
+
+        events = server_manager.events
+        events.subscribe(console_events.READY, self._on_ready)
+        events.subscribe(console_events.STARTUP_STAGE, self._on_stage)
+
+    def _load(self):
+        if not self.history_file.exists():
+            return
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._recent.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except Exception as e:
+            logging.warning(f"Failed to read startup timing history: {e}")
+
+    def _elapsed(self, now: Optional[float] = None) -> float:
+        return round((now or time.perf_counter()) - self._began, 3)
+
+    # Pre-flight phases
+
+    def begin(self, automatic: bool = False):
+        """Start timing a launch; any unfinished one is recorded as failed"""
+        with self._lock:
+            if self.current:
+                self._finish(FAILED)
+            self._began = time.perf_counter()
+            self._spawned = None
+            self.current = {
+                'id': uuid.uuid4().hex[:12],
+                'started': time.time(),
+                'automatic': automatic,
+                'outcome': IN_PROGRESS,
+                'phases': [],
+                'failed_phase': None,
+                'spawned_after_s': None,
+                'milestones': {},
+                'server_reported_s': None,
+                'context': {}
+            }
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time one start_server step; steps may run concurrently"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            ended = time.perf_counter()
+            with self._lock:
+                if self.current:
+                    self.current['phases'].append({
+                        'name': name,
+                        'offset_s': self._elapsed(started),
+                        'duration_ms': round((ended - started) * 1000, 1)
+                    })
+
+    def spawned(self, loader: str, **context):
+        """The JVM process was created; console milestones are timed from here"""
+        with self._lock:
+            if not self.current:
+                return
+            self._spawned = time.perf_counter()
+            self.current['spawned_after_s'] = self._elapsed(self._spawned)
+            self.current['context'] = dict(context, loader=loader)
+
+    def fail(self, phase: Optional[str] = None):
+        """start_server gave up in phase (by default the last one timed)"""
+        with self._lock:
+            if self.current:
+                phases = self.current['phases']
+                self.current['failed_phase'] = phase or (phases[-1]['name'] if phases else None)
+                self._finish(FAILED)
+
+    # Boot milestones
+
+    def on_output(self):
+        """Called for every console line; only the first one after spawning is kept"""
+        current = self.current
+        if current and self._spawned and 'first_output' not in current['milestones']:
+            self._mark('first_output')
+
+    def _on_stage(self, event):
+        name = _milestone(event.data.get('text', ''))
+        if name and self.current and name not in self.current['milestones']:
+            self._mark(name)
+
+    def _mark(self, name: str):
+        with self._lock:
+            if self.current and self._spawned:
+                self.current['milestones'].setdefault(name, round(time.perf_counter() - self._spawned, 3))
+
+    def _on_ready(self, event):
+        with self._lock:
+            if not self.current or not self._spawned:
+                return
+            self.current['milestones']['ready'] = round(time.perf_counter() - self._spawned, 3)
+            self.current['server_reported_s'] = event.data.get('seconds')
+            self._finish(READY)
+
+    def on_exit(self, expected: bool):
+        """The server process exited; a launch that never became ready ends here"""
+        with self._lock:
+            if self.current and self._spawned:
+                self._finish(STOPPED if expected else EXITED)
+
+    def _finish(self, outcome: str):
+        launch = self.current
+        self.current = None
+        launch['outcome'] = outcome
+        # Wall time to the end of the last pre-flight step; the steps overlap, so their durations don't add up
+        launch['preflight_s'] = round(max((phase['offset_s'] + phase['duration_ms'] / 1000
+                                           for phase in launch['phases'] if phase['name'] != 'launch'),
+                                          default=0.0), 3)
+        launch['total_s'] = self._elapsed()
+        launch['spawn_to_ready_s'] = launch['milestones'].get('ready')
+
+        if outcome == READY:
+            logging.info(f"Server ready {launch['total_s']:.1f}s after start: {launch['spawned_after_s']:.1f}s in MCUS, "
+                         f"{launch['spawn_to_ready_s']:.1f}s from JVM spawn to ready")
+        else:
+            logging.info(f"Server launch {outcome} after {launch['total_s']:.1f}s"
+                         + (f" in {launch['failed_phase']}" if launch['failed_phase'] else ''))
+
+        self._recent.append(launch)
+        try:
+            with open(self.history_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(launch, separators=(',', ':')) + '\n')
+        except Exception as e:
+            logging.error(f"Failed to record startup timing {launch['id']}: {e}")
+
+    # Reporting
+
+    def in_progress(self) -> Optional[Dict]:
+        """The launch being timed, with how long it has been going"""
+        with self._lock:
+            if not self.current:
+                return None
+            return dict(self.current, elapsed_s=self._elapsed(),
+                        milestones=dict(self.current['milestones']), phases=list(self.current['phases']))
+
+    def list(self, limit: Optional[int] = None, outcome: Optional[str] = None) -> List[Dict]:
+        """Finished launches, newest first"""
+        with self._lock:
+            launches = list(reversed(self._recent))
+        if outcome:
+            launches = [launch for launch in launches if launch['outcome'] == outcome]
+        return launches[:limit] if limit else launches
+
+    def get(self, launch_id: str) -> Optional[Dict]:
+        current = self.in_progress()
+        if current and current['id'] == launch_id:
+            return current
+        for launch in self.list():
+            if launch['id'] == launch_id:
+                return launch
+        return None
+
+    def trends(self, limit: int = 20) -> Dict:
+        """Average and worst time per phase and boot segment over the last limit ready launches.
+
+        Boot segments are the gaps between consecutive console milestones,
+        so a jump in 'loading_mods -> server_starting' points at mods while
+        one in the pre-flight phases points at MCUS.
+        """
+        launches = list(reversed(self.list(limit=limit, outcome=READY)))
+
+        phases: Dict[str, List[float]] = {}
+        segments: Dict[str, List[float]] = {}
+        for launch in launches:
+            for phase in launch['phases']:
+                phases.setdefault(phase['name'], []).append(phase['duration_ms'])
+            previous, previous_at = 'spawn', 0.0
+            for name, at in sorted(launch['milestones'].items(), key=lambda item: item[1]):
+                segments.setdefault(f"{previous} -> {name}", []).append(round(at - previous_at, 3))
+                previous, previous_at = name, at
+
+        preflight = [launch['spawned_after_s'] for launch in launches if launch['spawned_after_s'] is not None]
+        boot = [launch['spawn_to_ready_s'] for launch in launches if launch['spawn_to_ready_s'] is not None]
+        # The newest few against the rest shows whether startup is getting slower
+        recent, earlier = boot[-5:], boot[:-5]
+        return {
+            'launches': len(launches),
+            'preflight_s': {'average': _average(preflight), 'max': max(preflight, default=None)},
+            'spawn_to_ready_s': {
+                'average': _average(boot),
+                'max': max(boot, default=None),
+                'recent_average': _average(recent),
+                'change_s': round(_average(recent) - _average(earlier), 3) if recent and earlier else None
+            },
+            'phases_ms': {name: {'average': _average(values), 'max': max(values)} for name, values in phases.items()},
+            'boot_segments_s': {name: {'average': _average(values), 'max': max(values)}
+                                for name, values in segments.items()},
+            'series': [{
+                'id': launch['id'],
+                'started': launch['started'],
+                'preflight_s': launch['spawned_after_s'],
+                'spawn_to_ready_s': launch['spawn_to_ready_s'],
+                'mods': launch['context'].get('mods')
+            } for launch in launches]
+        }
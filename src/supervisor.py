@@ -0,0 +1,312 @@
+import json
+import time
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from . import console_events
+except ImportError:
+    import console_events
+
+# Exit classes
+CLEAN = 'clean'
+CRASH = 'crash'
+OUT_OF_MEMORY = 'out_of_memory'
+KILLED = 'killed'
+
+# Supervisor states
+IDLE = 'idle'
+WATCHING = 'watching'
+RESTARTING = 'restarting'
+CRASH_LOOP = 'crash_loop'
+
+DEFAULT_BACKOFF = 10.0
+MAX_BACKOFF = 600.0
+# A crash-loop is this many unexpected exits within CRASH_LOOP_WINDOW seconds
+CRASH_LOOP_LIMIT = 5
+CRASH_LOOP_WINDOW = 1800.0
+
+# Lines of a crash report kept with the exit record
+CRASH_REPORT_HEAD_LINES = 40
+
+EXITS_KEPT = 100
+
+
+def read_crash_report(path: Path) -> Dict:
+    """Description and first exception line of a Minecraft crash report, plus its opening lines"""
+    description = exception = None
+    head = []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if len(head) < CRASH_REPORT_HEAD_LINES:
+                head.append(line)
+            if description is None and line.startswith('Description: '):
+                description = line[len('Description: '):]
+            elif description is not None and exception is None and line.strip():
+                # The exception line directly follows the description's blank line
+                exception = line.strip()
+            if len(head) >= CRASH_REPORT_HEAD_LINES and exception is not None:
+                break
+    return {'path': str(path), 'description': description, 'exception': exception, 'head': head}
+
+
+class ServerSupervisor:
+    """Watches the server process and restarts it when it dies unexpectedly.
+
+    Each launched process gets a watcher thread blocked in wait(). When the
+    process exits without stop_server having asked it to, the exit is
+    classified as a crash, out of memory or killed (by a signal, or the
+    OS), the newest crash report written during the run is captured, and a
+    restart is scheduled with exponential backoff. Too many unexpected
+    exits in a short window trip the crash-loop breaker, which stops
+    restarting until the server is started by hand. Listeners are told
+    about every exit and restart, which is how the hosting network hears
+    about it.
+    """
+
+    def __init__(self, server_manager, history_file: Path):
+        self.server_manager = server_manager
+        self.history_file = Path(history_file)
+        self.history_file.parent.mkdir(parents=True, exist_ok=True)
+        self.state = IDLE
+        self.restarts = 0
+        self.next_restart: Optional[float] = None
+        self.restarting = False
+        self._exits = deque(maxlen=EXITS_KEPT)
+        self._unexpected: deque = deque()
+        self._crash_report_hint: Optional[str] = None
+        self._crash_seen = False
+        self._launched_at: Optional[float] = None
+        self._listeners: List[Callable[[str, Dict], None]] = []
+        self._cancel_restart = threading.Event()
+        self._lock = threading.Lock()
+        self._load()
+
+        server_manager.events.subscribe(console_events.CRASH, self._on_crash)
+
+    @property
+    def config(self) -> Dict:
+        return self.server_manager.config
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config.get('auto_restart', True))
+
+    @property
+    def restart_pending(self) -> bool:
+        """Whether a restart is waiting out its backoff"""
+        return self.state == RESTARTING
+
+    def _load(self):
+        if not self.history_file.exists():
+            return
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._exits.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except Exception as e:
+            logging.warning(f"Failed to read server exit history: {e}")
+
+    def add_listener(self, callback: Callable[[str, Dict], None]):
+        """Call callback(event, details) on 'exit', 'restarting', 'restarted', 'restart_failed' and 'crash_loop'"""
+        self._listeners.append(callback)
+
+    def _notify(self, event: str, details: Dict):
+        for callback in list(self._listeners):
+            try:
+                callback(event, details)
+            except Exception as e:
+                logging.error(f"Supervisor listener failed: {e}")
+
+    def _on_crash(self, event):
+        self._crash_seen = True
+        if event.data.get('crash_report'):
+            self._crash_report_hint = event.data['crash_report'].strip()
+
+    # Watching
+
+    def watch(self, process):
+        """Start watching a freshly launched server process"""
+        self._launched_at = time.time()
+        self._crash_seen = False
+        self._crash_report_hint = None
+        self.state = WATCHING
+        threading.Thread(target=self._wait_for_exit, args=(process,), daemon=True).start()
+
+    def _wait_for_exit(self, process):
+        returncode = process.wait()
+        manager = self.server_manager
+        expected = manager.stop_requested
+        oom = manager._out_of_memory
+        uptime = time.time() - self._launched_at if self._launched_at else None
+
+        # Clears is_running and records the run; a no-op if stop_server got there first
+        manager._cleanup_process(process)
+
+        exit_class = self._classify(returncode, expected, oom)
+        record = {
+            'time': time.time(),
+            'returncode': returncode,
+            'class': exit_class,
+            'expected': expected,
+            'uptime': round(uptime, 1) if uptime is not None else None,
+            'crash_report': self._capture_crash_report() if exit_class in (CRASH, OUT_OF_MEMORY) else None
+        }
+        self._record(record)
+
+        if expected or exit_class == CLEAN:
+            logging.info(f"Server exited ({exit_class}, code {returncode})")
+            self.state = IDLE
+            self._notify('exit', record)
+            return
+
+        logging.error(f"Server exited unexpectedly: {exit_class} (code {returncode})"
+                      + (f": {record['crash_report']['description']}" if record['crash_report'] else ''))
+        self._notify('exit', record)
+        self._schedule_restart(record)
+
+    @staticmethod
+    def _classify_code(returncode: int) -> Optional[str]:
+        # Negative codes are POSIX signals; 128+N is how shells and wrappers report them
+        if returncode < 0 or returncode in (128 + 9, 128 + 15):
+            return KILLED
+        return None
+
+    def _classify(self, returncode: int, expected: bool, oom: bool) -> str:
+        if oom:
+            return OUT_OF_MEMORY
+        if self._crash_seen:
+            return CRASH
+        if expected:
+            return CLEAN
+        killed = self._classify_code(returncode)
+        if killed:
+            return killed
+        # A clean exit nobody asked for is a "stop" typed in game or at the console
+        return CLEAN if returncode == 0 else CRASH
+
+    def _capture_crash_report(self) -> Optional[Dict]:
+        """The newest report in crash-reports/ written during this run"""
+        reports_dir = self.server_manager.server_dir / "crash-reports"
+        candidates = []
+        if self._crash_report_hint:
+            hinted = Path(self._crash_report_hint)
+            if not hinted.is_absolute():
+                hinted = self.server_manager.server_dir / hinted
+            candidates.append(hinted)
+        if reports_dir.exists():
+            candidates.extend(sorted(reports_dir.glob("crash-*.txt"), key=lambda path: path.stat().st_mtime,
+                                     reverse=True))
+        for path in candidates:
+            try:
+                if path.exists() and (not self._launched_at or path.stat().st_mtime >= self._launched_at - 1):
+                    return read_crash_report(path)
+            except OSError as e:
+                logging.warning(f"Could not read crash report {path}: {e}")
+        return None
+
+    def _record(self, record: Dict):
+        with self._lock:
+            self._exits.append(record)
+            try:
+                with open(self.history_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            except Exception as e:
+                logging.error(f"Failed to record server exit: {e}")
+
+    # Restarting
+
+    def _schedule_restart(self, record: Dict):
+        if not self.enabled:
+            self.state = IDLE
+            return
+
+        now = time.time()
+        window = float(self.config.get('crash_loop_window', CRASH_LOOP_WINDOW))
+        self._unexpected.append(now)
+        while self._unexpected and now - self._unexpected[0] > window:
+            self._unexpected.popleft()
+
+        limit = int(self.config.get('crash_loop_limit', CRASH_LOOP_LIMIT))
+        if len(self._unexpected) >= limit:
+            self.state = CRASH_LOOP
+            self.next_restart = None
+            logging.error(f"Server crashed {len(self._unexpected)} times in {int(window)}s; "
+                          f"not restarting until it is started manually")
+            self._notify('crash_loop', dict(record, crashes=len(self._unexpected)))
+            return
+
+        base = float(self.config.get('restart_backoff', DEFAULT_BACKOFF))
+        delay = min(MAX_BACKOFF, base * 2 ** (len(self._unexpected) - 1))
+        self.state = RESTARTING
+        self.next_restart = now + delay
+        self._cancel_restart.clear()
+        logging.info(f"Restarting server in {delay:.0f}s")
+        self._notify('restarting', dict(record, delay=delay))
+        threading.Thread(target=self._restart_after, args=(delay,), daemon=True).start()
+
+    def _restart_after(self, delay: float):
+        if self._cancel_restart.wait(delay):
+            return
+        self.next_restart = None
+        if self.server_manager.is_running:
+            self.state = WATCHING
+            return
+
+        self.restarting = True
+        try:
+            started = self.server_manager.start_server()
+        except Exception as e:
+            logging.error(f"Automatic restart failed: {e}")
+            started = False
+        finally:
+            self.restarting = False
+
+        if started:
+            self.restarts += 1
+            self._notify('restarted', {'time': time.time(), 'restarts': self.restarts})
+        else:
+            # A failed launch counts towards the crash-loop breaker like any other crash
+            record = {'time': time.time(), 'returncode': None, 'class': CRASH, 'expected': False,
+                      'uptime': 0, 'crash_report': None, 'launch_failed': True}
+            self._record(record)
+            self._notify('restart_failed', record)
+            self._schedule_restart(record)
+
+    def cancel_restart(self):
+        """Drop a pending restart (the server was stopped or started by hand)"""
+        self._cancel_restart.set()
+        self.next_restart = None
+        if self.state == RESTARTING:
+            self.state = IDLE
+
+    def reset(self):
+        """Forget earlier crashes, clearing the crash-loop breaker"""
+        self.cancel_restart()
+        self._unexpected.clear()
+        if self.state == CRASH_LOOP:
+            self.state = IDLE
+
+    # Reporting
+
+    def exits(self, limit: Optional[int] = None) -> List[Dict]:
+        with self._lock:
+            exits = list(reversed(self._exits))
+        return exits[:limit] if limit else exits
+
+    def get_status(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'state': self.state,
+            'restarts': self.restarts,
+            'recent_crashes': len(self._unexpected),
+            'next_restart': self.next_restart,
+            'last_exit': self._exits[-1] if self._exits else None
+        }
@@ -0,0 +1,279 @@
+import re
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+try:
+    from . import console_events
+    from .process_sampler import MetricRing
+except ImportError:
+    import console_events
+    from process_sampler import MetricRing
+
+OVERALL = 'overall'
+
+# Commands tried in order until one answers; the first that does is kept
+TPS_COMMANDS = ('forge tps', 'neoforge tps', 'tick query')
+
+# Forge: "Dim minecraft:overworld (minecraft:overworld): Mean tick time: 1.234 ms. Mean TPS: 20.000"
+#        "Overall: Mean tick time: 1.234 ms. Mean TPS: 20.000"
+FORGE_TPS = re.compile(
+    r'(?:Dim\s+(?P<dimension>[^\s(]+?)(?: \([^)]*\))?|(?P<overall>Overall))\s*: '
+    r'Mean tick time: (?P<mspt>\d+(?:\.\d+)?) ms\. Mean TPS: (?P<tps>\d+(?:\.\d+)?)'
+)
+# NeoForge: "minecraft:overworld: 20.000 TPS (1.234 ms/tick)", "Overall: 20.000 TPS (1.234 ms/tick)"
+NEOFORGE_TPS = re.compile(
+    r'(?P<dimension>[a-z0-9_.-]+:[a-z0-9_./-]+|Overall): '
+    r'(?P<tps>\d+(?:\.\d+)?) TPS \((?P<mspt>\d+(?:\.\d+)?) ms/tick\)'
+)
+# Vanilla 1.20.3+ "tick query": "Target tick rate: 20.0 per second." ... "Average time per tick: 1.2ms"
+VANILLA_RATE = re.compile(r'Target tick rate: (?P<rate>\d+(?:\.\d+)?) per second')
+VANILLA_MSPT = re.compile(r'Average time per tick: (?P<mspt>\d+(?:\.\d+)?) ?ms')
+
+UNKNOWN_COMMAND = re.compile(r'Unknown (?:or incomplete )?command|Incorrect argument for command')
+
+# One sample every 30s keeps a day of history per dimension
+HISTORY_SAMPLES = 2880
+
+DEFAULT_THRESHOLDS = {
+    'mspt_warning': 40.0,
+    'mspt_critical': 50.0,
+    'tps_warning': 18.0,
+    'tps_critical': 15.0,
+}
+
+LEVELS = ('ok', 'warning', 'critical')
+
+
+def parse_tps_output(text: str) -> Dict[str, Dict[str, float]]:
+    """Per-dimension mean tick time (ms) and TPS from a tps command's reply.
+
+    Works on console lines as well as RCON replies, where the server runs
+    the lines together without separators. The server-wide figures are
+    keyed 'overall'.
+    """
+    stats = {}
+    for pattern in (FORGE_TPS, NEOFORGE_TPS):
+        for match in pattern.finditer(text):
+            dimension = OVERALL if match.group('dimension') in (None, 'Overall') else match.group('dimension')
+            stats[dimension] = {'mspt': float(match.group('mspt')), 'tps': float(match.group('tps'))}
+        if stats:
+            return stats
+
+    match = VANILLA_MSPT.search(text)
+    if match:
+        rate = VANILLA_RATE.search(text)
+        target = float(rate.group('rate')) if rate else 20.0
+        mspt = float(match.group('mspt'))
+        # A tick that finishes early still waits for the next one, so TPS tops out at the target rate
+        stats[OVERALL] = {'mspt': mspt, 'tps': round(min(target, 1000.0 / mspt) if mspt else target, 3)}
+    return stats
+
+
+class TickMonitor:
+    """Polls the server's tick performance over the command channel.
+
+    Every interval seconds while the server is up, a tps command is sent
+    with execute_command. Its reply comes back directly over RCON; over
+    stdin the reply only appears in the console, so it is collected from
+    tick_stats console events instead. Each dimension's mean tick time and
+    TPS go into a ring buffer, and each dimension is checked against the
+    alert thresholds, with alert_samples consecutive samples needed to
+    raise or clear an alert so one slow tick doesn't flap it.
+    """
+
+    def __init__(self, server_manager):
+        self.server_manager = server_manager
+        self.series: Dict[str, MetricRing] = {}
+        self.command: Optional[str] = None
+        self.supported = True
+        self.last_sample: Optional[Dict] = None
+        self.last_error: Optional[str] = None
+        self.alerts = deque(maxlen=100)
+        self._active: Dict[str, Dict] = {}
+        self._streaks: Dict[str, tuple] = {}
+        self._ready = False
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._stopping = False
+        self._lock = threading.Lock()
+
+    @property
+    def config(self) -> Dict:
+        return self.server_manager.config
+
+    @property
+    def interval(self) -> float:
+        return max(5.0, float(self.config.get('tps_monitor_interval', 30)))
+
+    @property
+    def thresholds(self) -> Dict[str, float]:
+        return dict(DEFAULT_THRESHOLDS, **self.config.get('tps_thresholds', {}))
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping = False
+        self.server_manager.events.subscribe(console_events.READY, self._on_ready)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+        self.server_manager.events.unsubscribe(console_events.READY, self._on_ready)
+
+    def _on_ready(self, event):
+        self._ready = True
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopping:
+            if not self.server_manager.is_running:
+                # Start over after a restart: the next server may run a different loader
+                self._ready = False
+                self.command = None
+                self.supported = True
+                self._clear_alerts()
+            elif self._ready and self.supported and self.config.get('tps_monitor', True):
+                try:
+                    self.sample()
+                except Exception as e:
+                    self.last_error = str(e)
+                    logging.warning(f"Tick monitor sample failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    # Sampling
+
+    def sample(self) -> Optional[Dict[str, Dict[str, float]]]:
+        """Take one sample now; returns the parsed stats, or None if no command answered"""
+        for command in ([self.command] if self.command else TPS_COMMANDS):
+            stats = self._query(command)
+            if stats:
+                if command != self.command:
+                    logging.info(f"Tick monitor using '{command}'")
+                self.command = command
+                self.last_error = None
+                self._record(time.time(), stats)
+                return stats
+        if not self.command:
+            # Nothing on this server answers; stay quiet until it restarts
+            self.supported = False
+            self.last_error = f"No tick statistics command available (tried {', '.join(TPS_COMMANDS)})"
+            logging.info(f"Tick monitor disabled: {self.last_error}")
+        return None
+
+    def _query(self, command: str) -> Dict[str, Dict[str, float]]:
+        events = self.server_manager.events
+        lines: List[str] = []
+        collect = lambda event: lines.append(event.data.get('text', ''))
+        # Subscribe before sending so a fast console reply can't be missed
+        events.subscribe(console_events.TICK_STATS, collect)
+        waiter = events.expect(console_events.TICK_STATS, self._is_last_line)
+        try:
+            output = self.server_manager.execute_command(command)
+            if output is not None:
+                waiter.cancel()
+                if UNKNOWN_COMMAND.search(output):
+                    return {}
+                return parse_tps_output(output)
+            waiter.wait(5)
+            return parse_tps_output('\n'.join(lines))
+        finally:
+            waiter.cancel()
+            events.unsubscribe(console_events.TICK_STATS, collect)
+
+    @staticmethod
+    def _is_last_line(event) -> bool:
+        text = event.data.get('text', '')
+        return text.startswith('Overall') or 'Average time per tick' in text
+
+    def _record(self, timestamp: float, stats: Dict[str, Dict[str, float]]):
+        with self._lock:
+            for dimension, values in stats.items():
+                ring = self.series.get(dimension)
+                if ring is None:
+                    ring = self.series[dimension] = MetricRing(('mspt', 'tps'), HISTORY_SAMPLES)
+                ring.append(timestamp, (values['mspt'], values['tps']))
+            self.last_sample = {'time': timestamp, 'dimensions': stats}
+        for dimension, values in stats.items():
+            self._check_thresholds(dimension, values, timestamp)
+
+    # Alerts
+
+    def _level(self, values: Dict[str, float]) -> str:
+        limits = self.thresholds
+        if values['mspt'] >= limits['mspt_critical'] or values['tps'] <= limits['tps_critical']:
+            return 'critical'
+        if values['mspt'] >= limits['mspt_warning'] or values['tps'] <= limits['tps_warning']:
+            return 'warning'
+        return 'ok'
+
+    def _check_thresholds(self, dimension: str, values: Dict[str, float], timestamp: float):
+        level = self._level(values)
+        previous_level, count = self._streaks.get(dimension, (None, 0))
+        count = count + 1 if level == previous_level else 1
+        self._streaks[dimension] = (level, count)
+
+        active = self._active.get(dimension)
+        if active:
+            active['worst_mspt'] = max(active['worst_mspt'], values['mspt'])
+            active['lowest_tps'] = min(active['lowest_tps'], values['tps'])
+
+        if count < int(self.config.get('tps_alert_samples', 2)):
+            return
+        current = active['level'] if active else 'ok'
+        if level == current:
+            return
+
+        if active:
+            active['ended'] = timestamp
+            del self._active[dimension]
+            if level == 'ok':
+                logging.info(f"Tick performance recovered in {dimension}: {values['mspt']} ms/tick, {values['tps']} TPS")
+        if level != 'ok':
+            alert = {
+                'dimension': dimension,
+                'level': level,
+                'started': timestamp,
+                'ended': None,
+                'worst_mspt': values['mspt'],
+                'lowest_tps': values['tps']
+            }
+            self._active[dimension] = alert
+            self.alerts.append(alert)
+            logging.warning(f"Tick performance {level} in {dimension}: "
+                            f"{values['mspt']} ms/tick, {values['tps']} TPS")
+
+    def _clear_alerts(self):
+        now = time.time()
+        for alert in self._active.values():
+            alert['ended'] = now
+        self._active.clear()
+        self._streaks.clear()
+
+    # Reporting
+
+    def history(self, dimension: str = OVERALL, since: Optional[float] = None,
+                limit: Optional[int] = None) -> List[Dict]:
+        ring = self.series.get(dimension)
+        if ring is None:
+            raise ValueError(f"No tick data for {dimension!r}; known: {', '.join(self.series) or 'none'}")
+        return ring.read(since, limit)
+
+    def get_status(self) -> Dict:
+        return {
+            'enabled': bool(self.config.get('tps_monitor', True)),
+            'interval': self.interval,
+            'command': self.command,
+            'supported': self.supported,
+            'last_error': self.last_error,
+            'latest': self.last_sample,
+            'dimensions': list(self.series),
+            'thresholds': self.thresholds,
+            'active_alerts': list(self._active.values()),
+            'alerts': list(reversed(self.alerts))
+        }
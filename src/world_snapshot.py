@@ -0,0 +1,115 @@
+import os
+import errno
+import shutil
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    from .backup_store import SKIPPED_FILES
+except ImportError:
+    from backup_store import SKIPPED_FILES
+
+# Linux FICLONE ioctl: share the source's extents copy-on-write (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+
+# The server writes these to a temp file and renames it over the original,
+# so a hardlink keeps the old contents intact. Region files are rewritten
+# in place and must never be hardlinked.
+RENAME_REPLACED_SUFFIXES = {'.dat', '.dat_old'}
+
+# errnos meaning "this filesystem can't do that", as opposed to a real I/O error
+UNSUPPORTED_ERRNOS = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EPERM}
+
+
+class WorldStager:
+    """Makes a quick point-in-time copy of a world directory.
+
+    Used while the server has saving turned off, so the copy has to be fast
+    rather than small: files are reflinked where the filesystem supports it,
+    hardlinked where the server never rewrites them in place, and copied
+    otherwise. Files unchanged since the previous snapshot are not staged at
+    all; the caller carries their manifest entries forward instead.
+    """
+
+    def __init__(self):
+        self.reflink_supported = fcntl is not None
+        self.hardlink_supported = True
+
+    def stage(self, world_dir: Path, staging_dir: Path, previous_files: Optional[Dict] = None) -> Dict:
+        """Stage world_dir into staging_dir.
+
+        Returns {'carried': {path: manifest entry}, 'staged': count,
+        'bytes': staged bytes, 'methods': {method: count}}.
+        """
+        world_dir = Path(world_dir)
+        staging_dir = Path(staging_dir)
+        previous_files = previous_files or {}
+        result = {'carried': {}, 'staged': 0, 'bytes': 0, 'methods': {}}
+
+        for root, _, filenames in os.walk(world_dir):
+            root_path = Path(root)
+            for filename in filenames:
+                if filename in SKIPPED_FILES:
+                    continue
+                source = root_path / filename
+                relative = source.relative_to(world_dir).as_posix()
+                try:
+                    stat = source.stat()
+                except FileNotFoundError:
+                    continue
+
+                old_entry = previous_files.get(relative)
+                if old_entry and old_entry['size'] == stat.st_size and old_entry['mtime_ns'] == stat.st_mtime_ns:
+                    result['carried'][relative] = old_entry
+                    continue
+
+                target = staging_dir / relative
+                target.parent.mkdir(parents=True, exist_ok=True)
+                method = self.clone_file(source, target)
+                result['methods'][method] = result['methods'].get(method, 0) + 1
+                result['staged'] += 1
+                result['bytes'] += stat.st_size
+
+        return result
+
+    def clone_file(self, source: Path, target: Path) -> str:
+        """Copy one file as cheaply as the filesystem allows, returning the method used"""
+        if self.reflink_supported:
+            try:
+                self._reflink(source, target)
+                return 'reflink'
+            except OSError as e:
+                if e.errno not in UNSUPPORTED_ERRNOS:
+                    raise
+                logging.info(f"Reflinks not supported for backups ({e.strerror}); falling back")
+                self.reflink_supported = False
+
+        if self.hardlink_supported and source.suffix in RENAME_REPLACED_SUFFIXES:
+            try:
+                os.link(source, target)
+                return 'hardlink'
+            except OSError as e:
+                if e.errno not in UNSUPPORTED_ERRNOS:
+                    raise
+                logging.info(f"Hardlinks not supported for backups ({e.strerror}); falling back")
+                self.hardlink_supported = False
+
+        shutil.copy2(source, target)
+        return 'copy'
+
+    def _reflink(self, source: Path, target: Path):
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError:
+                dst.close()
+                target.unlink()
+                raise
+        # Keep the mtime so the store can tell unchanged files apart next time
+        shutil.copystat(source, target)
@@ -0,0 +1,109 @@
+import os
+import sys
+import socket
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from rcon import (RconClient, RconPool, RconError, LocalRconServer, encode_packet, read_packet,
+                  PACKET_LOGIN, PACKET_COMMAND, PACKET_SENTINEL, MAX_PAYLOAD)
+
+
+@pytest.fixture
+def server():
+    with LocalRconServer(password='secret') as rcon_server:
+        yield rcon_server
+
+
+def test_command_returns_output(server):
+    client = RconClient(server.host, server.port, 'secret', timeout=5)
+    try:
+        assert client.command('list') == 'Executed: list'
+        assert client.command('tps') == 'Executed: tps'
+        assert server.commands == ['list', 'tps']
+        assert server.rejected_reads == 0
+    finally:
+        client.close()
+
+
+def test_wrong_password_is_rejected(server):
+    client = RconClient(server.host, server.port, 'wrong', timeout=5)
+    with pytest.raises(RconError):
+        client.connect()
+    assert not client.connected
+
+
+def test_long_reply_is_reassembled():
+    reply = ''.join(chr(ord('a') + i % 26) for i in range(MAX_PAYLOAD * 3 + 100))
+    with LocalRconServer(password='secret', handler=lambda command: reply) as rcon_server:
+        client = RconClient(rcon_server.host, rcon_server.port, 'secret', timeout=5)
+        try:
+            assert client.command('data get') == reply
+            # The connection is still in step for the next command
+            assert client.command('data get') == reply
+        finally:
+            client.close()
+
+
+def test_concurrent_commands_share_a_connection(server):
+    client = RconClient(server.host, server.port, 'secret', timeout=5)
+    results = {}
+
+    def run(i):
+        results[i] = client.command(f"say {i}")
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(20)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        client.close()
+    assert results == {i: f"Executed: say {i}" for i in range(20)}
+    assert server.rejected_reads == 0
+
+
+def test_pool_spreads_commands_and_reconnects(server):
+    pool = RconPool(server.host, server.port, 'secret', size=3, timeout=5)
+    results = []
+    lock = threading.Lock()
+
+    def run(i):
+        output = pool.command(f"say {i}")
+        with lock:
+            results.append(output)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(30)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(results) == sorted(f"Executed: say {i}" for i in range(30))
+
+        # A connection dropped from under the pool is replaced on the next command
+        for client in pool.clients:
+            if client.sock:
+                client.sock.close()
+        assert pool.command('list') == 'Executed: list'
+    finally:
+        pool.close()
+    assert server.rejected_reads == 0
+
+
+def test_stand_in_rejects_pipelined_packets(server):
+    sock = socket.create_connection((server.host, server.port), timeout=5)
+    try:
+        sock.sendall(encode_packet(1, PACKET_LOGIN, 'secret'))
+        assert read_packet(sock)[0] == 1
+        # Two packets in one write arrive in one read, which Minecraft doesn't accept
+        sock.sendall(encode_packet(2, PACKET_COMMAND, 'list') + encode_packet(3, PACKET_SENTINEL, ''))
+        with pytest.raises((RconError, OSError)):
+            read_packet(sock)
+    finally:
+        sock.close()
+    assert server.rejected_reads == 1
+    assert server.commands == []
@@ -0,0 +1,151 @@
+import os
+import sys
+import zlib
+import struct
+import random
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from region_files import (RegionFile, trim_world, SECTOR_SIZE, HEADER_SECTORS, CHUNKS_PER_REGION,
+                          LOCATIONS, TIMESTAMPS, CHUNK_HEADER, COMPRESSION_ZLIB)
+
+REGION_X, REGION_Z = 1, 1
+
+# index -> (InhabitedTime, filler bytes); the filler sizes give chunks of one, two and three sectors
+CHUNKS = {
+    0: (0, 100),
+    5: (5000, 5000),
+    31: (0, 9000),
+    32: (1200, 100),
+    100: (0, 100),
+    1023: (70000, 6000),
+}
+VISITED = {index for index, (inhabited, _) in CHUNKS.items() if inhabited > 0}
+
+
+def chunk_nbt(inhabited, filler):
+    """Just enough of a chunk's NBT for the region reader: the root compound and InhabitedTime"""
+    rng = random.Random(filler)
+    name = b'InhabitedTime'
+    return (b'\x0a\x00\x00' + bytes([4]) + struct.pack('>H', len(name)) + name +
+            struct.pack('>q', inhabited) + bytes(rng.getrandbits(8) for _ in range(filler)) + b'\x00')
+
+
+def write_region(path, chunks):
+    """Write an Anvil region file, placing chunks in reverse index order so offsets don't follow indices"""
+    locations = [0] * CHUNKS_PER_REGION
+    timestamps = [0] * CHUNKS_PER_REGION
+    body = bytearray()
+    next_sector = HEADER_SECTORS
+    for index in sorted(chunks, reverse=True):
+        payload = zlib.compress(chunk_nbt(*chunks[index]))
+        data = CHUNK_HEADER.pack(len(payload) + 1, COMPRESSION_ZLIB) + payload
+        data += b'\0' * (-len(data) % SECTOR_SIZE)
+        sectors = len(data) // SECTOR_SIZE
+        locations[index] = (next_sector << 8) | sectors
+        timestamps[index] = 1700000000 + index
+        body += data
+        next_sector += sectors
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(LOCATIONS.pack(*locations) + TIMESTAMPS.pack(*timestamps) + bytes(body))
+
+
+def read_table(path):
+    """(locations, timestamps, per-chunk sector data) of a region file"""
+    raw = path.read_bytes()
+    locations = LOCATIONS.unpack_from(raw, 0)
+    timestamps = TIMESTAMPS.unpack_from(raw, SECTOR_SIZE)
+    data = {}
+    for index, location in enumerate(locations):
+        if location:
+            start = (location >> 8) * SECTOR_SIZE
+            data[index] = raw[start:start + (location & 0xFF) * SECTOR_SIZE]
+    return locations, timestamps, data
+
+
+@pytest.fixture
+def world(tmp_path):
+    name = f"r.{REGION_X}.{REGION_Z}.mca"
+    write_region(tmp_path / 'region' / name, CHUNKS)
+    # Entity data for the same chunks lives in a companion region file
+    write_region(tmp_path / 'entities' / name, CHUNKS)
+    return tmp_path
+
+
+def test_region_reader_sees_generated_chunks(world):
+    chunks = RegionFile(world / 'region' / f"r.{REGION_X}.{REGION_Z}.mca").chunks()
+    assert {chunk.index: chunk.inhabited_time for chunk in chunks} == \
+        {index: inhabited for index, (inhabited, _) in CHUNKS.items()}
+    assert sorted({chunk.sector_count for chunk in chunks}) == [1, 2, 3]
+
+
+def test_dry_run_changes_nothing(world):
+    files = sorted(world.glob('*/*.mca'))
+    before = {path: path.read_bytes() for path in files}
+
+    stats = trim_world(world, dry_run=True)
+
+    assert stats['dry_run']
+    assert stats['chunks_removed'] == len(CHUNKS) - len(VISITED)
+    assert stats['bytes_freed'] > 0
+    assert sorted(world.glob('*/*.mca')) == files
+    assert {path: path.read_bytes() for path in files} == before
+    assert not list(world.glob('*/*.tmp'))
+
+
+@pytest.mark.parametrize('folder', ['region', 'entities'])
+def test_trim_keeps_untouched_chunks_intact(world, folder):
+    path = world / folder / f"r.{REGION_X}.{REGION_Z}.mca"
+    old_locations, old_timestamps, old_data = read_table(path)
+
+    stats = trim_world(world, dry_run=False)
+
+    assert stats['chunks_removed'] == len(CHUNKS) - len(VISITED)
+    assert stats['regions_rewritten'] == 1
+    locations, timestamps, data = read_table(path)
+
+    # Removed chunks are gone from both tables; kept ones keep their timestamp and sector count
+    for index in range(CHUNKS_PER_REGION):
+        if index in VISITED:
+            assert locations[index] & 0xFF == old_locations[index] & 0xFF
+            assert timestamps[index] == old_timestamps[index]
+        else:
+            assert locations[index] == 0
+            assert timestamps[index] == 0
+
+    # Kept chunks are packed right after the header without overlapping, and their bytes are unchanged
+    spans = sorted((locations[index] >> 8, locations[index] & 0xFF) for index in VISITED)
+    next_sector = HEADER_SECTORS
+    for offset, count in spans:
+        assert offset == next_sector
+        next_sector += count
+    assert path.stat().st_size == next_sector * SECTOR_SIZE
+    assert data == {index: old_data[index] for index in VISITED}
+
+    if folder == 'region':
+        chunks = RegionFile(path).chunks()
+        assert {chunk.index: chunk.inhabited_time for chunk in chunks} == \
+            {index: CHUNKS[index][0] for index in VISITED}
+
+
+def test_trim_deletes_region_with_no_visited_chunks(tmp_path):
+    path = tmp_path / 'region' / f"r.{REGION_X}.{REGION_Z}.mca"
+    write_region(path, {index: (0, 100) for index in (3, 40, 500)})
+
+    stats = trim_world(tmp_path, dry_run=False)
+
+    assert stats['regions_deleted'] == 1
+    assert not path.exists()
+
+
+def test_trim_protects_chunks_near_spawn(tmp_path):
+    # No level.dat, so spawn is chunk 0,0; region 0,0 index 33 is chunk 1,1
+    path = tmp_path / 'region' / 'r.0.0.mca'
+    write_region(path, {index: (0, 100) for index in (0, 33, 500)})
+
+    stats = trim_world(tmp_path, protect_radius=1, dry_run=False)
+
+    assert stats['chunks_removed'] == 1
+    assert sorted(chunk.index for chunk in RegionFile(path).chunks()) == [0, 33]
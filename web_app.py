@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file, Response, stream_with_context, abort, make_response
 import json
 import os
 import subprocess
@@ -10,7 +10,9 @@ import shutil
 from pathlib import Path
 from datetime import datetime
 import logging
-from src.server_manager import ServerManager
+from src.instances import InstanceManager, DEFAULT_INSTANCE
+from src.preflight import run_preflight
+from src.jvm_tuning import parse_memory_mb
 from src.mod_manager import ModManager
 from src.network_manager import NetworkManager, HostClient, HostInfo
 from src.update_checker import UpdateChecker
@@ -23,6 +25,7 @@ app.secret_key = 'mcus_secret_key_2024'
 app.jinja_env.globals.update(max=max, min=min, len=len, range=range)
 
 # Global variables
+instances = None
 server_manager = None
 mod_manager = None
 network_manager = None
@@ -31,7 +34,7 @@ is_hosting = False
 update_checker = None
 
 def initialize_managers():
-    global server_manager, mod_manager, network_manager, update_checker
+    global instances, server_manager, mod_manager, network_manager, update_checker
     
     # Load configuration
     config = {
@@ -45,6 +48,8 @@ def initialize_managers():
         'minecraft_version': '1.19.2',
         'mod_loader': 'forge',
         'java_memory': '4G',
+        'gc_logging': True,
+        'auto_restart': True,
         'auto_backup': True,
         'backup_interval': 3600
     }
@@ -56,9 +61,12 @@ def initialize_managers():
     except:
         pass
     
-    # Initialize managers
-    server_manager = ServerManager(config)
-    mod_manager = ModManager(Path("server/mods"))
+    # Initialize managers; the default instance is the one the rest of the UI manages
+    instances = InstanceManager(config)
+    for manager in instances.managers().values():
+        watch_instance(manager)
+    server_manager = instances.manager(DEFAULT_INSTANCE)
+    mod_manager = ModManager(server_manager.mods_dir)
     network_manager = NetworkManager(config.get('network_port', 25566))
     
     # Set up mod manager
@@ -71,6 +79,46 @@ def initialize_managers():
     # Initialize update checker
     update_checker = UpdateChecker()
 
+def watch_instance(manager):
+    """Start an instance's background services and report its supervisor events and start jobs to the hosting network"""
+    manager.backup_scheduler.start()
+    manager.tick_monitor.start()
+    manager.supervisor.add_listener(lambda event, details: on_supervisor_event(event, details, manager))
+    manager.lifecycle.add_listener(on_lifecycle_job)
+
+def instance_manager():
+    """ServerManager for the request's instance parameter, the default instance when it has none"""
+    if not instances:
+        return None
+    name = request.values.get('instance', DEFAULT_INSTANCE)
+    manager = instances.manager(name)
+    if not manager:
+        abort(make_response(jsonify({'error': f'Instance {name} not found'}), 404))
+    return manager
+
+_instance_mod_managers = {}
+
+def instance_mod_manager():
+    """ModManager for the mods folder of the request's instance"""
+    manager = instance_manager()
+    if not manager or manager.instance == DEFAULT_INSTANCE:
+        return mod_manager
+    if manager.instance not in _instance_mod_managers:
+        instance_mods = ModManager(manager.mods_dir)
+        instance_mods.set_minecraft_version(manager.config.get('minecraft_version', '1.19.2'))
+        instance_mods.set_mod_loader(manager.config.get('mod_loader', 'forge'))
+        _instance_mod_managers[manager.instance] = instance_mods
+    return _instance_mod_managers[manager.instance]
+
+def instance_server_dir():
+    """Server directory of the request's instance"""
+    manager = instance_manager()
+    return manager.server_dir if manager else Path("server")
+
+def hosting_any():
+    """Whether any instance's server is running"""
+    return bool(instances and any(m.is_running for m in instances.managers().values()))
+
 @app.route('/')
 def dashboard():
     global is_hosting, server_manager, network_manager
@@ -112,6 +160,63 @@ def hosting():
     
     return render_template('hosting.html', hosts=hosts, current_host=current_host, peer_ips=peer_ips)
 
+def get_java_info(minecraft_version=None):
+    """Java runtime for the request's instance, from its server manager's cached runtime registry"""
+    server_manager = instance_manager()
+    if not server_manager:
+        return {'available': False, 'error': 'Server manager not initialized', 'version': None,
+                'major': None, 'arch': None, 'vendor': None, 'path': None}
+    return server_manager._check_java_installation(minecraft_version)
+
+def on_supervisor_event(event, details, manager):
+    """Keep the hosting network up to date when an instance's server exits or is restarted"""
+    global is_hosting, host_client
+    
+    is_hosting = hosting_any()
+    if not host_client:
+        return
+    
+    if event == 'exit':
+        unexpected = not details['expected'] and details['class'] != 'clean'
+        status = 'crashed' if unexpected else 'offline'
+    elif event in ('restarting', 'restart_failed'):
+        status = 'restarting'
+    elif event == 'restarted':
+        status = 'online'
+    else:
+        status = 'crashed'
+    
+    host_client.update_status({
+        'status': status,
+        'players': [],
+        'memory_usage': 0.0,
+        'cpu_usage': 0.0,
+        'exit_class': details.get('class'),
+        'instance': manager.instance
+    })
+    
+    # Hand over to another host once this one has given up on restarting
+    if event == 'crash_loop' or (event == 'exit' and status == 'crashed' and not manager.supervisor.enabled):
+        response = host_client.request_failover()
+        if response and response.get('success'):
+            logging.info(f"Failover to {response['next_host']['name']} requested")
+        else:
+            logging.warning("Failover requested but no other host is available")
+
+def on_lifecycle_job(job):
+    """Tell the hosting network when a start job launches the server and when it is ready"""
+    global is_hosting
+    
+    is_hosting = hosting_any()
+    if not host_client or job.kind != 'start' or job.state not in ('loading_mods', 'ready'):
+        return
+    host_client.update_status({
+        'status': 'online' if job.state == 'ready' else 'starting',
+        'players': [],
+        'memory_usage': 0.0,
+        'cpu_usage': 0.0
+    })
+
 @app.route('/join_network', methods=['POST'])
 def join_network():
     global host_client, network_manager
@@ -231,7 +336,7 @@ def remove_peer(peer_ip):
 
 @app.route('/mods')
 def mods():
-    global mod_manager
+    mod_manager = instance_mod_manager()
     
     installed_mods = []
     popular_modrinth_mods = []
@@ -361,7 +466,7 @@ def popular_mods():
 
 @app.route('/download_mod/<project_id>')
 def download_mod(project_id):
-    global mod_manager
+    mod_manager = instance_mod_manager()
     
     if not mod_manager:
         flash('Mod manager not initialized', 'error')
@@ -383,7 +488,7 @@ def download_mod(project_id):
 
 @app.route('/install_popular_pack', methods=['POST'])
 def install_popular_pack():
-    global mod_manager
+    mod_manager = instance_mod_manager()
     
     if not mod_manager:
         flash('Mod manager not initialized', 'error')
@@ -420,7 +525,7 @@ def install_popular_pack():
 
 @app.route('/upload_mod', methods=['POST'])
 def upload_mod():
-    global mod_manager
+    mod_manager = instance_mod_manager()
     
     if not mod_manager:
         flash('Mod manager not initialized', 'error')
@@ -455,7 +560,7 @@ def upload_mod():
 
 @app.route('/remove_mod/<mod_name>')
 def remove_mod(mod_name):
-    global mod_manager
+    mod_manager = instance_mod_manager()
     
     if mod_manager and mod_manager.remove_mod(mod_name):
         flash(f'Removed mod: {mod_name}', 'success')
@@ -466,7 +571,7 @@ def remove_mod(mod_name):
 
 @app.route('/players')
 def players():
-    global server_manager
+    server_manager = instance_manager()
     
     players_online = []
     if server_manager:
@@ -474,33 +579,420 @@ def players():
     
     return render_template('players.html', players=players_online)
 
+@app.route('/api/server/resources')
+def api_server_resources():
+    """Sampled server process resource usage (resolution: raw, 10s or 1m)"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    try:
+        samples = server_manager.get_resource_history(
+            resolution=request.args.get('resolution', 'raw'),
+            since=request.args.get('since', type=float),
+            limit=request.args.get('limit', type=int)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'samples': samples,
+        'latest': server_manager.sampler.latest(),
+        'interval': server_manager.sampler.interval,
+        'available': server_manager.sampler.available
+    })
+
+@app.route('/api/server/jvm')
+def api_server_jvm():
+    """JVM heap/GC plan for the running server, the next launch's plan and recent launches"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    try:
+        current = server_manager.jvm_plan
+        preview = server_manager.preview_jvm_plan()
+        return jsonify({
+            'current': current.to_dict() if current else None,
+            'next': preview.to_dict(),
+            'launches': server_manager.jvm_tuner.launches(request.args.get('limit', 20, type=int))
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/server/gc')
+def api_server_gc():
+    """GC pause histogram, allocation rate and heap-after-GC trend (current launch unless since= is given)"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    try:
+        return jsonify(server_manager.get_gc_summary(since=request.args.get('since', type=float)))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/server/gc/pauses')
+def api_server_gc_pauses():
+    """Most recent GC pauses, newest first"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    try:
+        return jsonify({'pauses': server_manager.gc_log.pauses(
+            since=request.args.get('since', type=float),
+            limit=request.args.get('limit', 100, type=int)
+        )})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/server/tps')
+def api_server_tps():
+    """Latest tick performance per dimension, thresholds and alerts"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    return jsonify(server_manager.tick_monitor.get_status())
+
+@app.route('/api/server/tps/history')
+def api_server_tps_history():
+    """Tick time/TPS series for one dimension (default: overall)"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    try:
+        samples = server_manager.tick_monitor.history(
+            dimension=request.args.get('dimension', 'overall'),
+            since=request.args.get('since', type=float),
+            limit=request.args.get('limit', type=int)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    return jsonify({'samples': samples})
+
+@app.route('/api/server/lag_incidents')
+def api_lag_incidents():
+    """Lag incidents (grouped "Can't keep up" warnings) with their context, newest first"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    since = request.args.get('since', type=float)
+    return jsonify({
+        'incidents': server_manager.lag_incidents.list(limit=request.args.get('limit', 50, type=int), since=since),
+        'summary': server_manager.lag_incidents.summary(since=since)
+    })
+
+@app.route('/api/server/lag_incidents/<incident_id>')
+def api_lag_incident(incident_id):
+    """One lag incident"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    incident = server_manager.lag_incidents.get(incident_id)
+    if not incident:
+        return jsonify({'error': 'Incident not found'}), 404
+    return jsonify(incident)
+
+@app.route('/api/server/supervisor')
+def api_server_supervisor():
+    """Supervisor state and recent server exits with their crash reports"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    return jsonify({
+        'status': server_manager.supervisor.get_status(),
+        'exits': server_manager.supervisor.exits(request.args.get('limit', 20, type=int))
+    })
+
+@app.route('/api/server/supervisor/reset', methods=['POST'])
+def api_server_supervisor_reset():
+    """Clear the crash-loop breaker and any pending restart"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    server_manager.supervisor.reset()
+    return jsonify({'success': True, 'status': server_manager.supervisor.get_status()})
+
+@app.route('/api/instances', methods=['GET', 'POST'])
+def api_instances():
+    """List server instances with the host memory they commit, or create one (name, memory_mb, config)"""
+    global instances
+    
+    if not instances:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    if request.method == 'GET':
+        return jsonify(instances.summary())
+    
+    data = request.get_json(silent=True) or {}
+    memory_mb = data.get('memory_mb')
+    # bool is an int subclass, so true would otherwise pass as 1 MB
+    if not isinstance(memory_mb, int) or isinstance(memory_mb, bool) or memory_mb < 512:
+        return jsonify({'error': 'memory_mb must be a whole number of MB, at least 512'}), 400
+    record, error = instances.create(data.get('name', ''), memory_mb, data.get('config'))
+    if not record:
+        return jsonify({'error': error}), 409 if 'already exists' in error else 400
+    
+    watch_instance(instances.manager(record['name']))
+    return jsonify(instances.describe(record['name'])), 201
+
+@app.route('/api/instances/<name>', methods=['GET', 'PATCH', 'DELETE'])
+def api_instance(name):
+    """One instance; PATCH changes memory_mb or config, DELETE (delete_files=true to remove its files) forgets it"""
+    global instances
+    
+    if not instances:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    if request.method == 'GET':
+        instance = instances.describe(name)
+        if not instance:
+            return jsonify({'error': 'Instance not found'}), 404
+        manager = instances.manager(name)
+        return jsonify(dict(instance, status=manager.get_server_status(),
+                            preflight=manager.last_preflight.to_dict() if manager.last_preflight else None))
+    
+    if request.method == 'PATCH':
+        data = request.get_json(silent=True) or {}
+        memory_mb = data.get('memory_mb')
+        if memory_mb is not None and (not isinstance(memory_mb, int) or isinstance(memory_mb, bool) or memory_mb < 512):
+            return jsonify({'error': 'memory_mb must be a whole number of MB, at least 512'}), 400
+        error = instances.update(name, memory_mb=data.get('memory_mb'), config=data.get('config'))
+    else:
+        error = instances.remove(name, delete_files=request.args.get('delete_files') == 'true')
+        if not error:
+            _instance_mod_managers.pop(name, None)
+    if error:
+        return jsonify({'error': error}), 404 if 'not found' in error else 409
+    return jsonify(instances.describe(name) if request.method == 'PATCH' else {'success': True})
+
+@app.route('/api/instances/<name>/<action>', methods=['POST'])
+def api_instance_action(name, action):
+    """Start or stop an instance in the background; follow the job with /api/instances/<name>/jobs/<id>"""
+    global instances
+    
+    if not instances:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    if action not in ('start', 'stop'):
+        return jsonify({'error': f'Unknown action: {action}'}), 404
+    
+    manager = instances.manager(name)
+    if not manager:
+        return jsonify({'error': 'Instance not found'}), 404
+    job, error = manager.lifecycle.start() if action == 'start' else manager.lifecycle.stop()
+    if not job:
+        return jsonify({'error': error}), 409
+    return jsonify(job.to_dict()), 202
+
+@app.route('/api/instances/<name>/jobs/<job_id>')
+def api_instance_job(name, job_id):
+    """An instance's start/stop job; wait and version long-poll as for /api/server/jobs/<id>"""
+    global instances
+    
+    if not instances:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    manager = instances.manager(name)
+    job = manager.lifecycle.get(job_id) if manager else None
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    wait = request.args.get('wait', 0, type=float)
+    if wait > 0:
+        job.wait(request.args.get('version', type=int), wait)
+    return jsonify(job.to_dict())
+
+@app.route('/api/server/preflight')
+def api_server_preflight():
+    """Pre-flight report: the last start's (last=true), or a fresh check-only run"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    if request.args.get('last') == 'true':
+        report = server_manager.last_preflight
+        if not report:
+            return jsonify({'error': 'The server has not been started yet'}), 404
+    else:
+        report = run_preflight(server_manager, prepare=False)
+    return jsonify(report.to_dict())
+
+@app.route('/api/server/startup')
+def api_server_startup():
+    """Phase-by-phase timing of the launch in progress and the latest one, plus trends over recent launches"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    profiler = server_manager.startup_profiler
+    latest = profiler.list(limit=1)
+    return jsonify({
+        'current': profiler.in_progress(),
+        'latest': latest[0] if latest else None,
+        'trends': profiler.trends(request.args.get('limit', 20, type=int))
+    })
+
+@app.route('/api/server/startup/history')
+def api_server_startup_history():
+    """Timed launches, newest first (outcome=ready|failed|exited|stopped to filter)"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    return jsonify({
+        'launches': server_manager.startup_profiler.list(limit=request.args.get('limit', 50, type=int),
+                                                         outcome=request.args.get('outcome'))
+    })
+
+@app.route('/api/server/startup/<launch_id>')
+def api_server_startup_launch(launch_id):
+    """One timed launch"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    launch = server_manager.startup_profiler.get(launch_id)
+    if not launch:
+        return jsonify({'error': 'Launch not found'}), 404
+    return jsonify(launch)
+
+@app.route('/api/java/runtimes')
+def api_java_runtimes():
+    """Installed Java runtimes and the one selected for the server (refresh=true rescans)"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    if request.args.get('refresh') == 'true':
+        server_manager.java_runtimes.runtimes(refresh=True)
+    return jsonify(dict(server_manager.java_runtimes.describe(),
+                        selected=get_java_info(request.args.get('minecraft_version'))))
+
+@app.route('/api/players/online')
+def api_players_online():
+    """Get the online roster with session start times"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    return jsonify({'players': server_manager.get_online_players()})
+
+@app.route('/api/players/sessions')
+def api_player_sessions():
+    """Get recorded play sessions, optionally filtered by player and time window"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    sessions = server_manager.players.get_sessions(
+        player=request.args.get('player'),
+        since=request.args.get('since', type=float),
+        until=request.args.get('until', type=float),
+        limit=request.args.get('limit', 100, type=int)
+    )
+    return jsonify({'sessions': sessions})
+
+@app.route('/api/players/stats')
+def api_player_stats():
+    """Get total playtime and session counts per player"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    return jsonify(server_manager.players.get_player_stats())
+
 @app.route('/send_command', methods=['POST'])
 def send_command():
-    global server_manager
+    server_manager = instance_manager()
     
     command = request.form.get('command')
     if command and server_manager:
-        if server_manager.send_server_command(command):
-            flash(f'Command sent: {command}', 'success')
-        else:
+        try:
+            output = server_manager.execute_command(command)
+            if output:
+                flash(f'{command}: {output}', 'success')
+            else:
+                flash(f'Command sent: {command}', 'success')
+        except Exception as e:
+            logging.error(f"Failed to send command: {e}")
             flash('Failed to send command', 'error')
     else:
         flash('Please enter a command', 'error')
     
     return redirect(url_for('players'))
 
+@app.route('/api/server/command', methods=['POST'])
+def api_server_command():
+    """Run a server command and return its output"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    data = request.get_json(silent=True) or request.form
+    command = data.get('command')
+    if not command:
+        return jsonify({'error': 'No command specified'}), 400
+    
+    try:
+        output = server_manager.execute_command(command, timeout=float(data.get('timeout', 10)))
+        return jsonify({
+            'command': command,
+            'output': output,
+            'via': 'rcon' if output is not None else 'stdin'
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to run command: {e}'}), 500
+
 @app.route('/settings')
 def settings():
+    global instances
+    
+    instance = request.args.get('instance', DEFAULT_INSTANCE)
+    instance_names = instances.names() if instances else [DEFAULT_INSTANCE]
+    if instance not in instance_names:
+        flash(f'Instance {instance} not found', 'error')
+        instance = DEFAULT_INSTANCE
+    
     # Load current settings
     config = {}
-    try:
-        if os.path.exists('config.json'):
-            with open('config.json', 'r') as f:
-                config = json.load(f)
-    except:
-        pass
+    if instance != DEFAULT_INSTANCE:
+        config = instances.config_for(instance)
+    else:
+        try:
+            if os.path.exists('config.json'):
+                with open('config.json', 'r') as f:
+                    config = json.load(f)
+        except:
+            pass
     
-    return render_template('settings.html', config=config)
+    return render_template('settings.html', config=config, instance=instance, instance_names=instance_names)
 
 @app.route('/save_settings', methods=['POST'])
 def save_settings():
@@ -512,208 +1004,148 @@ def save_settings():
         'minecraft_version': request.form.get('minecraft_version', '1.19.2'),
         'mod_loader': request.form.get('mod_loader', 'forge'),
         'java_memory': request.form.get('java_memory', '4G'),
+        'gc_logging': request.form.get('gc_logging') == 'on',
+        'auto_restart': request.form.get('auto_restart') == 'on',
         'auto_backup': request.form.get('auto_backup') == 'on',
-        'backup_interval': int(request.form.get('backup_interval', 3600))
+        'backup_interval': int(request.form.get('backup_interval', 3600)),
+        'backup_mode': request.form.get('backup_mode', 'incremental'),
+        'backup_codec': request.form.get('backup_codec', 'deflate'),
+        'backup_compression_level': int(request.form.get('backup_compression_level', 6))
     }
     
+    instance = request.form.get('instance', DEFAULT_INSTANCE)
+    if instance != DEFAULT_INSTANCE:
+        return save_instance_settings(instance, config)
+    
     # Save configuration
     with open('config.json', 'w') as f:
         json.dump(config, f, indent=2)
     
+    # Apply backup schedule changes without a restart
+    if server_manager:
+        server_manager.config.update(config)
+        server_manager.backup_scheduler.reschedule()
+    
     flash('Settings saved successfully', 'success')
     return redirect(url_for('settings'))
 
+def save_instance_settings(name, config):
+    """Save the settings form for an instance other than the default one (its ports stay as allocated)"""
+    global instances
+    
+    if not instances or name not in instances.names():
+        flash(f'Instance {name} not found', 'error')
+        return redirect(url_for('settings'))
+    
+    try:
+        memory_mb = parse_memory_mb(config['java_memory'])
+    except ValueError:
+        memory_mb = None
+    if not memory_mb:
+        flash('Instances need a fixed Java memory size', 'error')
+        return redirect(url_for('settings', instance=name))
+    
+    error = instances.update(name, memory_mb=memory_mb, config=config)
+    if error:
+        flash(error, 'error')
+    else:
+        instances.manager(name).backup_scheduler.reschedule()
+        flash(f'Settings for instance {name} saved; they apply from its next start', 'success')
+    return redirect(url_for('settings', instance=name))
+
 @app.route('/start_server')
 def start_server():
-    global server_manager, is_hosting, host_client
+    server_manager = instance_manager()
     
-    if not is_hosting and server_manager:
-        try:
-            # Check if server is already running
-            if server_manager.is_running:
-                flash('Server is already running', 'warning')
-                return redirect(url_for('dashboard'))
-            
-            # Get detailed startup information
-            startup_info = get_startup_diagnostics()
-            
-            # Start the server
-            if server_manager.start_server():
-                is_hosting = True
-                
-                # Update host status
-                if host_client:
-                    host_client.update_status({
-                        'status': 'online',
-                        'players': [],
-                        'memory_usage': 0.0,
-                        'cpu_usage': 0.0
-                    })
-                
-                flash('Server started successfully!', 'success')
-            else:
-                # Provide detailed error information
-                error_details = get_server_error_details()
-                flash(f'Failed to start server. {error_details}', 'error')
-                
-        except Exception as e:
-            logging.error(f"Server startup error: {e}")
-            flash(f'Server startup error: {str(e)}', 'error')
+    if not server_manager:
+        flash('Server manager not initialized', 'error')
+        return redirect(url_for('dashboard'))
+    
+    # Pre-flight checks and the JVM's boot continue in the background; the dashboard follows the job
+    job, error = server_manager.lifecycle.start()
+    if job:
+        flash('Server is starting; the dashboard will show when it is ready', 'info')
     else:
-        flash('Server is already running or server manager not initialized', 'warning')
+        flash(error, 'warning')
     
     return redirect(url_for('dashboard'))
 
-def get_startup_diagnostics():
-    """Get comprehensive startup diagnostics"""
-    diagnostics = {
-        'java_available': False,
-        'java_version': None,
-        'server_directory': False,
-        'server_jar': False,
-        'permissions': False,
-        'memory_available': False,
-        'disk_space': False
-    }
-    
-    try:
-        # Check Java
-        result = subprocess.run(['java', '-version'], capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
-            diagnostics['java_available'] = True
-            # Extract version from stderr
-            import re
-            version_match = re.search(r'"([^"]+)"', result.stderr)
-            if version_match:
-                diagnostics['java_version'] = version_match.group(1)
-        
-        # Check server directory
-        server_dir = Path("server")
-        if server_dir.exists():
-            diagnostics['server_directory'] = True
-            
-            # Check permissions
-            try:
-                test_file = server_dir / ".test_write"
-                test_file.write_text("test")
-                test_file.unlink()
-                diagnostics['permissions'] = True
-            except:
-                pass
-            
-            # Check for server JAR
-            for file in server_dir.glob("*.jar"):
-                if "forge" in file.name.lower() or "server" in file.name.lower():
-                    diagnostics['server_jar'] = True
-                    break
-        
-        # Check system resources
-        try:
-            import psutil
-            memory = psutil.virtual_memory()
-            if memory.available >= 2 * 1024**3:  # 2GB
-                diagnostics['memory_available'] = True
-            
-            disk = psutil.disk_usage(str(server_dir))
-            if disk.free >= 1024**3:  # 1GB
-                diagnostics['disk_space'] = True
-        except ImportError:
-            # psutil not available, assume resources are sufficient
-            diagnostics['memory_available'] = True
-            diagnostics['disk_space'] = True
-            
-    except Exception as e:
-        logging.error(f"Diagnostics error: {e}")
-    
-    return diagnostics
-
-def get_server_error_details():
-    """Get detailed error information for server startup failures"""
-    try:
-        # Check common issues
-        issues = []
-        
-        # Check Java
-        try:
-            result = subprocess.run(['java', '-version'], capture_output=True, text=True, timeout=5)
-            if result.returncode != 0:
-                issues.append("Java not installed or not in PATH")
-        except FileNotFoundError:
-            issues.append("Java not found - please install Java 8 or higher")
-        except subprocess.TimeoutExpired:
-            issues.append("Java command timed out")
-        
-        # Check server directory
-        server_dir = Path("server")
-        if not server_dir.exists():
-            issues.append("Server directory does not exist")
-        else:
-            try:
-                test_file = server_dir / ".test_write"
-                test_file.write_text("test")
-                test_file.unlink()
-            except PermissionError:
-                issues.append("No write permission to server directory")
-            except Exception as e:
-                issues.append(f"Cannot write to server directory: {e}")
-        
-        # Check for server JAR
-        server_jar_found = False
-        if server_dir.exists():
-            for file in server_dir.glob("*.jar"):
-                if "forge" in file.name.lower() or "server" in file.name.lower():
-                    server_jar_found = True
-                    break
-        
-        if not server_jar_found:
-            issues.append("No Forge server JAR found - please install Forge first")
-        
-        # Check system resources
-        try:
-            import psutil
-            memory = psutil.virtual_memory()
-            if memory.available < 2 * 1024**3:  # Less than 2GB
-                issues.append(f"Insufficient memory: {memory.available // (1024**3)}GB available, 2GB+ recommended")
-            
-            disk = psutil.disk_usage(str(server_dir))
-            if disk.free < 1024**3:  # Less than 1GB
-                issues.append(f"Insufficient disk space: {disk.free // (1024**3)}GB available, 1GB+ recommended")
-        except ImportError:
-            pass  # psutil not available
-        
-        if issues:
-            return "Issues found: " + "; ".join(issues)
-        else:
-            return "Unknown error occurred during startup"
-            
-    except Exception as e:
-        return f"Error checking system: {str(e)}"
-
 @app.route('/stop_server')
 def stop_server():
-    global server_manager, is_hosting, host_client
+    server_manager = instance_manager()
     
-    if is_hosting and server_manager:
-        if server_manager.stop_server():
-            is_hosting = False
-            
-            # Update host status
-            if host_client:
-                host_client.update_status({
-                    'status': 'offline',
-                    'players': [],
-                    'memory_usage': 0.0,
-                    'cpu_usage': 0.0
-                })
-            
-            flash('Server stopped successfully', 'success')
-        else:
-            flash('Failed to stop server', 'error')
+    if not server_manager:
+        flash('Server manager not initialized', 'error')
+        return redirect(url_for('dashboard'))
+    
+    job, error = server_manager.lifecycle.stop()
+    if job and job.details.get('cancelled_restart'):
+        flash('Automatic restart cancelled; the server stays stopped', 'success')
+    elif job:
+        flash('Server is stopping', 'info')
     else:
-        flash('Server is not running', 'warning')
+        flash(error, 'warning')
     
     return redirect(url_for('dashboard'))
 
+@app.route('/api/server/start', methods=['POST'])
+def api_server_start():
+    """Start the server in the background; returns the job to follow with /api/server/jobs/<id>"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    job, error = server_manager.lifecycle.start()
+    if not job:
+        return jsonify({'error': error}), 409
+    return jsonify(job.to_dict()), 202
+
+@app.route('/api/server/stop', methods=['POST'])
+def api_server_stop():
+    """Stop the server in the background; returns the job to follow with /api/server/jobs/<id>"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    job, error = server_manager.lifecycle.stop()
+    if not job:
+        return jsonify({'error': error}), 409
+    return jsonify(job.to_dict()), 202
+
+@app.route('/api/server/jobs')
+def api_server_jobs():
+    """Recent start/stop jobs, newest first, and the one in progress"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    current = server_manager.lifecycle.current
+    return jsonify({
+        'current': current.to_dict() if current else None,
+        'jobs': server_manager.lifecycle.list(request.args.get('limit', 20, type=int))
+    })
+
+@app.route('/api/server/jobs/<job_id>')
+def api_server_job(job_id):
+    """A start/stop job's state. With wait=N, long-polls up to N seconds (max 60) for a change
+    past version, or until the job finishes"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    job = server_manager.lifecycle.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    wait = request.args.get('wait', 0, type=float)
+    if wait > 0:
+        job.wait(request.args.get('version', type=int), wait)
+    return jsonify(job.to_dict())
+
 @app.route('/install_forge')
 def install_forge():
     """Install Forge using the modern installer"""
@@ -721,7 +1153,7 @@ def install_forge():
         from forge_installer import ModernForgeInstaller
         
         # Create installer
-        installer = ModernForgeInstaller(Path("server"))
+        installer = ModernForgeInstaller(instance_server_dir())
         
         # Check if Forge is already installed
         existing_jar = installer.find_installed_forge_jar()
@@ -743,28 +1175,69 @@ def install_forge():
 @app.route('/detect_forge')
 def detect_forge():
     """Detect installed Forge versions"""
-    global server_manager
+    server_manager = instance_manager()
     
     if not server_manager:
         flash('Server manager not initialized', 'error')
         return redirect(url_for('mods'))
     
     try:
-        detected_versions = server_manager.detect_forge_versions()
+        # Detected versions stream in from /api/forge/detect/stream as each JAR is inspected
         available_versions = server_manager.get_available_forge_versions()
         
         return render_template('detect_forge.html', 
-                             detected_versions=detected_versions,
-                             available_versions=available_versions)
+                             detected_versions=[],
+                             available_versions=available_versions,
+                             stream_detection=True)
                              
     except Exception as e:
         flash(f'Error detecting Forge versions: {str(e)}', 'error')
         return redirect(url_for('mods'))
 
+@app.route('/api/forge/detect/stream')
+def api_forge_detect_stream():
+    """Stream detected Forge versions as Server-Sent Events while the scan runs"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    scan_id, cancel_event, scan = server_manager.start_forge_scan()
+    
+    def generate():
+        found = 0
+        try:
+            yield f"event: start\ndata: {json.dumps({'scan_id': scan_id})}\n\n"
+            for version_info in scan:
+                found += 1
+                yield f"event: version\ndata: {json.dumps(version_info)}\n\n"
+            done = {'scan_id': scan_id, 'found': found, 'cancelled': cancel_event.is_set()}
+            yield f"event: done\ndata: {json.dumps(done)}\n\n"
+        finally:
+            # Client went away or scan finished; stop any remaining work
+            cancel_event.set()
+            scan.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/forge/detect/<scan_id>/cancel', methods=['POST'])
+def api_forge_detect_cancel(scan_id):
+    """Cancel a running Forge detection scan"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    return jsonify({'cancelled': server_manager.cancel_forge_scan(scan_id)})
+
 @app.route('/select_forge_version')
 def select_forge_version():
     """Show Forge version selection page"""
-    global server_manager
+    server_manager = instance_manager()
     
     if not server_manager:
         flash('Server manager not initialized', 'error')
@@ -817,18 +1290,14 @@ def install_forge_version():
             flash('No Forge build selected. Please select a Forge version to install.', 'error')
             return redirect(url_for('install_forge'))
         
-        # Check Java installation first
-        try:
-            result = subprocess.run(['java', '-version'], capture_output=True, text=True, timeout=10)
-            if result.returncode != 0:
-                flash('Java is not installed or not working. Please install Java 17 or higher from https://adoptium.net', 'error')
-                return redirect(url_for('install_forge'))
-        except Exception:
-            flash('Java is not installed. Please install Java 17 or higher from https://adoptium.net', 'error')
+        # Check for a Java runtime that can run this Minecraft version first
+        java_info = get_java_info(minecraft_version)
+        if not java_info['available']:
+            flash(f"{java_info['error']}. Install a suitable Java from https://adoptium.net", 'error')
             return redirect(url_for('install_forge'))
         
         # Check server directory permissions
-        server_dir = Path("server")
+        server_dir = instance_server_dir()
         try:
             server_dir.mkdir(exist_ok=True)
             test_file = server_dir / ".test_write"
@@ -889,7 +1358,7 @@ def get_forge_versions(minecraft_version):
     try:
         from forge_installer import ModernForgeInstaller
         
-        installer = ModernForgeInstaller(Path("server"))
+        installer = ModernForgeInstaller(instance_server_dir())
         versions = installer.get_forge_versions(minecraft_version)
         
         return jsonify(versions)
@@ -900,7 +1369,7 @@ def get_forge_versions(minecraft_version):
 @app.route('/use_forge_version', methods=['POST'])
 def use_forge_version():
     """Set a specific Forge version as the active server JAR"""
-    global server_manager
+    server_manager = instance_manager()
     
     if not server_manager:
         flash('Server manager not initialized', 'error')
@@ -938,11 +1407,25 @@ def use_forge_version():
 
 @app.route('/backup_world')
 def backup_world():
-    global server_manager
+    server_manager = instance_manager()
     
     if server_manager:
         if server_manager.backup_world():
-            flash('World backup created successfully', 'success')
+            snapshot = server_manager.last_backup
+            if server_manager.backup_in_progress:
+                paused = server_manager.backup_status.get('paused_seconds', 0)
+                flash(f'World backup started (saving paused for {paused}s); '
+                      f'it will finish in the background', 'success')
+            elif snapshot and snapshot.get('type') == 'zip':
+                archive_mb = snapshot['archive_bytes'] / (1024 * 1024)
+                flash(f'World backup created successfully ({snapshot["files"]} files, '
+                      f'{archive_mb:.1f} MB {snapshot["codec"]} archive, {snapshot["duration"]}s)', 'success')
+            elif snapshot:
+                new_mb = snapshot['new_bytes'] / (1024 * 1024)
+                flash(f'World backup created successfully ({snapshot["changed_files"]} changed files, '
+                      f'{new_mb:.1f} MB new, {snapshot["duration"]}s)', 'success')
+            else:
+                flash('World backup created successfully', 'success')
         else:
             flash('Failed to create world backup', 'error')
     else:
@@ -950,6 +1433,143 @@ def backup_world():
     
     return redirect(url_for('dashboard'))
 
+@app.route('/api/backups')
+def api_backups():
+    """List world backups and backup store usage"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    try:
+        return jsonify({
+            'backups': server_manager.list_backups(),
+            'store': server_manager.backup_store.get_stats(),
+            'status': server_manager.backup_status,
+            'operation': server_manager.backup_operation,
+            'last_error': server_manager.last_backup_error
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to list backups: {e}'}), 500
+
+@app.route('/api/backups/jobs')
+def api_backup_jobs():
+    """Backup job history (newest first) and scheduler state"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    limit = request.args.get('limit', 50, type=int)
+    jobs = server_manager.backup_jobs.list(limit)
+    durations = [job['duration'] for job in jobs if job.get('status') == 'success']
+    return jsonify({
+        'jobs': jobs,
+        'scheduler': server_manager.backup_scheduler.get_status(),
+        'average_duration': round(sum(durations) / len(durations), 3) if durations else None
+    })
+
+@app.route('/api/backups/<backup_id>/restore', methods=['POST'])
+def api_restore_backup(backup_id):
+    """Restore the world from a backup (the server must be stopped)"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    try:
+        return jsonify(server_manager.restore_backup(backup_id))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': f'Failed to restore backup: {e}'}), 400
+
+@app.route('/api/backups/prune', methods=['POST'])
+def api_prune_backups():
+    """Apply the backup retention policy now"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    try:
+        return jsonify({'removed': server_manager.prune_backups()})
+    except Exception as e:
+        return jsonify({'error': f'Failed to prune backups: {e}'}), 500
+
+@app.route('/api/world/regions')
+def api_world_regions():
+    """Region file sizes and unvisited chunk counts per dimension"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    read_fields = request.args.get('chunks', 'true').lower() != 'false'
+    try:
+        return jsonify(server_manager.analyze_world(read_fields))
+    except Exception as e:
+        return jsonify({'error': f'Failed to analyze world: {e}'}), 500
+
+@app.route('/api/world/trim', methods=['POST'])
+def api_trim_world():
+    """Trim unvisited chunks; a dry run unless dry_run is false"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    options = request.get_json(silent=True) or {}
+    try:
+        return jsonify(server_manager.trim_world(
+            min_inhabited_seconds=options.get('min_inhabited_seconds'),
+            protect_radius=options.get('protect_radius'),
+            dimensions=options.get('dimensions'),
+            dry_run=options.get('dry_run', True)
+        ))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': f'Failed to trim world: {e}'}), 500
+
+@app.route('/api/pregen', methods=['GET', 'POST'])
+def api_pregen():
+    """Get chunk pre-generation progress, or start a job (POST radius, center, dimension)"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    if request.method == 'GET':
+        job = server_manager.pregen_job
+        return jsonify(job.get_status() if job else {'state': None})
+    
+    options = request.get_json(silent=True) or request.form
+    try:
+        return jsonify(server_manager.start_pregen(
+            radius=int(options.get('radius', 100)),
+            center=options.get('center'),
+            dimension=options.get('dimension', 'minecraft:overworld')
+        ))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid pre-generation options: {e}'}), 400
+
+@app.route('/api/pregen/<action>', methods=['POST'])
+def api_pregen_control(action):
+    """Pause, resume or cancel the chunk pre-generation job"""
+    server_manager = instance_manager()
+    
+    job = server_manager.pregen_job if server_manager else None
+    if not job or not job.active:
+        return jsonify({'error': 'No chunk pre-generation job running'}), 404
+    if action not in ('pause', 'resume', 'cancel'):
+        return jsonify({'error': f'Unknown action {action}'}), 400
+    
+    getattr(job, action)()
+    return jsonify(job.get_status())
+
 @app.route('/diagnostics')
 def diagnostics():
     """Show comprehensive diagnostics and troubleshooting page"""
@@ -965,11 +1585,9 @@ def api_system_info():
         disk = psutil.disk_usage('.')
         
         # Get Java version
-        try:
-            result = subprocess.run(['java', '-version'], capture_output=True, text=True, timeout=10)
-            java_version = result.stderr.split('\n')[0] if result.returncode == 0 else 'Not found'
-        except:
-            java_version = 'Not found'
+        java_info = get_java_info()
+        java_version = (f"{java_info['version']} ({java_info['vendor'] or 'unknown vendor'}, {java_info['arch']})"
+                        if java_info['available'] else 'Not found')
         
         return jsonify({
             'python_version': sys.version.split()[0],
@@ -1017,28 +1635,30 @@ def api_system_health():
 
 @app.route('/api/diagnostics/run/<diagnostic_type>')
 def api_run_diagnostic(diagnostic_type):
-    """Run specific diagnostic tests"""
+    """Run specific diagnostic tests against the request's instance"""
+    server_manager = instance_manager()
     results = []
     
     try:
         if diagnostic_type == 'java' or diagnostic_type == 'all':
             # Check Java installation
             try:
-                result = subprocess.run(['java', '-version'], capture_output=True, text=True, timeout=10)
-                if result.returncode == 0:
-                    java_version = result.stderr.split('\n')[0]
+                java_info = get_java_info()
+                if java_info['available']:
+                    others = [r for r in server_manager.java_runtimes.runtimes() if r.path != java_info['path']]
                     results.append({
                         'name': 'Java Installation',
                         'status': 'success',
-                        'message': 'Java is installed and accessible',
-                        'details': java_version
+                        'message': f"Java {java_info['version']} selected for this server",
+                        'details': f"{java_info['path']}" + (
+                            f" (also installed: {', '.join(f'Java {r.version}' for r in others)})" if others else '')
                     })
                 else:
                     results.append({
                         'name': 'Java Installation',
                         'status': 'error',
-                        'message': 'Java is not installed or not in PATH',
-                        'details': 'Install Java 8 or higher from adoptium.net'
+                        'message': java_info['error'],
+                        'details': 'Install a suitable Java from adoptium.net'
                     })
             except Exception as e:
                 results.append({
@@ -1050,7 +1670,7 @@ def api_run_diagnostic(diagnostic_type):
         
         if diagnostic_type == 'forge' or diagnostic_type == 'all':
             # Check Forge installation
-            server_dir = Path("server")
+            server_dir = instance_server_dir()
             forge_jars = list(server_dir.glob("forge-*.jar")) if server_dir.exists() else []
             
             if forge_jars:
@@ -1096,7 +1716,7 @@ def api_run_diagnostic(diagnostic_type):
         
         if diagnostic_type == 'server' or diagnostic_type == 'all':
             # Check server files
-            server_dir = Path("server")
+            server_dir = instance_server_dir()
             if server_dir.exists():
                 if os.access(server_dir, os.W_OK):
                     results.append({
@@ -1120,9 +1740,20 @@ def api_run_diagnostic(diagnostic_type):
                     'details': 'Will be created when needed'
                 })
         
+        if (diagnostic_type == 'preflight' or diagnostic_type == 'all') and server_manager:
+            # The checks start_server runs before launching, without installing or writing anything
+            report = run_preflight(server_manager, prepare=False)
+            for check in report.checks.values():
+                results.append({
+                    'name': f'Pre-flight: {check.name}',
+                    'status': 'success' if check.ok else check.severity,
+                    'message': check.message,
+                    'details': f'{check.duration_ms:.0f}ms'
+                })
+        
         if diagnostic_type == 'mods' or diagnostic_type == 'all':
             # Check mods directory
-            mods_dir = Path("server/mods")
+            mods_dir = instance_server_dir() / "mods"
             if mods_dir.exists():
                 mod_count = len(list(mods_dir.glob("*.jar")))
                 results.append({
@@ -1176,11 +1807,67 @@ def api_download_log(log_file):
     except Exception as e:
         return f"Error downloading log: {str(e)}", 500
 
+@app.route('/api/server/console')
+def api_server_console():
+    """Get buffered console lines from an offset"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    offset = request.args.get('offset', type=int)
+    limit = request.args.get('limit', 1000, type=int)
+    
+    # Without an offset, return the newest lines only
+    if offset is None:
+        offset = max(server_manager.console.first_offset, server_manager.console.next_offset - limit)
+    
+    return jsonify(server_manager.get_console_lines(offset, limit))
+
+@app.route('/api/server/console/stream')
+def api_server_console_stream():
+    """Stream console lines as Server-Sent Events, tailing from an offset"""
+    server_manager = instance_manager()
+    
+    if not server_manager:
+        return jsonify({'error': 'Server manager not initialized'}), 500
+    
+    console = server_manager.console
+    
+    # EventSource reconnects send Last-Event-ID; resume right after it
+    offset = request.args.get('offset', type=int)
+    last_event_id = request.headers.get('Last-Event-ID')
+    if last_event_id and last_event_id.isdigit():
+        offset = int(last_event_id) + 1
+    if offset is None:
+        offset = max(console.first_offset, console.next_offset - 200)
+    else:
+        # An ID from before the offsets were reset would wait for lines that never come
+        offset = console.resume_offset(offset)
+    
+    def generate():
+        next_offset = offset
+        while True:
+            if not console.wait_for(next_offset, timeout=15):
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            
+            lines, next_offset = console.read(next_offset, 500)
+            for entry in lines:
+                yield f"id: {entry['offset']}\ndata: {json.dumps(entry)}\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/fix_permissions')
 def fix_permissions():
     """Attempt to fix common permission issues"""
     try:
-        server_dir = Path("server")
+        server_dir = instance_server_dir()
         
         # Create server directory if it doesn't exist
         server_dir.mkdir(parents=True, exist_ok=True)
@@ -1282,7 +1969,7 @@ def modrinth_project_details(project_id):
 @app.route('/download_modrinth_version/<project_id>/<version_id>')
 def download_modrinth_version(project_id, version_id):
     """Download a specific version of a mod from Modrinth"""
-    global mod_manager
+    mod_manager = instance_mod_manager()
     
     try:
         if mod_manager and mod_manager.download_mod_from_modrinth(project_id, version_id):
@@ -1334,7 +2021,7 @@ def create_shortcut():
 @app.route('/api/forge/status')
 def api_forge_status():
     """Get detailed Forge installation status"""
-    global server_manager
+    server_manager = instance_manager()
     
     if not server_manager:
         return jsonify({
@@ -1352,7 +2039,7 @@ def api_forge_status():
 @app.route('/api/forge/is_ready')
 def api_forge_is_ready():
     """Check if Forge is properly installed and ready to run"""
-    global server_manager
+    server_manager = instance_manager()
     
     if not server_manager:
         return jsonify({
@@ -1374,7 +2061,8 @@ def api_forge_is_ready():
 @app.route('/api/server/detailed_status')
 def api_server_detailed_status():
     """Get detailed server status including Forge information"""
-    global server_manager, is_hosting
+    global is_hosting
+    server_manager = instance_manager()
     
     if not server_manager:
         return jsonify({